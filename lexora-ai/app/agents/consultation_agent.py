@@ -8,7 +8,8 @@ from langchain_core.messages import HumanMessage
 
 from app.schemas.consultation_state import ConsultationState
 from app.core.configuration import LegalAgentConfiguration
-from app.tools.consultation_tools import consultation_search, parse_legal_document
+from app.core.checkpointer import create_checkpointer
+from app.tools.consultation_tools import consultation_search, parse_legal_document, read_document_articles
 
 load_dotenv()
 
@@ -76,7 +77,8 @@ If snippets are insufficient:
 
 ## Tools Available:
 - **consultation_search**: Search lex.uz using Brave Search API with optimized queries
-- **parse_legal_document**: Parse specific documents when snippets insufficient
+- **parse_legal_document**: Parse specific documents when snippets insufficient (current edition by default; pass edition_date="dd.mm.yyyy" for the text in force on a past date)
+- **read_document_articles**: Read specific articles of a parsed document (e.g. "5" or "10-15") using its structure outline
 
 ## Key Principles:
 - Efficiency first - minimize tool calls
@@ -97,7 +99,8 @@ Always aim to answer the user's question as efficiently as possible while ensuri
     # Minimal tool set for efficient Q&A
     tools = [
         consultation_search,
-        parse_legal_document
+        parse_legal_document,
+        read_document_articles
     ]
     
     # Create the react agent
@@ -105,7 +108,9 @@ Always aim to answer the user's question as efficiently as possible while ensuri
         model=model,
         tools=tools,
         state_schema=ConsultationState,
-        prompt=consultation_system_prompt
+        prompt=consultation_system_prompt,
+        # Threads persist between turns, so each turn only sends the new messages
+        checkpointer=create_checkpointer("consultation", ConsultationState)
     )
     
     return graph
@@ -8,6 +8,7 @@ from langchain_core.messages import HumanMessage
 
 from app.schemas.research_state import LegalResearchState
 from app.core.configuration import LegalAgentConfiguration
+from app.core.checkpointer import create_checkpointer
 from app.tools.research_tools import (
     generate_multi_search_strategy,
     execute_multi_search,
@@ -103,7 +104,9 @@ Remember: The 4-step sequence is MANDATORY. After approval, use `create_legal_an
         model=model,
         tools=tools,
         state_schema=LegalResearchState,
-        prompt=research_system_prompt
+        prompt=research_system_prompt,
+        # Threads persist between turns, so each turn only sends the new messages
+        checkpointer=create_checkpointer("research", LegalResearchState)
     )
     
     return graph
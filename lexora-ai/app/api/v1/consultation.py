@@ -1,46 +1,94 @@
 import uuid
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from app.schemas.chat import ChatRequest, ChatResponse, Message
+from app.schemas.chat import ChatRequest, ChatResponse, Message, StreamResponse
 from app.core.consultation_engine import ConsultationEngine
+from app.core.session_turns import SessionBusyError
+from app.core.idempotency import create_idempotent_responses, IdempotencyKeyReusedError
+from app.core.streaming import format_sse
 
 router = APIRouter()
 consultation_engine = ConsultationEngine()
+# Responses replayed to retries that carry the same Idempotency-Key
+chat_responses = create_idempotent_responses("consultation")
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """Chat endpoint for consultation agent"""
+async def chat(
+    request: ChatRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+):
+    """Chat endpoint for consultation agent.
+
+    Retries sent with the same Idempotency-Key get the original response.
+    """
     try:
         print(f"Received request: {request}")
         print(f"Messages: {[f'{msg.role}: {repr(msg.content)}' for msg in request.messages]}")
         
-        response_messages = await consultation_engine.get_response(
-            messages=request.messages,
-            session_id=request.session_id
-        )
-        
-        print(f"Response messages: {[f'{msg.role}: {repr(msg.content)}' for msg in response_messages]}")
-        
-        # Validate all messages before creating response
-        validated_messages = []
-        for msg in response_messages:
-            if msg.content and msg.content.strip():
-                validated_messages.append(msg)
-            else:
-                print(f"Skipping empty message: {msg}")
-        
-        return ChatResponse(
-            messages=validated_messages,
-            session_id=request.session_id
-        )
+        if idempotency_key:
+            return await chat_responses.run(idempotency_key, request, lambda: _chat_response(request))
+        return await _chat_response(request)
     
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SessionBusyError as e:
+        # Another turn of this session is running and the session's queue is full
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         print(f"Error in chat endpoint: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
+async def _chat_response(request: ChatRequest) -> ChatResponse:
+    """Run a chat turn and build its response"""
+    response_messages = await consultation_engine.get_response(
+        messages=request.messages,
+        session_id=request.session_id
+    )
+    
+    print(f"Response messages: {[f'{msg.role}: {repr(msg.content)}' for msg in response_messages]}")
+    
+    # Validate all messages before creating response
+    validated_messages = []
+    for msg in response_messages:
+        if msg.content and msg.content.strip():
+            validated_messages.append(msg)
+        else:
+            print(f"Skipping empty message: {msg}")
+    
+    return ChatResponse(
+        messages=validated_messages,
+        session_id=request.session_id
+    )
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Streaming chat endpoint for consultation agent (server-sent events)"""
+    print(f"Received stream request: {request}")
+    
+    async def events():
+        try:
+            async for event in consultation_engine.stream_response(
+                messages=request.messages,
+                session_id=request.session_id
+            ):
+                yield format_sse(event)
+        except Exception as e:
+            print(f"Error in chat stream: {e}")
+            import traceback
+            traceback.print_exc()
+            yield format_sse(StreamResponse(event="error", content=f"Error processing chat: {str(e)}", done=True))
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so events reach the client as they are produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/chat/new-session")
 async def new_session():
     """Create a new chat session"""
@@ -1,46 +1,54 @@
 import uuid
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from contextlib import aclosing
+from fastapi import APIRouter, HTTPException, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 
-from app.schemas.chat import ChatRequest, ChatResponse, Message
+from app.schemas.chat import ChatRequest, ChatResponse, Message, StreamResponse, ResearchClientFrame
+from app.schemas.jobs import ResearchJobRequest, ResearchJobStatus
+from app.core.config import settings
 from app.core.research_agent import ResearchAgentWrapper
+from app.core.research_jobs import ResearchJobQueue, JobQueueFullError
+from app.core.session_turns import SessionBusyError
+from app.core.idempotency import create_idempotent_responses, IdempotencyKeyReusedError, UnrecordedResponse
+from app.core.streaming import format_sse
 
 router = APIRouter()
 research_agent = ResearchAgentWrapper()
+research_jobs = ResearchJobQueue(
+    research_agent,
+    workers=settings.RESEARCH_JOB_WORKERS,
+    max_queue=settings.RESEARCH_JOB_MAX_QUEUE,
+    ttl=settings.RESEARCH_JOB_TTL
+)
+# Responses replayed to retries that carry the same Idempotency-Key
+chat_responses = create_idempotent_responses("research")
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """Chat endpoint for Research agent with interrupt handling"""
+async def chat(
+    request: ChatRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+):
+    """Chat endpoint for Research agent with interrupt handling.
+
+    Retries sent with the same Idempotency-Key get the original response.
+    """
     try:
         print(f"Received research request: {request}")
         print(f"Messages: {[f'{msg.role}: {repr(msg.content)}' for msg in request.messages]}")
         
-        response_data = await research_agent.get_response(
-            messages=request.messages,
-            session_id=request.session_id
-        )
-        
-        print(f"Response data: {response_data}")
-        
-        # Validate messages before creating response
-        validated_messages = []
-        for msg in response_data.get("messages", []):
-            if msg.content and msg.content.strip():
-                validated_messages.append(msg)
-            else:
-                print(f"Skipping empty message: {msg}")
-        
-        # Create response with optional interrupt fields
-        response = ChatResponse(
-            messages=validated_messages,
-            session_id=request.session_id,
-            interrupt_type=response_data.get("interrupt_type"),
-            interrupt_data=response_data.get("interrupt_data"),
-            interrupt_id=response_data.get("interrupt_id")
-        )
-        
-        return response
+        if idempotency_key:
+            return await chat_responses.run(idempotency_key, request, lambda: _chat_response(request))
+        return await _chat_response(request)
     
+    except UnrecordedResponse as e:
+        return e.response
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SessionBusyError as e:
+        # Another turn of this session is running and the session's queue is full
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         print(f"Error in research chat endpoint: {e}")
         import traceback
@@ -48,6 +56,154 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail=f"Error processing research chat: {str(e)}")
 
 
+async def _chat_response(request: ChatRequest) -> ChatResponse:
+    """Run a research turn and build its response"""
+    response_data = await research_agent.get_response(
+        messages=request.messages,
+        session_id=request.session_id
+    )
+    
+    print(f"Response data: {response_data}")
+    
+    # Validate messages before creating response
+    validated_messages = []
+    for msg in response_data.get("messages", []):
+        if msg.content and msg.content.strip():
+            validated_messages.append(msg)
+        else:
+            print(f"Skipping empty message: {msg}")
+    
+    # Create response with optional interrupt fields
+    response = ChatResponse(
+        messages=validated_messages,
+        session_id=request.session_id,
+        interrupt_type=response_data.get("interrupt_type"),
+        interrupt_data=response_data.get("interrupt_data"),
+        interrupt_id=response_data.get("interrupt_id")
+    )
+    if response_data.get("error"):
+        # The run failed: answer with the error reply, but let a retry run again
+        raise UnrecordedResponse(response)
+    return response
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Streaming chat endpoint for Research agent (server-sent events)"""
+    print(f"Received research stream request: {request}")
+    
+    async def events():
+        try:
+            async for event in research_agent.stream_response(
+                messages=request.messages,
+                session_id=request.session_id
+            ):
+                yield format_sse(event)
+        except Exception as e:
+            print(f"Error in research chat stream: {e}")
+            import traceback
+            traceback.print_exc()
+            yield format_sse(StreamResponse(event="error", content=f"Error processing research chat: {str(e)}", done=True))
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so events reach the client as they are produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws/{session_id}")
+async def research_websocket(websocket: WebSocket, session_id: str):
+    """Research session over one WebSocket.
+
+    The client sends ResearchClientFrame JSON: "message" frames with new user
+    messages and "approval" frames answering a source_approval interrupt. The
+    server sends StreamResponse frames for each run: progress events, an
+    "interrupt" frame when sources need approval, then "done".
+    """
+    await websocket.accept()
+    print(f"Research WebSocket opened for session {session_id}")
+    try:
+        while True:
+            try:
+                frame = ResearchClientFrame.model_validate(await websocket.receive_json())
+                if frame.type == "approval":
+                    message, approved_ids = research_agent.approval_reply(
+                        session_id, frame.interrupt_id, frame.document_ids, frame.action
+                    )
+                else:
+                    message, approved_ids = Message(role="user", content=frame.content), None
+            except ValueError as e:
+                # Malformed JSON, invalid frames and stale approvals; the connection stays usable
+                await websocket.send_text(StreamResponse(event="error", content=str(e)).model_dump_json(exclude_none=True))
+                continue
+            
+            try:
+                async with aclosing(research_agent.stream_response([message], session_id, approved_ids)) as events:
+                    async for event in events:
+                        await websocket.send_text(event.model_dump_json(exclude_none=True))
+            except SessionBusyError as e:
+                # The session is busy with a turn from another connection or request
+                await websocket.send_text(StreamResponse(event="error", content=str(e), done=True).model_dump_json(exclude_none=True))
+    
+    except WebSocketDisconnect:
+        print(f"Research WebSocket closed for session {session_id}")
+    except Exception as e:
+        print(f"Error in research WebSocket: {e}")
+        import traceback
+        traceback.print_exc()
+        await websocket.close(code=1011)
+
+
+@router.post("/jobs", response_model=ResearchJobStatus, status_code=202)
+async def submit_job(request: ResearchJobRequest):
+    """Queue a research turn as a background job"""
+    try:
+        job = research_jobs.submit(request.messages, request.session_id)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    print(f"Queued research job {job.job_id} for session {request.session_id}")
+    return research_jobs.status(job)
+
+
+@router.get("/jobs/{job_id}", response_model=ResearchJobStatus)
+async def get_job(job_id: str):
+    """Poll a research job's status, timing and result"""
+    job = research_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Research job {job_id} not found")
+    return research_jobs.status(job)
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Subscribe to a research job's progress (server-sent events, replayed from the start)"""
+    job = research_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Research job {job_id} not found")
+    
+    async def events():
+        async for event in research_jobs.subscribe(job):
+            yield format_sse(event)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running research job"""
+    if research_jobs.cancel(job_id):
+        return {"message": f"Research job {job_id} cancelled"}
+    if research_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Research job {job_id} not found")
+    return {"message": f"Research job {job_id} already finished"}
+
+
 @router.post("/chat/new-session")
 async def new_session():
     """Create a new research chat session"""
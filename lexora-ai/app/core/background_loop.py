@@ -0,0 +1,61 @@
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+
+class BackgroundLoop:
+    """Long-lived event loop running in a daemon thread.
+
+    Services that keep loop-bound resources (connection pools, semaphores, in-flight
+    maps) run all their coroutines here, so sync callers from any thread and async
+    callers from any other loop share the same resources.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._loop is not None
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the loop on first use"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name=self.name,
+                    daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    async def run(self, coro: Coroutine) -> Any:
+        """Await a coroutine on this loop from any other event loop"""
+        loop = self.get_loop()
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def run_sync(self, coro: Coroutine) -> Any:
+        """Block the calling thread until a coroutine completes on this loop"""
+        return asyncio.run_coroutine_threadsafe(coro, self.get_loop()).result()
+
+    def submit(self, coro: Coroutine) -> "asyncio.Future":
+        """Schedule a coroutine without waiting; returns a concurrent future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.get_loop())
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop = None
@@ -0,0 +1,423 @@
+import os
+import time
+import random
+import asyncio
+import sqlite3
+import threading
+from typing import Dict, Any, Optional, Sequence, Iterator, AsyncIterator, Tuple, Set, get_args
+
+from pydantic import BaseModel
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from app.core.config import settings
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """LangGraph checkpointer on a SQLite database shared by every worker process on the host.
+
+    Laid out like InMemorySaver: a checkpoint row holds everything but the channel
+    values, and each channel value is stored once per version, so a step only
+    writes the channels it changed. Values are msgpack-encoded by the serializer
+    (Pydantic models natively, see create_checkpointer). Only the newest
+    keep_checkpoints checkpoints of a thread are kept, and threads idle for ttl
+    seconds are purged.
+    """
+
+    PURGE_EVERY = 100
+
+    def __init__(
+        self,
+        namespace: str,
+        db_path: str,
+        ttl: float = 86400.0,
+        keep_checkpoints: int = 10,
+        serde: Optional[JsonPlusSerializer] = None
+    ):
+        super().__init__(serde=serde)
+        self.namespace = namespace
+        self.db_path = db_path
+        self.ttl = ttl
+        self.keep_checkpoints = keep_checkpoints
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._stats = {"puts": 0, "writes": 0, "pruned": 0, "expirations": 0}
+
+        # Opened on first use, so building a graph at import time touches no files
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = self._connect()
+        return self._connection
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30.0)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "namespace TEXT NOT NULL, thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+            "parent_checkpoint_id TEXT, checkpoint_type TEXT NOT NULL, checkpoint BLOB NOT NULL, "
+            "metadata_type TEXT NOT NULL, metadata BLOB NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, thread_id, checkpoint_ns, checkpoint_id))"
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint_blobs ("
+            "namespace TEXT NOT NULL, thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, channel TEXT NOT NULL, "
+            "version TEXT NOT NULL, value_type TEXT NOT NULL, value BLOB NOT NULL, "
+            "PRIMARY KEY (namespace, thread_id, checkpoint_ns, channel, version))"
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint_writes ("
+            "namespace TEXT NOT NULL, thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL, "
+            "task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL, value_type TEXT NOT NULL, "
+            "value BLOB NOT NULL, task_path TEXT NOT NULL, "
+            "PRIMARY KEY (namespace, thread_id, checkpoint_ns, checkpoint_id, task_id, idx))"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS checkpoints_created_at ON checkpoints (created_at)")
+        db.commit()
+        return db
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        """Channel values for a checkpoint's channel versions (lock must be held)"""
+        values = {}
+        for channel, version in versions.items():
+            row = self._db.execute(
+                "SELECT value_type, value FROM checkpoint_blobs "
+                "WHERE namespace = ? AND thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (self.namespace, thread_id, checkpoint_ns, channel, str(version))
+            ).fetchone()
+            if row is not None and row[0] != "empty":
+                values[channel] = self.serde.loads_typed((row[0], row[1]))
+        return values
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list:
+        """Pending writes of a checkpoint in execution order (lock must be held)"""
+        rows = self._db.execute(
+            "SELECT task_id, idx, channel, value_type, value, task_path FROM checkpoint_writes "
+            "WHERE namespace = ? AND thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (self.namespace, thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+        # The order live execution applies a step's writes in: task path, task ID, index
+        rows.sort(key=lambda row: (row[5], row[0], row[1]))
+        return [(task_id, channel, self.serde.loads_typed((value_type, value))) for task_id, _, channel, value_type, value, _ in rows]
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        """Build a CheckpointTuple from a checkpoints row (lock must be held)"""
+        checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata = row
+        checkpoint_ = self.serde.loads_typed((checkpoint_type, checkpoint))
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint={
+                **checkpoint_,
+                "channel_values": self._load_blobs(thread_id, checkpoint_ns, checkpoint_["channel_versions"])
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}}
+                if parent_checkpoint_id else None
+            )
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._db.execute(
+                    f"SELECT {columns} FROM checkpoints "
+                    "WHERE namespace = ? AND thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (self.namespace, thread_id, checkpoint_ns, checkpoint_id)
+                ).fetchone()
+            else:
+                row = self._db.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE namespace = ? AND thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (self.namespace, thread_id, checkpoint_ns)
+                ).fetchone()
+            if row is None:
+                return None
+            checkpoint_tuple = self._to_tuple(thread_id, checkpoint_ns, row)
+        if checkpoint_id:
+            # Keep the caller's config, as InMemorySaver does
+            checkpoint_tuple = checkpoint_tuple._replace(config=config)
+        return checkpoint_tuple
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint, "
+            "metadata_type, metadata FROM checkpoints WHERE namespace = ?"
+        )
+        params: list = [self.namespace]
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_checkpoint_id)
+        query += " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[4], row[5]))
+                if not all(metadata.get(key) == value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            with self._lock:
+                checkpoint_tuple = self._to_tuple(thread_id, checkpoint_ns, tuple(row))
+            yield checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoint_ = checkpoint.copy()
+        values = checkpoint_.pop("channel_values")
+        blobs = [
+            (self.namespace, thread_id, checkpoint_ns, channel, str(version),
+             *(self.serde.dumps_typed(values[channel]) if channel in values else ("empty", b"")))
+            for channel, version in new_versions.items()
+        ]
+        checkpoint_type, checkpoint_data = self.serde.dumps_typed(checkpoint_)
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO checkpoint_blobs VALUES (?, ?, ?, ?, ?, ?, ?)", blobs)
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.namespace, thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 checkpoint_type, checkpoint_data, metadata_type, metadata_data, time.time())
+            )
+            self._stats["puts"] += 1
+            self._puts += 1
+            if self.keep_checkpoints > 0:
+                self._prune(thread_id, checkpoint_ns)
+            if self._puts % self.PURGE_EVERY == 0:
+                self._purge()
+            self._db.commit()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            rows.append((
+                self.namespace, thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                channel, *self.serde.dumps_typed(value), task_path
+            ))
+        with self._lock:
+            for row in rows:
+                # Regular writes are recorded once; special ones (errors, interrupts) are replaced
+                verb = "INSERT OR IGNORE" if row[5] >= 0 else "INSERT OR REPLACE"
+                self._db.execute(f"{verb} INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+            self._stats["writes"] += len(rows)
+            self._db.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                self._db.execute(f"DELETE FROM {table} WHERE namespace = ? AND thread_id = ?", (self.namespace, thread_id))
+            self._db.commit()
+
+    def _prune(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Drop all but the newest keep_checkpoints checkpoints of a thread (lock must be held)"""
+        rows = self._db.execute(
+            "SELECT checkpoint_id, checkpoint_type, checkpoint FROM checkpoints "
+            "WHERE namespace = ? AND thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC",
+            (self.namespace, thread_id, checkpoint_ns)
+        ).fetchall()
+        # Prune in batches rather than on every step
+        if len(rows) <= 2 * self.keep_checkpoints:
+            return
+        key = (self.namespace, thread_id, checkpoint_ns)
+        oldest_kept = rows[self.keep_checkpoints - 1][0]
+        self._db.execute(
+            "DELETE FROM checkpoints WHERE namespace = ? AND thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            (*key, oldest_kept)
+        )
+        self._db.execute(
+            "DELETE FROM checkpoint_writes WHERE namespace = ? AND thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            (*key, oldest_kept)
+        )
+
+        # Keep only blobs some remaining checkpoint still points at
+        referenced = set()
+        for _, checkpoint_type, checkpoint in rows[:self.keep_checkpoints]:
+            versions = self.serde.loads_typed((checkpoint_type, checkpoint))["channel_versions"]
+            referenced.update((channel, str(version)) for channel, version in versions.items())
+        stored = self._db.execute(
+            "SELECT channel, version FROM checkpoint_blobs WHERE namespace = ? AND thread_id = ? AND checkpoint_ns = ?", key
+        ).fetchall()
+        self._db.executemany(
+            "DELETE FROM checkpoint_blobs WHERE namespace = ? AND thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            [(*key, channel, version) for channel, version in stored if (channel, version) not in referenced]
+        )
+        self._stats["pruned"] += len(rows) - self.keep_checkpoints
+
+    def _purge(self) -> None:
+        """Delete threads with no checkpoint written for ttl seconds (lock must be held)"""
+        expired = self._db.execute(
+            "SELECT thread_id FROM checkpoints WHERE namespace = ? GROUP BY thread_id HAVING MAX(created_at) < ?",
+            (self.namespace, time.time() - self.ttl)
+        ).fetchall()
+        for (thread_id,) in expired:
+            for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                self._db.execute(f"DELETE FROM {table} WHERE namespace = ? AND thread_id = ?", (self.namespace, thread_id))
+        self._stats["expirations"] += len(expired)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoint_tuples = await asyncio.to_thread(lambda: [*self.list(config, filter=filter, before=before, limit=limit)])
+        for checkpoint_tuple in checkpoint_tuples:
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Same zero-padded, sortable string versions as InMemorySaver
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            threads, checkpoints = self._db.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+            blob_bytes = self._db.execute(
+                "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM checkpoint_blobs WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+            return {
+                **self._stats,
+                "backend": "sqlite",
+                "threads": threads,
+                "checkpoints": checkpoints,
+                "blob_bytes": blob_bytes
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def checkpointer_stats(checkpointer: BaseCheckpointSaver) -> Dict[str, Any]:
+    if isinstance(checkpointer, SqliteCheckpointSaver):
+        return checkpointer.stats()
+    return {"backend": "memory"}
+
+
+def _state_models(annotation: Any, found: Set[type]) -> Set[type]:
+    """Pydantic models reachable from a state schema annotation"""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        if annotation not in found:
+            found.add(annotation)
+            for field in annotation.model_fields.values():
+                _state_models(field.annotation, found)
+    for arg in get_args(annotation):
+        _state_models(arg, found)
+    return found
+
+
+def create_checkpointer(namespace: str, state_schema: type) -> BaseCheckpointSaver:
+    """Create the configured graph checkpointer for one agent ("consultation" or "research").
+
+    The state schema's Pydantic models are registered with the msgpack serializer,
+    so they are encoded natively and decoded without an unregistered-type check.
+    """
+    try:
+        serde = JsonPlusSerializer(allowed_msgpack_modules=sorted(_state_models(state_schema, set()), key=str))
+    except TypeError:  # langgraph-checkpoint before 3.0 has no allowlist and decodes any model
+        serde = JsonPlusSerializer()
+    if settings.CHECKPOINTER == "sqlite":
+        return SqliteCheckpointSaver(
+            namespace,
+            db_path=settings.CHECKPOINT_DB_PATH,
+            ttl=settings.SESSION_TTL,
+            keep_checkpoints=settings.CHECKPOINT_KEEP,
+            serde=serde
+        )
+    if settings.CHECKPOINTER != "memory":
+        raise ValueError(f"Unknown checkpointer: {settings.CHECKPOINTER}")
+    return InMemorySaver(serde=serde)
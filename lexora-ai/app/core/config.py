@@ -19,7 +19,98 @@ class Settings:
     DEFAULT_LLM_TEMPERATURE: float = float(os.getenv("DEFAULT_LLM_TEMPERATURE", "0.2"))
     MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "2000"))
     
+    # Search backend: "brave" (live Brave Search API) or "local" (offline BM25 index)
+    SEARCH_BACKEND: str = os.getenv("SEARCH_BACKEND", "brave")
+    LOCAL_INDEX_PATH: str = os.getenv("LOCAL_INDEX_PATH", "data/bm25_index")
+    
+    # Hybrid dense+lexical reranking of search results and source validation
+    HYBRID_RERANK: bool = os.getenv("HYBRID_RERANK", "true").lower() == "true"
+    HYBRID_DENSE_WEIGHT: float = float(os.getenv("HYBRID_DENSE_WEIGHT", "0.5"))
+    VECTOR_INDEX_PATH: str = os.getenv("VECTOR_INDEX_PATH", "data/vector_index")
+    VALIDATION_RELEVANCE_THRESHOLD: float = float(os.getenv("VALIDATION_RELEVANCE_THRESHOLD", "0.25"))
+    
     # Brave Search Configuration
     BRAVE_API_KEY: str = os.getenv("BRAVE_API_KEY", "")
+    BRAVE_SEARCH_TIMEOUT: float = float(os.getenv("BRAVE_SEARCH_TIMEOUT", "10.0"))
+    BRAVE_SEARCH_MAX_CONNECTIONS: int = int(os.getenv("BRAVE_SEARCH_MAX_CONNECTIONS", "20"))
+    BRAVE_SEARCH_MAX_KEEPALIVE: int = int(os.getenv("BRAVE_SEARCH_MAX_KEEPALIVE", "10"))
+    BRAVE_SEARCH_KEEPALIVE_EXPIRY: float = float(os.getenv("BRAVE_SEARCH_KEEPALIVE_EXPIRY", "30.0"))
+    
+    # Brave Search API quota (requests per second; 0 disables throttling)
+    BRAVE_SEARCH_RATE_LIMIT: float = float(os.getenv("BRAVE_SEARCH_RATE_LIMIT", "1.0"))
+    BRAVE_SEARCH_BURST: int = int(os.getenv("BRAVE_SEARCH_BURST", "1"))
+    BRAVE_SEARCH_MAX_RETRIES: int = int(os.getenv("BRAVE_SEARCH_MAX_RETRIES", "2"))
+    
+    # Search result cache (empty SEARCH_CACHE_DB_PATH keeps it memory-only)
+    SEARCH_CACHE_MAX_ENTRIES: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "512"))
+    SEARCH_CACHE_TTL: float = float(os.getenv("SEARCH_CACHE_TTL", "21600"))
+    SEARCH_CACHE_DB_PATH: str = os.getenv("SEARCH_CACHE_DB_PATH", "")
+    
+    # lex.uz document fetching (empty DOCUMENT_CACHE_DB_PATH keeps the page cache memory-only)
+    LEX_UZ_BASE_URL: str = os.getenv("LEX_UZ_BASE_URL", "https://lex.uz").rstrip("/")
+    DOCUMENT_FETCH_TIMEOUT: float = float(os.getenv("DOCUMENT_FETCH_TIMEOUT", "30.0"))
+    DOCUMENT_FETCH_MAX_CONNECTIONS: int = int(os.getenv("DOCUMENT_FETCH_MAX_CONNECTIONS", "20"))
+    DOCUMENT_FETCH_MAX_PER_HOST: int = int(os.getenv("DOCUMENT_FETCH_MAX_PER_HOST", "4"))
+    DOCUMENT_FETCH_MAX_RETRIES: int = int(os.getenv("DOCUMENT_FETCH_MAX_RETRIES", "3"))
+    DOCUMENT_FETCH_BACKOFF: float = float(os.getenv("DOCUMENT_FETCH_BACKOFF", "0.5"))
+    DOCUMENT_FETCH_MAX_RETRY_AFTER: float = float(os.getenv("DOCUMENT_FETCH_MAX_RETRY_AFTER", "30.0"))
+    DOCUMENT_CACHE_MAX_BYTES: int = int(os.getenv("DOCUMENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    DOCUMENT_CACHE_FRESH_TTL: float = float(os.getenv("DOCUMENT_CACHE_FRESH_TTL", "3600"))
+    DOCUMENT_CACHE_DB_PATH: str = os.getenv("DOCUMENT_CACHE_DB_PATH", "")
+    
+    # HTML parser backend: "lxml" (fast, used when lxml is installed) or "html.parser"
+    HTML_PARSER_BACKEND: str = os.getenv("HTML_PARSER_BACKEND", "lxml")
+    
+    # HTML parsing process pool (0 workers parses in the calling thread)
+    PARSE_WORKERS: int = int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PARSE_MAX_QUEUE: int = int(os.getenv("PARSE_MAX_QUEUE", "16"))
+    PARSE_START_METHOD: str = os.getenv("PARSE_START_METHOD", "spawn")
+    
+    # Cross-session parsed-document store (empty DB path keeps it memory-only)
+    PARSED_DOCUMENT_STORE_MAX_BYTES: int = int(os.getenv("PARSED_DOCUMENT_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+    PARSED_DOCUMENT_STORE_CURRENT_TTL: float = float(os.getenv("PARSED_DOCUMENT_STORE_CURRENT_TTL", "86400"))
+    PARSED_DOCUMENT_STORE_DB_PATH: str = os.getenv("PARSED_DOCUMENT_STORE_DB_PATH", "")
+    PARSED_DOCUMENT_STORE_DISK_MAX_BYTES: int = int(os.getenv("PARSED_DOCUMENT_STORE_DISK_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+    
+    # Edition history of acts as base text plus deltas (empty DB path keeps it memory-only)
+    EDITION_STORE_MAX_BYTES: int = int(os.getenv("EDITION_STORE_MAX_BYTES", str(128 * 1024 * 1024)))
+    EDITION_STORE_DB_PATH: str = os.getenv("EDITION_STORE_DB_PATH", "")
+    
+    # Compressed, memory-mapped corpus of pre-parsed documents (see app/tools/document_corpus.py)
+    DOCUMENT_CORPUS_PATH: str = os.getenv("DOCUMENT_CORPUS_PATH", "")
+    
+    # Speculative prefetch of top search hits
+    PREFETCH_ENABLED: bool = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+    PREFETCH_TOP_N: int = int(os.getenv("PREFETCH_TOP_N", "2"))
+    PREFETCH_MAX_CONCURRENCY: int = int(os.getenv("PREFETCH_MAX_CONCURRENCY", "2"))
+    
+    # Question-aware passage retrieval from parsed documents
+    PASSAGE_TOP_K: int = int(os.getenv("PASSAGE_TOP_K", "6"))
+    PASSAGE_TOKEN_BUDGET: int = int(os.getenv("PASSAGE_TOKEN_BUDGET", "1500"))
+    PASSAGE_CACHE_SIZE: int = int(os.getenv("PASSAGE_CACHE_SIZE", "64"))
+    
+    # Research multi-search fan-out
+    MULTI_SEARCH_CONCURRENCY: int = int(os.getenv("MULTI_SEARCH_CONCURRENCY", "5"))
+    MULTI_SEARCH_QUERY_DEADLINE: float = float(os.getenv("MULTI_SEARCH_QUERY_DEADLINE", "12.0"))
+    
+    # Chat session storage: "memory" (per process) or "sqlite" (shared by all worker processes)
+    SESSION_STORE: str = os.getenv("SESSION_STORE", "memory")
+    SESSION_STORE_DB_PATH: str = os.getenv("SESSION_STORE_DB_PATH", "data/sessions.db")
+    SESSION_TTL: float = float(os.getenv("SESSION_TTL", "86400"))
+    SESSION_STORE_MAX_BYTES: int = int(os.getenv("SESSION_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+    # Turns a session may have in flight (running one included) before new ones are rejected
+    SESSION_MAX_PENDING_TURNS: int = int(os.getenv("SESSION_MAX_PENDING_TURNS", "2"))
+    # Responses to chat requests with an Idempotency-Key header are replayed for this many seconds
+    IDEMPOTENCY_TTL: float = float(os.getenv("IDEMPOTENCY_TTL", "600"))
+
+    # Agent graph checkpoints: "sqlite" (durable, shared by all worker processes) or "memory"
+    CHECKPOINTER: str = os.getenv("CHECKPOINTER", "sqlite")
+    CHECKPOINT_DB_PATH: str = os.getenv("CHECKPOINT_DB_PATH", "data/checkpoints.db")
+    CHECKPOINT_KEEP: int = int(os.getenv("CHECKPOINT_KEEP", "10"))
+
+    # Background research jobs (finished jobs stay pollable for RESEARCH_JOB_TTL seconds)
+    RESEARCH_JOB_WORKERS: int = int(os.getenv("RESEARCH_JOB_WORKERS", "2"))
+    RESEARCH_JOB_MAX_QUEUE: int = int(os.getenv("RESEARCH_JOB_MAX_QUEUE", "20"))
+    RESEARCH_JOB_TTL: float = float(os.getenv("RESEARCH_JOB_TTL", "3600"))
 
 settings = Settings()
\ No newline at end of file
@@ -1,57 +1,134 @@
-from typing import List, Dict
+import uuid
+import asyncio
+from typing import List, Dict, Any, Tuple, AsyncIterator
 from langchain_core.messages import HumanMessage, AIMessage
 
 from app.agents.consultation_agent import graph
-from app.schemas.chat import Message
+from app.schemas.chat import Message, ChatResponse, StreamResponse
+from app.core.session_store import create_session_store
+from app.core.streaming import stream_graph_events
+from app.core.session_turns import SessionTurnQueue, turn_key
+from app.core.config import settings
+from app.tools.document_parser import legal_parser_instance
 
 class ConsultationEngine:
     def __init__(self):
         self.graph = graph
-        # Simple in-memory session storage
-        self._sessions: Dict[str, List[Message]] = {}
+        # Session histories (in-process LRU or SQLite shared across workers)
+        self.sessions = create_session_store("consultation")
+        # One turn at a time per session; duplicate submits share the run in flight
+        self.turns = SessionTurnQueue(settings.SESSION_MAX_PENDING_TURNS)
     
     async def get_response(self, messages: List[Message], session_id: str) -> List[Message]:
         """Get response from consultation agent with session persistence"""
+        return await self.turns.run(session_id, turn_key(messages), lambda: self._run_turn(messages, session_id))
+    
+    async def _run_turn(self, messages: List[Message], session_id: str) -> List[Message]:
+        session_history, turn_input, config = await self._prepare_turn(messages, session_id)
         
-        # Get or create session history
-        if session_id not in self._sessions:
-            self._sessions[session_id] = []
-        
-        session_history = self._sessions[session_id]
+        # Run the graph
+        try:
+            result = await self.graph.ainvoke(turn_input, config)
+        except (Exception, asyncio.CancelledError):
+            await self._save_unfinished_turn(session_id, session_history, turn_input, config)
+            raise
         
-        # Remember how many assistant messages we had before processing
-        previous_assistant_count = len([msg for msg in session_history if msg.role == "assistant"])
+        return self._finish_turn(session_id, session_history, turn_input, result)
+    
+    async def stream_response(self, messages: List[Message], session_id: str) -> AsyncIterator[StreamResponse]:
+        """Like get_response, but yields tokens, tool events and messages as the graph produces them"""
+        yield StreamResponse(event="start")
+        async with self.turns.hold(session_id, turn_key(messages)):
+            session_history, turn_input, config = await self._prepare_turn(messages, session_id)
+            
+            try:
+                async for event in stream_graph_events(self.graph, turn_input, config):
+                    yield event
+            except (Exception, asyncio.CancelledError, GeneratorExit):
+                # Also reached when the client goes away mid-stream
+                await self._save_unfinished_turn(session_id, session_history, turn_input, config)
+                raise
+            
+            result = (await self.graph.aget_state(config)).values
+            response_messages = self._finish_turn(session_id, session_history, turn_input, result)
+        yield StreamResponse(
+            event="done",
+            done=True,
+            response=ChatResponse(messages=response_messages, session_id=session_id)
+        )
+    
+    async def _prepare_turn(self, messages: List[Message], session_id: str) -> Tuple[List[Message], Dict[str, Any], Dict[str, Any]]:
+        """Session history, graph input and config for a turn"""
         
-        # Add new user messages to session history
-        for msg in messages:
-            if msg not in session_history:  # Avoid duplicates
-                session_history.append(msg)
+        # Get or create session history
+        session_history: List[Message] = self.sessions.get(session_id)
+        if session_history is None:
+            # New or expired session: don't continue a stale checkpointed thread
+            await self.graph.checkpointer.adelete_thread(session_id)
+            session_history = []
         
-        # Convert ALL session messages to LangGraph format (for context)
+        # Only messages the thread hasn't seen yet go to the graph; the checkpointer
+        # restores the rest of the conversation
         langgraph_messages = []
-        for msg in session_history:
+        for msg in messages:
+            if msg in session_history:  # Avoid duplicates
+                continue
+            session_history.append(msg)
             if msg.role == "user":
-                langgraph_messages.append(HumanMessage(content=msg.content))
+                langgraph_messages.append(HumanMessage(content=msg.content, id=str(uuid.uuid4())))
             elif msg.role == "assistant":
-                langgraph_messages.append(AIMessage(content=msg.content))
+                langgraph_messages.append(AIMessage(content=msg.content, id=str(uuid.uuid4())))
         
-        # Create state with full conversation history
-        initial_state = {
+        # Turn input: new messages plus per-turn fields; search results and parsed
+        # documents carry over from earlier turns in the checkpoint
+        turn_input = {
             "messages": langgraph_messages,
-            "remaining_steps": 10,
-            "search_results": [],
-            "parsed_documents": {}
+            "remaining_steps": 10
         }
-        
-        # Run the graph
         config = {"configurable": {"thread_id": session_id}}
-        result = await self.graph.ainvoke(initial_state, config)
+        return session_history, turn_input, config
+    
+    async def _save_unfinished_turn(
+        self,
+        session_id: str,
+        session_history: List[Message],
+        turn_input: Dict[str, Any],
+        config: Dict[str, Any]
+    ) -> None:
+        """Keep the session in step with the thread after a failed or cancelled run.
+        
+        The checkpointer saves the turn's input before the agent runs; if the session
+        didn't record those messages too, a retry would add them to the thread twice.
+        """
+        sent_ids = {msg.id for msg in turn_input["messages"]}
+        if not sent_ids:
+            return
+        state = await self.graph.aget_state(config)
+        if any(msg.id in sent_ids for msg in state.values.get("messages", [])):
+            self.sessions.set(session_id, session_history)
+    
+    def _finish_turn(
+        self,
+        session_id: str,
+        session_history: List[Message],
+        turn_input: Dict[str, Any],
+        result: Dict[str, Any]
+    ) -> List[Message]:
+        """Save the turn's messages to the session and return the new assistant message"""
+        langgraph_messages = turn_input["messages"]
+        
+        # Messages produced by this turn follow the last message we sent
+        new_graph_messages = result["messages"]
+        if langgraph_messages:
+            sent_ids = {msg.id for msg in langgraph_messages}
+            last_sent = max(i for i, msg in enumerate(result["messages"]) if msg.id in sent_ids)
+            new_graph_messages = result["messages"][last_sent + 1:]
         
         # Convert back to API format - but only return NEW assistant messages
         all_messages = []
-        print(f"Total messages from graph: {len(result['messages'])}")
+        print(f"New messages from graph: {len(new_graph_messages)} (thread total: {len(result['messages'])})")
         
-        for i, msg in enumerate(result["messages"]):
+        for i, msg in enumerate(new_graph_messages):
             print(f"Message {i}: type={type(msg)}, content={repr(getattr(msg, 'content', 'NO_CONTENT'))}")
             
             # Check if message has content and it's not empty
@@ -103,7 +180,7 @@ class ConsultationEngine:
                 session_history.append(msg)
         
         # Update session storage
-        self._sessions[session_id] = session_history
+        self.sessions.set(session_id, session_history)
         
         # Return only the LATEST assistant message (there should be only one new one)
         assistant_messages = [msg for msg in all_messages if msg.role == "assistant"]
@@ -115,11 +192,11 @@ class ConsultationEngine:
     
     def get_session_history(self, session_id: str) -> List[Message]:
         """Get conversation history for a session"""
-        return self._sessions.get(session_id, [])
+        return self.sessions.get(session_id) or []
     
     def clear_session(self, session_id: str) -> bool:
         """Clear conversation history for a session"""
-        if session_id in self._sessions:
-            del self._sessions[session_id]
-            return True
-        return False
\ No newline at end of file
+        # Stop speculative document parsing nobody will ask for anymore
+        legal_parser_instance.cancel_prefetch(session_id)
+        self.graph.checkpointer.delete_thread(session_id)
+        return self.sessions.delete(session_id)
\ No newline at end of file
@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+from typing import Dict, Any, Tuple, Callable, Awaitable
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.session_store import create_session_store
+from app.schemas.chat import ChatResponse
+
+
+class IdempotencyKeyReusedError(Exception):
+    """Raised when an Idempotency-Key is sent again with a different request body"""
+
+
+class UnrecordedResponse(Exception):
+    """Raised by a run to answer its callers without recording the response (e.g. an error reply)"""
+
+    def __init__(self, response: ChatResponse):
+        super().__init__("Response not recorded")
+        self.response = response
+
+
+def request_fingerprint(request: BaseModel) -> str:
+    return hashlib.sha256(request.model_dump_json().encode("utf-8")).hexdigest()
+
+
+class IdempotentResponses:
+    """Responses of chat requests sent with an Idempotency-Key header.
+
+    A retry with the same key gets the original ChatResponse for ttl seconds, or
+    waits on the original run if it is still in flight, instead of running the
+    agent again. Completed responses live in the configured session store (so
+    SQLite shares them across workers); runs in flight are tracked per process.
+    Failed runs, and runs answering with UnrecordedResponse, are not recorded, so
+    a retry after an error runs again.
+    """
+
+    def __init__(self, namespace: str, ttl: float = 600.0):
+        self.responses = create_session_store(f"idempotency-{namespace}", ttl=ttl)
+        # key -> (request fingerprint, run)
+        self._in_flight: Dict[str, Tuple[str, asyncio.Task]] = {}
+        self._stats = {"runs": 0, "replayed": 0, "attached": 0, "conflicts": 0}
+
+    async def run(self, key: str, request: BaseModel, fn: Callable[[], Awaitable[ChatResponse]]) -> ChatResponse:
+        """Response for the request with this key, running fn only for a new key"""
+        fingerprint = request_fingerprint(request)
+
+        stored = self.responses.get(key)
+        if stored is not None:
+            self._check(key, stored["fingerprint"], fingerprint)
+            self._stats["replayed"] += 1
+            return stored["response"]
+
+        if key in self._in_flight:
+            running_fingerprint, task = self._in_flight[key]
+            self._check(key, running_fingerprint, fingerprint)
+            self._stats["attached"] += 1
+            return await self._result(task)
+
+        # The run outlives a disconnected caller so the retry can attach to it
+        task = asyncio.ensure_future(fn())
+        self._in_flight[key] = (fingerprint, task)
+        self._stats["runs"] += 1
+
+        def finished(done: asyncio.Task) -> None:
+            self._in_flight.pop(key, None)
+            if not done.cancelled() and done.exception() is None:
+                self.responses.set(key, {"fingerprint": fingerprint, "response": done.result()})
+
+        task.add_done_callback(finished)
+        return await self._result(task)
+
+    @staticmethod
+    async def _result(task: asyncio.Task) -> ChatResponse:
+        try:
+            return await asyncio.shield(task)
+        except UnrecordedResponse as e:
+            return e.response
+
+    def _check(self, key: str, expected: str, fingerprint: str) -> None:
+        if expected != fingerprint:
+            self._stats["conflicts"] += 1
+            raise IdempotencyKeyReusedError(f"Idempotency-Key {key} was already used for a different request")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "in_flight": len(self._in_flight), "store": self.responses.stats()}
+
+
+def create_idempotent_responses(namespace: str) -> IdempotentResponses:
+    """Idempotent response store for one chat router ("consultation" or "research")"""
+    return IdempotentResponses(namespace, ttl=settings.IDEMPOTENCY_TTL)
@@ -1,55 +1,129 @@
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple, AsyncIterator
 import uuid
 import re
+import asyncio
 from langchain_core.messages import HumanMessage, AIMessage
 from langgraph.errors import NodeInterrupt
 
 from app.agents.research_agent import graph
-from app.schemas.chat import Message
+from app.schemas.chat import Message, ChatResponse, StreamResponse
+from app.core.session_store import create_session_store
+from app.core.streaming import stream_graph_events
+from app.core.session_turns import SessionTurnQueue, turn_key
+from app.core.config import settings
+from app.tools.document_parser import legal_parser_instance
 from app.schemas.research_state import ValidationResult
 
 
 class ResearchAgentWrapper:
     def __init__(self):
         self.graph = graph
-        # Simple in-memory session storage
-        self._sessions: Dict[str, Dict] = {}
+        # Session history and graph state (in-process LRU or SQLite shared across workers)
+        self.sessions = create_session_store("research")
+        # One turn at a time per session; duplicate submits share the run in flight
+        self.turns = SessionTurnQueue(settings.SESSION_MAX_PENDING_TURNS)
 
     async def get_response(self, messages: List[Message], session_id: str) -> Dict[str, Any]:
         """Get response from research agent with session persistence and interrupt handling"""
+        return await self.turns.run(session_id, turn_key(messages), lambda: self._run_turn(messages, session_id))
+    
+    async def _run_turn(self, messages: List[Message], session_id: str) -> Dict[str, Any]:
+        session, turn_input, config = await self._prepare_turn(messages, session_id)
+        
+        try:
+            result = await self.graph.ainvoke(turn_input, config)
+            return await self._finish_turn(session_id, session, turn_input, config, result)
+        except NodeInterrupt as interrupt:
+            return self._interrupted_turn(session_id, session, interrupt)
+        except Exception as e:
+            return self._failed_turn(session_id, session, e)
+    
+    async def stream_response(
+        self,
+        messages: List[Message],
+        session_id: str,
+        approved_ids: Optional[List[str]] = None
+    ) -> AsyncIterator[StreamResponse]:
+        """Like get_response, but yields tokens, tool events and messages as the graph produces them.
+
+        approved_ids marks the turn as an explicit source approval reply (see approval_reply).
+        """
+        yield StreamResponse(event="start")
+        async with self.turns.hold(session_id, turn_key(messages)):
+            session, turn_input, config = await self._prepare_turn(messages, session_id, approved_ids)
+            
+            try:
+                async for event in stream_graph_events(self.graph, turn_input, config):
+                    yield event
+                result = (await self.graph.aget_state(config)).values
+                response_data = await self._finish_turn(session_id, session, turn_input, config, result)
+            except NodeInterrupt as interrupt:
+                response_data = self._interrupted_turn(session_id, session, interrupt)
+            except asyncio.CancelledError:
+                # Client went away or the job was cancelled: keep the session in step
+                # with the thread, which already has the new messages
+                self.sessions.set(session_id, session)
+                raise
+            except Exception as e:
+                response_data = self._failed_turn(session_id, session, e)
+        
+        if response_data.get("interrupt_type"):
+            yield StreamResponse(
+                event="interrupt",
+                data={key: response_data[key] for key in ("interrupt_type", "interrupt_id", "interrupt_data")}
+            )
+        yield StreamResponse(
+            event="done",
+            done=True,
+            response=ChatResponse(session_id=session_id, **response_data)
+        )
+    
+    async def _prepare_turn(
+        self,
+        messages: List[Message],
+        session_id: str,
+        approved_ids: Optional[List[str]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+        """Session, graph input and config for a turn"""
         
         # Get or create session history
-        if session_id not in self._sessions:
-            self._sessions[session_id] = {
+        session = self.sessions.get(session_id)
+        if session is None:
+            # New or expired session: don't continue a stale checkpointed thread
+            await self.graph.checkpointer.adelete_thread(session_id)
+            session = {
                 "messages": [],
                 "state": None,
                 "pending_interrupt": None
             }
-        
-        session = self._sessions[session_id]
         session_history = session["messages"]
         
-        # Add new user messages to session history
-        for msg in messages:
-            if msg not in session_history:  # Avoid duplicates
-                session_history.append(msg)
-        
-        # Convert ALL session messages to LangGraph format
+        # Only messages the thread hasn't seen yet go to the graph; the checkpointer
+        # restores the rest of the conversation
         langgraph_messages = []
-        for msg in session_history:
+        for msg in messages:
+            if msg in session_history:  # Avoid duplicates
+                continue
+            session_history.append(msg)
             if msg.role == "user":
-                langgraph_messages.append(HumanMessage(content=msg.content))
+                langgraph_messages.append(HumanMessage(content=msg.content, id=str(uuid.uuid4())))
             elif msg.role == "assistant":
-                langgraph_messages.append(AIMessage(content=msg.content))
+                langgraph_messages.append(AIMessage(content=msg.content, id=str(uuid.uuid4())))
         
-        # Check if we're handling an approval response
+        # Check if we're handling an approval response (explicit over a typed
+        # connection, otherwise guessed from the message text)
         latest_user_message = messages[-1].content.lower() if messages else ""
-        is_approval_response = self._is_approval_message(latest_user_message)
+        if approved_ids is None:
+            is_approval_response = self._is_approval_message(latest_user_message)
+            if is_approval_response:
+                approved_ids = self._parse_approval_message(latest_user_message)
+        else:
+            is_approval_response = True
         
-        # Create or update state
+        # Create turn input
         if session["state"] is None:
             # First interaction - create initial state
-            initial_state = {
+            turn_input = {
                 "messages": langgraph_messages,
                 "current_user_question": messages[0].content if messages else "",
                 "remaining_steps": 20,
@@ -74,164 +148,227 @@ class ResearchAgentWrapper:
                 "needs_additional_search": False,
                 "suggested_queries": []
             }
-            session["state"] = initial_state
         else:
-            # Update existing state with new messages and feedback
-            session["state"]["messages"] = langgraph_messages
+            # Later turns send new messages and feedback; the rest of the state is checkpointed
+            turn_input = {"messages": langgraph_messages, "remaining_steps": 20}
             if messages:
-                session["state"]["human_feedback"] = messages[-1].content
+                turn_input["human_feedback"] = messages[-1].content
                 
                 # If it's an approval response, parse it
                 if is_approval_response:
-                    approved_ids = self._parse_approval_message(latest_user_message)
-                    session["state"]["approved_document_ids"] = approved_ids
-                    session["state"]["pending_approval"] = False
-                    session["state"]["workflow_stage"] = "sources_approved"
+                    turn_input["approved_document_ids"] = approved_ids
+                    turn_input["pending_approval"] = False
+                    turn_input["workflow_stage"] = "sources_approved"
+                    session["pending_interrupt"] = None
+        
+        # Session keeps a snapshot of the non-message state for interrupts and restores
+        session["state"] = {
+            **(session["state"] or {}),
+            **{key: value for key, value in turn_input.items() if key != "messages"}
+        }
         
-        # Run the graph
         config = {"configurable": {"thread_id": session_id}}
+        print(f"Invoking graph with state: pending_approval={session['state'].get('pending_approval', False)}")
+        print(f"DEBUG: Pre-invoke validation_results count: {len(session['state'].get('validation_results', []))}")
+        return session, turn_input, config
+    
+    async def _finish_turn(
+        self,
+        session_id: str,
+        session: Dict[str, Any],
+        turn_input: Dict[str, Any],
+        config: Dict[str, Any],
+        result: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Save the turn to the session and build the response, with interrupt data if approval is pending"""
+        session_history = session["messages"]
+        langgraph_messages = turn_input["messages"]
+        print(f"Graph result: pending_approval={result.get('pending_approval', False)}, workflow_stage={result.get('workflow_stage', 'unknown')}")
+        print(f"DEBUG: Post-invoke validation_results count: {len(result.get('validation_results', []))}")
         
-        try:
-            print(f"Invoking graph with state: pending_approval={session['state'].get('pending_approval', False)}")
-            print(f"DEBUG: Pre-invoke validation_results count: {len(session['state'].get('validation_results', []))}")
-            result = await self.graph.ainvoke(session["state"], config)
-            print(f"Graph result: pending_approval={result.get('pending_approval', False)}, workflow_stage={result.get('workflow_stage', 'unknown')}")
-            print(f"DEBUG: Post-invoke validation_results count: {len(result.get('validation_results', []))}")
-            
-            # Preserve critical state that might be lost during graph execution
-            preserved_state = {
-                "validation_results": session["state"].get("validation_results", []),
-                "raw_search_results": session["state"].get("raw_search_results", []),
-                "search_queries_executed": session["state"].get("search_queries_executed", []),
-                "current_user_question": session["state"].get("current_user_question", "")
-            }
-            
-            # Update session state but preserve critical fields if they're missing from result
-            session["state"] = result
-            
-            # Restore preserved state if it's missing from the result
-            for key, value in preserved_state.items():
-                if not session["state"].get(key) and value:
-                    session["state"][key] = value
-                    print(f"DEBUG: Restored {key} with {len(value) if isinstance(value, list) else type(value)} items/value")
-            
-            # Extract assistant messages and check for interrupts
-            new_assistant_messages = []
-            interrupt_data = None
+        # Preserve critical state that might be lost during graph execution
+        preserved_state = {
+            "validation_results": session["state"].get("validation_results", []),
+            "raw_search_results": session["state"].get("raw_search_results", []),
+            "search_queries_executed": session["state"].get("search_queries_executed", []),
+            "current_user_question": session["state"].get("current_user_question", "")
+        }
+        
+        # Update session state but preserve critical fields if they're missing from result
+        session["state"] = {key: value for key, value in result.items() if key != "messages"}
+        
+        # Restore preserved state if it's missing from the result
+        restored_state = {}
+        for key, value in preserved_state.items():
+            if not session["state"].get(key) and value:
+                session["state"][key] = value
+                restored_state[key] = value
+                print(f"DEBUG: Restored {key} with {len(value) if isinstance(value, list) else type(value)} items/value")
+        if restored_state:
+            # Write restored fields back to the thread so later turns see them
+            await self.graph.aupdate_state(config, restored_state)
+        
+        # Messages produced by this turn follow the last message we sent
+        new_graph_messages = result["messages"]
+        if langgraph_messages:
+            sent_ids = {msg.id for msg in langgraph_messages}
+            last_sent = max(i for i, msg in enumerate(result["messages"]) if msg.id in sent_ids)
+            new_graph_messages = result["messages"][last_sent + 1:]
+        
+        # Extract assistant messages and check for interrupts
+        new_assistant_messages = []
+        interrupt_data = None
+        
+        for msg in new_graph_messages:
+            if hasattr(msg, 'content') and msg.content and msg.content.strip():
+                # Handle AI messages (regular responses)
+                if isinstance(msg, AIMessage) or (hasattr(msg, 'type') and msg.type == "ai"):
+                    try:
+                        clean_content = msg.content.strip()
+                        if len(clean_content) > 0:
+                            message_obj = Message(role="assistant", content=clean_content)
+                            # Only add if it's not already in session
+                            if message_obj not in session_history:
+                                new_assistant_messages.append(message_obj)
+                                session_history.append(message_obj)
+                    except Exception as e:
+                        print(f"Skipping AI message due to validation error: {e}")
+                        continue
+                
+                # Handle tool messages that contain artifacts (from create_legal_analysis_from_approved_sources)
+                elif ((hasattr(msg, 'type') and msg.type == "tool") or 
+                      (hasattr(msg, '__class__') and 'ToolMessage' in str(msg.__class__))) and "<artifact" in msg.content:
+                    try:
+                        clean_content = msg.content.strip()
+                        if len(clean_content) > 0:
+                            message_obj = Message(role="assistant", content=clean_content)
+                            # Only add if it's not already in session
+                            if message_obj not in session_history:
+                                new_assistant_messages.append(message_obj)
+                                session_history.append(message_obj)
+                                print(f"DEBUG: Added artifact ToolMessage to response: {clean_content[:100]}...")
+                    except Exception as e:
+                        print(f"Skipping ToolMessage due to validation error: {e}")
+                        continue
+        
+        # Check for pending approval (interrupt)
+        interrupt_data = None
+        current_user_question = session["state"].get("current_user_question", "")
+        
+        if result.get("pending_approval", False):
+            print(f"Pending approval detected: {result.get('workflow_stage', 'unknown')}")
             
-            for msg in result["messages"]:
-                if hasattr(msg, 'content') and msg.content and msg.content.strip():
-                    # Handle AI messages (regular responses)
-                    if isinstance(msg, AIMessage) or (hasattr(msg, 'type') and msg.type == "ai"):
-                        try:
-                            clean_content = msg.content.strip()
-                            if len(clean_content) > 0:
-                                message_obj = Message(role="assistant", content=clean_content)
-                                # Only add if it's not already in session
-                                if message_obj not in session_history:
-                                    new_assistant_messages.append(message_obj)
-                                    session_history.append(message_obj)
-                        except Exception as e:
-                            print(f"Skipping AI message due to validation error: {e}")
-                            continue
-                    
-                    # Handle tool messages that contain artifacts (from create_legal_analysis_from_approved_sources)
-                    elif ((hasattr(msg, 'type') and msg.type == "tool") or 
-                          (hasattr(msg, '__class__') and 'ToolMessage' in str(msg.__class__))) and "<artifact" in msg.content:
-                        try:
-                            clean_content = msg.content.strip()
-                            if len(clean_content) > 0:
-                                message_obj = Message(role="assistant", content=clean_content)
-                                # Only add if it's not already in session
-                                if message_obj not in session_history:
-                                    new_assistant_messages.append(message_obj)
-                                    session_history.append(message_obj)
-                                    print(f"DEBUG: Added artifact ToolMessage to response: {clean_content[:100]}...")
-                        except Exception as e:
-                            print(f"Skipping ToolMessage due to validation error: {e}")
-                            continue
+            if result.get("workflow_stage") == "no_relevant_sources":
+                # Handle no relevant sources case
+                interrupt_data = {
+                    "interrupt_type": "source_approval",
+                    "interrupt_id": str(uuid.uuid4()),
+                    "interrupt_data": {
+                        "sources": [],
+                        "total_sources": 0,
+                        "question": current_user_question,
+                        "no_relevant_sources": True,
+                        "total_found": len(result.get("validation_results", []))
+                    }
+                }
+            else:
+                # Handle normal source approval
+                interrupt_data = self._create_source_approval_interrupt(result)
+        
+        # Update session
+        session["pending_interrupt"] = interrupt_data
+        self.sessions.set(session_id, session)
+        
+        # Prepare response - send ALL new assistant messages (including artifacts)
+        response_data = {
+            "messages": new_assistant_messages if new_assistant_messages else []
+        }
+        print(f"DEBUG: Sending {len(new_assistant_messages)} messages to UI")
+        
+        # Add interrupt data if present
+        if interrupt_data:
+            response_data.update(interrupt_data)
+            print(f"Interrupt data added: {interrupt_data}")
+        
+        return response_data
+    
+    def _interrupted_turn(self, session_id: str, session: Dict[str, Any], interrupt: NodeInterrupt) -> Dict[str, Any]:
+        """Response for a run stopped by a LangGraph interrupt"""
+        # Handle LangGraph interrupts
+        print(f"LangGraph interrupt detected: {interrupt}")
+        session_history = session["messages"]
+        
+        # Check if it's a source approval interrupt
+        if "approval" in str(interrupt).lower():
+            interrupt_data = self._create_source_approval_interrupt(session["state"])
             
-            # Check for pending approval (interrupt)
-            interrupt_data = None
-            current_user_question = session["state"].get("current_user_question", "")
+            # Create a message explaining the interrupt
+            approval_message = self._format_approval_message(session["state"])
+            message_obj = Message(role="assistant", content=approval_message)
             
-            if result.get("pending_approval", False):
-                print(f"Pending approval detected: {result.get('workflow_stage', 'unknown')}")
-                
-                if result.get("workflow_stage") == "no_relevant_sources":
-                    # Handle no relevant sources case
-                    interrupt_data = {
-                        "interrupt_type": "source_approval",
-                        "interrupt_id": str(uuid.uuid4()),
-                        "interrupt_data": {
-                            "sources": [],
-                            "total_sources": 0,
-                            "question": current_user_question,
-                            "no_relevant_sources": True,
-                            "total_found": len(result.get("validation_results", []))
-                        }
-                    }
-                else:
-                    # Handle normal source approval
-                    interrupt_data = self._create_source_approval_interrupt(result)
+            if message_obj not in session_history:
+                session_history.append(message_obj)
             
             # Update session
-            self._sessions[session_id] = session
+            session["pending_interrupt"] = interrupt_data or None
+            self.sessions.set(session_id, session)
             
-            # Prepare response - send ALL new assistant messages (including artifacts)
             response_data = {
-                "messages": new_assistant_messages if new_assistant_messages else []
+                "messages": [message_obj]
             }
-            print(f"DEBUG: Sending {len(new_assistant_messages)} messages to UI")
-            
-            # Add interrupt data if present
-            if interrupt_data:
-                response_data.update(interrupt_data)
-                print(f"Interrupt data added: {interrupt_data}")
+            response_data.update(interrupt_data)
             
             return response_data
-            
-        except NodeInterrupt as interrupt:
-            # Handle LangGraph interrupts
-            print(f"LangGraph interrupt detected: {interrupt}")
-            
-            # Check if it's a source approval interrupt
-            if "approval" in str(interrupt).lower():
-                interrupt_data = self._create_source_approval_interrupt(session["state"])
-                
-                # Create a message explaining the interrupt
-                approval_message = self._format_approval_message(session["state"])
-                message_obj = Message(role="assistant", content=approval_message)
-                
-                if message_obj not in session_history:
-                    session_history.append(message_obj)
-                
-                # Update session
-                self._sessions[session_id] = session
-                
-                response_data = {
-                    "messages": [message_obj]
-                }
-                response_data.update(interrupt_data)
-                
-                return response_data
-            
-            # Handle other types of interrupts
-            return {
-                "messages": [Message(
-                    role="assistant", 
-                    content="I need your input to continue. Please provide your feedback."
-                )]
-            }
-            
-        except Exception as e:
-            print(f"Error in research agent: {e}")
-            return {
-                "messages": [Message(
-                    role="assistant", 
-                    content=f"Sorry, I encountered an error: {str(e)}"
-                )]
-            }
+        
+        # Handle other types of interrupts
+        self.sessions.set(session_id, session)
+        return {
+            "messages": [Message(
+                role="assistant", 
+                content="I need your input to continue. Please provide your feedback."
+            )]
+        }
+    
+    def _failed_turn(self, session_id: str, session: Dict[str, Any], e: Exception) -> Dict[str, Any]:
+        """Response for a failed run"""
+        print(f"Error in research agent: {e}")
+        # Keep the user's messages even though the run failed
+        self.sessions.set(session_id, session)
+        return {
+            "messages": [Message(
+                role="assistant", 
+                content=f"Sorry, I encountered an error: {str(e)}"
+            )],
+            # Marks the reply as an error, so it isn't replayed to idempotent retries
+            "error": str(e)
+        }
+
+    def approval_reply(
+        self,
+        session_id: str,
+        interrupt_id: Optional[str],
+        document_ids: List[str],
+        action: Optional[str] = None
+    ) -> Tuple[Message, List[str]]:
+        """User message and approved IDs for an explicit reply to the pending source approval.
+
+        action is "all", "none", "retry", "broaden" or "proceed"; without one the
+        listed document IDs are approved. Raises ValueError if the session has no
+        pending approval or the reply is for an older one.
+        """
+        session = self.sessions.get(session_id)
+        pending = session.get("pending_interrupt") if session else None
+        if not pending:
+            raise ValueError("No source approval is pending for this session")
+        if interrupt_id and interrupt_id != pending.get("interrupt_id"):
+            raise ValueError(f"Interrupt {interrupt_id} is no longer pending")
+        
+        # Same wording as the web UI, so the agent sees a familiar reply
+        if action == "none" or (action is None and not document_ids):
+            return Message(role="user", content="none"), []
+        if action is not None:
+            return Message(role="user", content=action), [action]
+        return Message(role="user", content=f"approved: {', '.join(document_ids)}"), list(document_ids)
 
     def _is_approval_message(self, message: str) -> bool:
         """Check if message is an approval response"""
@@ -312,13 +449,12 @@ class ResearchAgentWrapper:
 
     def get_session_history(self, session_id: str) -> List[Message]:
         """Get conversation history for a session"""
-        if session_id in self._sessions:
-            return self._sessions[session_id]["messages"]
-        return []
+        session = self.sessions.get(session_id)
+        return session["messages"] if session else []
 
     def clear_session(self, session_id: str) -> bool:
         """Clear conversation history for a session"""
-        if session_id in self._sessions:
-            del self._sessions[session_id]
-            return True
-        return False
\ No newline at end of file
+        # Stop speculative document parsing nobody will ask for anymore
+        legal_parser_instance.cancel_prefetch(session_id)
+        self.graph.checkpointer.delete_thread(session_id)
+        return self.sessions.delete(session_id)
\ No newline at end of file
@@ -0,0 +1,209 @@
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, AsyncIterator
+
+from app.core.research_agent import ResearchAgentWrapper
+from app.schemas.chat import Message, StreamResponse
+from app.schemas.jobs import ResearchJobStatus
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class ResearchJob:
+    """One research turn run in the background, with its progress events"""
+
+    def __init__(self, messages: List[Message], session_id: str):
+        self.job_id = str(uuid.uuid4())
+        self.messages = messages
+        self.session_id = session_id
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        # Every event of the run, replayed to late subscribers
+        self.events: List[StreamResponse] = []
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def add_event(self, event: StreamResponse) -> None:
+        self.events.append(event)
+        self._notify()
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self._notify()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_change(self) -> None:
+        await self._changed.wait()
+
+    def to_status(self, queue_position: Optional[int] = None) -> ResearchJobStatus:
+        started = self.started_at or self.finished_at
+        return ResearchJobStatus(
+            job_id=self.job_id,
+            session_id=self.session_id,
+            status=self.status,
+            queue_position=queue_position,
+            submitted_at=self.submitted_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            queue_seconds=round(started - self.submitted_at, 3) if started else None,
+            run_seconds=round(self.finished_at - self.started_at, 3) if self.finished_at and self.started_at else None,
+            result=self.result,
+            error=self.error
+        )
+
+
+class ResearchJobQueue:
+    """Research turns run as background jobs on a bounded pool of workers.
+
+    At most `workers` research runs execute at once, so long research work can't
+    crowd out interactive consultation traffic, and at most `max_queue` jobs wait
+    for a worker; beyond that submit() raises JobQueueFullError. Finished jobs
+    stay available for polling for `ttl` seconds.
+    """
+
+    def __init__(self, agent: ResearchAgentWrapper, workers: int = 2, max_queue: int = 20, ttl: float = 3600.0):
+        self.agent = agent
+        self.workers = max(workers, 1)
+        self.max_queue = max_queue
+        self.ttl = ttl
+        self.jobs: "OrderedDict[str, ResearchJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._closing = False
+        self._stats = {"submitted": 0, "rejected": 0, "succeeded": 0, "failed": 0, "cancelled": 0}
+
+    def _ensure_started(self) -> None:
+        """Start the workers on the running loop at first use"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, messages: List[Message], session_id: str) -> ResearchJob:
+        self._ensure_started()
+        self._expire()
+        if sum(1 for job in self.jobs.values() if job.status == "queued") >= self.max_queue:
+            self._stats["rejected"] += 1
+            raise JobQueueFullError(f"Research job queue is full ({self.max_queue} jobs waiting)")
+
+        job = ResearchJob(messages, session_id)
+        self.jobs[job.job_id] = job
+        self._queue.put_nowait(job)
+        self._stats["submitted"] += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[ResearchJob]:
+        return self.jobs.get(job_id)
+
+    def status(self, job: ResearchJob) -> ResearchJobStatus:
+        queue_position = None
+        if job.status == "queued":
+            queue_position = sum(1 for other in self.jobs.values() if other.status == "queued" and other.submitted_at < job.submitted_at)
+        return job.to_status(queue_position)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; returns False if it is unknown or already finished"""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        if job.task is not None:
+            # Running: the worker records the cancellation
+            job.task.cancel()
+        else:
+            # Queued: the worker skips it when dequeued
+            job.finish("cancelled")
+            self._stats["cancelled"] += 1
+        return True
+
+    async def subscribe(self, job: ResearchJob) -> AsyncIterator[StreamResponse]:
+        """Events of a job from the start, then live until it finishes"""
+        index = 0
+        while True:
+            while index < len(job.events):
+                yield job.events[index]
+                index += 1
+            if job.finished:
+                break
+            await job.wait_for_change()
+        if job.status != "succeeded":
+            yield StreamResponse(event="error", content=job.error or f"Job {job.status}", done=True)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if not job.finished:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: ResearchJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            # Run the turn in its own task so cancelling the job doesn't stop the worker
+            job.task = asyncio.create_task(self._stream(job))
+            await job.task
+            job.finish("succeeded")
+            self._stats["succeeded"] += 1
+        except asyncio.CancelledError:
+            if self._closing:
+                raise
+            job.finish("cancelled")
+            self._stats["cancelled"] += 1
+        except Exception as e:
+            print(f"Research job {job.job_id} failed: {e}")
+            job.finish("failed", str(e))
+            self._stats["failed"] += 1
+
+    async def _stream(self, job: ResearchJob) -> None:
+        async for event in self.agent.stream_response(job.messages, job.session_id):
+            if event.event == "done":
+                job.result = event.response
+            job.add_event(event)
+
+    def _expire(self) -> None:
+        """Drop finished jobs older than the TTL"""
+        cutoff = time.time() - self.ttl
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        statuses = [job.status for job in self.jobs.values()]
+        return {
+            **self._stats,
+            "workers": self.workers,
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "max_queue": self.max_queue,
+            "tracked_jobs": len(self.jobs)
+        }
+
+    async def aclose(self) -> None:
+        """Cancel running jobs and stop the workers"""
+        self._closing = True
+        for job in self.jobs.values():
+            if job.task is not None and not job.finished:
+                job.task.cancel()
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._queue = None
+        self._closing = False
@@ -0,0 +1,220 @@
+import os
+import time
+import pickle
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from app.core.config import settings
+
+
+class SessionStore(ABC):
+    """Storage of chat sessions behind ConsultationEngine and ResearchAgentWrapper.
+
+    Sessions are pickled on set and unpickled on get, so callers always work on a
+    private copy and must set() a session again after changing it. Sessions not
+    written for ttl seconds expire.
+    """
+
+    name: str = "base"
+
+    def __init__(self, namespace: str, ttl: float):
+        self.namespace = namespace
+        self.ttl = ttl
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Any]:
+        """Return a copy of the session, or None if it does not exist or expired"""
+
+    @abstractmethod
+    def set(self, session_id: str, session: Any) -> None:
+        """Create or replace a session and reset its TTL"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Delete a session; returns False if it did not exist"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def close(self) -> None:
+        """Release store resources"""
+
+
+class MemorySessionStore(SessionStore):
+    """Per-process LRU of pickled sessions, bounded by total size"""
+
+    name = "memory"
+
+    def __init__(self, namespace: str, ttl: float = 86400.0, max_bytes: int = 256 * 1024 * 1024):
+        super().__init__(namespace, ttl)
+        self.max_bytes = max_bytes
+        # session ID -> (expires_at, pickled session)
+        self._sessions: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expirations": 0, "evictions": 0}
+
+    def get(self, session_id: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and entry[0] < time.time():
+                self._remove(session_id)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            self._stats["hits"] += 1
+            data = entry[1]
+        return pickle.loads(data)
+
+    def set(self, session_id: str, session: Any) -> None:
+        data = pickle.dumps(session, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._remove(session_id)
+            self._sessions[session_id] = (time.time() + self.ttl, data)
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._sessions) > 1:
+                self._remove(next(iter(self._sessions)))
+                self._stats["evictions"] += 1
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._remove(session_id)
+
+    def _remove(self, session_id: str) -> bool:
+        """Drop a session (lock must be held)"""
+        entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return False
+        self._size -= len(entry[1])
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "backend": self.name,
+                "sessions": len(self._sessions),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes
+            }
+
+
+class SqliteSessionStore(SessionStore):
+    """Sessions in a SQLite database shared by every worker process on the host.
+
+    WAL mode lets workers read while another one writes. Expired sessions are
+    purged periodically, and the least recently written sessions are dropped once
+    the stored total exceeds max_bytes.
+    """
+
+    name = "sqlite"
+
+    PURGE_EVERY = 100
+
+    def __init__(self, namespace: str, db_path: str, ttl: float = 86400.0, max_bytes: int = 1024 * 1024 * 1024):
+        super().__init__(namespace, ttl)
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {"hits": 0, "misses": 0, "expirations": 0, "evictions": 0}
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "namespace TEXT NOT NULL, session_id TEXT NOT NULL, value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (namespace, session_id))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+        self._db.commit()
+
+    def get(self, session_id: str) -> Optional[Any]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM sessions WHERE namespace = ? AND session_id = ?",
+                (self.namespace, session_id)
+            ).fetchone()
+            if row is not None and row[1] < time.time():
+                self._db.execute("DELETE FROM sessions WHERE namespace = ? AND session_id = ?", (self.namespace, session_id))
+                self._db.commit()
+                self._stats["expirations"] += 1
+                row = None
+            self._stats["hits" if row is not None else "misses"] += 1
+        return pickle.loads(row[0]) if row is not None else None
+
+    def set(self, session_id: str, session: Any) -> None:
+        data = pickle.dumps(session, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (namespace, session_id, value, size, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, session_id, data, len(data), time.time() + self.ttl)
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self._purge()
+            self._db.commit()
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM sessions WHERE namespace = ? AND session_id = ?", (self.namespace, session_id))
+            self._db.commit()
+            return cursor.rowcount > 0
+
+    def _purge(self) -> None:
+        """Delete expired sessions, then the oldest ones beyond max_bytes (lock must be held)"""
+        cursor = self._db.execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(),))
+        self._stats["expirations"] += cursor.rowcount
+
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM sessions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for namespace, session_id, size in self._db.execute(
+            "SELECT namespace, session_id, size FROM sessions ORDER BY expires_at ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM sessions WHERE namespace = ? AND session_id = ?", (namespace, session_id))
+            total -= size
+            self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+            return {
+                **self._stats,
+                "backend": self.name,
+                "sessions": sessions,
+                "size_bytes": size,
+                "max_bytes": self.max_bytes
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def create_session_store(namespace: str, ttl: Optional[float] = None) -> SessionStore:
+    """Create the configured session store for one engine ("consultation" or "research")"""
+    ttl = settings.SESSION_TTL if ttl is None else ttl
+    if settings.SESSION_STORE == "sqlite":
+        return SqliteSessionStore(
+            namespace,
+            db_path=settings.SESSION_STORE_DB_PATH,
+            ttl=ttl,
+            max_bytes=settings.SESSION_STORE_MAX_BYTES
+        )
+    if settings.SESSION_STORE != "memory":
+        raise ValueError(f"Unknown session store: {settings.SESSION_STORE}")
+    return MemorySessionStore(namespace, ttl=ttl, max_bytes=settings.SESSION_STORE_MAX_BYTES)
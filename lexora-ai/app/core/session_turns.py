@@ -0,0 +1,102 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Tuple, Hashable, Callable, Awaitable, AsyncIterator
+
+from app.schemas.chat import Message
+
+
+class SessionBusyError(Exception):
+    """Raised when a session already has the maximum number of turns in flight, or this very turn"""
+
+
+def turn_key(messages: List[Message]) -> Hashable:
+    """Identity of a turn request: a double submit or UI retry sends the same messages"""
+    return tuple((msg.role, msg.content) for msg in messages)
+
+
+class SessionTurnQueue:
+    """Runs the turns of each session one at a time, in arrival order.
+
+    A session admits at most max_pending turns (the running one included); more
+    are rejected with SessionBusyError instead of queueing behind a long run. A
+    turn identical to one already in flight for the session is merged into it:
+    the caller gets the first run's result rather than a second LLM run. Turns
+    keep running if their caller goes away, so a retry can still attach.
+
+    Locks are per process; with several workers the same session is only
+    serialized within each of them.
+    """
+
+    def __init__(self, max_pending: int = 2):
+        self.max_pending = max(max_pending, 1)
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._pending: Dict[str, int] = {}
+        # (session ID, turn key) -> shared run, for merging duplicates
+        self._turns: Dict[Tuple[str, Hashable], asyncio.Task] = {}
+        # (session ID, turn key) of streamed turns, which can't be shared
+        self._streams: set = set()
+        self._stats = {"turns": 0, "merged": 0, "rejected": 0}
+
+    def _admit(self, session_id: str) -> None:
+        if self._pending.get(session_id, 0) >= self.max_pending:
+            self._stats["rejected"] += 1
+            raise SessionBusyError(f"Session {session_id} already has {self.max_pending} turns in progress")
+        self._pending[session_id] = self._pending.get(session_id, 0) + 1
+        self._stats["turns"] += 1
+
+    def _release(self, session_id: str) -> None:
+        self._pending[session_id] -= 1
+        if not self._pending[session_id]:
+            del self._pending[session_id]
+            self._locks.pop(session_id, None)
+
+    async def _serialized(self, session_id: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            return await fn()
+
+    async def run(self, session_id: str, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a turn after the session's earlier turns, or join the identical turn in flight"""
+        shared = self._turns.get((session_id, key))
+        if shared is not None:
+            self._stats["merged"] += 1
+            return await asyncio.shield(shared)
+        if (session_id, key) in self._streams:
+            self._stats["rejected"] += 1
+            raise SessionBusyError(f"The same turn is already being streamed for session {session_id}")
+
+        self._admit(session_id)
+        task = asyncio.ensure_future(self._serialized(session_id, fn))
+        self._turns[(session_id, key)] = task
+
+        def finished(_):
+            self._turns.pop((session_id, key), None)
+            self._release(session_id)
+
+        task.add_done_callback(finished)
+        return await asyncio.shield(task)
+
+    @asynccontextmanager
+    async def hold(self, session_id: str, key: Hashable) -> AsyncIterator[None]:
+        """Hold the session for a streamed turn; an identical turn in flight is rejected"""
+        if (session_id, key) in self._turns or (session_id, key) in self._streams:
+            self._stats["rejected"] += 1
+            raise SessionBusyError(f"The same turn is already in progress for session {session_id}")
+
+        self._admit(session_id)
+        self._streams.add((session_id, key))
+        try:
+            lock = self._locks.setdefault(session_id, asyncio.Lock())
+            async with lock:
+                yield
+        finally:
+            self._streams.discard((session_id, key))
+            self._release(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "busy_sessions": len(self._pending),
+            "pending_turns": sum(self._pending.values()),
+            "max_pending": self.max_pending
+        }
@@ -0,0 +1,96 @@
+from typing import Any, AsyncIterator, Callable, Dict
+
+from langchain_core.callbacks.manager import dispatch_custom_event
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.types import Command
+
+from app.schemas.chat import StreamResponse
+
+# Longest tool output preview sent with a tool_end event
+TOOL_OUTPUT_PREVIEW_CHARS = 500
+
+# Custom graph event a tool dispatches while its search waits for API quota
+SEARCH_QUEUE_EVENT = "search_queue"
+
+
+def search_queue_reporter(config: RunnableConfig) -> Callable[[str, int], None]:
+    """Callback for a tool's searches that forwards (query, queue position) to the client stream"""
+    def report(query: str, position: int) -> None:
+        # Called on the search service thread; the event reaches the run's stream all the same
+        dispatch_custom_event(SEARCH_QUEUE_EVENT, {"query": query, "position": position}, config=config)
+    return report
+
+
+def format_sse(event: StreamResponse) -> str:
+    """One server-sent event frame"""
+    return f"event: {event.event}\ndata: {event.model_dump_json(exclude_none=True)}\n\n"
+
+
+def _text(content: Any) -> str:
+    """Text of message content, which is a string or a list of content blocks"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            block if isinstance(block, str) else block.get("text", "")
+            for block in content
+            if isinstance(block, str) or block.get("type") == "text"
+        )
+    return ""
+
+
+def _tool_output_text(output: Any) -> str:
+    """Readable text of a tool result (a ToolMessage or a Command carrying one)"""
+    if isinstance(output, Command):
+        messages = (output.update or {}).get("messages", []) if isinstance(output.update, dict) else []
+        return "\n".join(_text(message.content) for message in messages if isinstance(message, BaseMessage))
+    if isinstance(output, BaseMessage):
+        return _text(output.content)
+    return str(output) if output is not None else ""
+
+
+async def stream_graph_events(graph, graph_input: Dict[str, Any], config: Dict[str, Any]) -> AsyncIterator[StreamResponse]:
+    """Run a ReAct graph and translate its events into stream events.
+
+    Forwards answer tokens from the agent node (LLM calls inside tools are not
+    streamed), tool start/end, search queue positions while a search waits for
+    API quota, and each complete assistant message. The final
+    state is in the graph's checkpoint once the stream ends.
+    """
+    async for event in graph.astream_events(graph_input, config, version="v2"):
+        kind = event["event"]
+        node = event.get("metadata", {}).get("langgraph_node")
+
+        if kind == "on_chat_model_stream" and node == "agent":
+            text = _text(event["data"]["chunk"].content)
+            if text:
+                yield StreamResponse(event="token", content=text)
+
+        elif kind == "on_chat_model_end" and node == "agent":
+            output = event["data"].get("output")
+            text = _text(getattr(output, "content", "")).strip()
+            if text:
+                yield StreamResponse(event="message", content=text)
+
+        elif kind == "on_custom_event" and event["name"] == SEARCH_QUEUE_EVENT:
+            yield StreamResponse(event="queue", data=event["data"])
+
+        elif kind == "on_tool_start":
+            arguments = event["data"].get("input") or {}
+            yield StreamResponse(
+                event="tool_start",
+                tool=event["name"],
+                # Only plain arguments; injected state and tool call IDs stay server-side
+                data={
+                    key: value for key, value in arguments.items()
+                    if isinstance(value, (str, int, float, bool)) and key != "tool_call_id"
+                } if isinstance(arguments, dict) else None
+            )
+
+        elif kind == "on_tool_end":
+            output = _tool_output_text(event["data"].get("output"))
+            yield StreamResponse(event="tool_end", tool=event["name"], content=output[:TOOL_OUTPUT_PREVIEW_CHARS])
+            if "<artifact" in output:
+                # Artifacts are returned to the client as assistant messages
+                yield StreamResponse(event="message", content=output.strip())
@@ -1,13 +1,33 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1 import consultation, research
 from app.core.config import settings
+from app.core.checkpointer import checkpointer_stats
+from app.tools.legal_search_service import legal_search_service
+from app.tools.document_parser import legal_parser_instance
+from app.tools.passage_retriever import passage_retriever
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Spawn and warm the HTML parsing workers before the first request
+    await asyncio.to_thread(legal_parser_instance.parse_executor.start)
+    yield
+    # Stop background research jobs, then release pooled upstream connections
+    await research.research_jobs.aclose()
+    await legal_search_service.aclose()
+    await legal_parser_instance.aclose()
+
 
 app = FastAPI(
     title="Lexora Legal AI API",
     description="Legal Q&A and Research Assistant API for Uzbek law",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -27,4 +47,29 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "search": legal_search_service.get_metrics(),
+        "parser": legal_parser_instance.get_metrics(),
+        "passages": passage_retriever.stats(),
+        "sessions": {
+            "consultation": consultation.consultation_engine.sessions.stats(),
+            "research": research.research_agent.sessions.stats()
+        },
+        "session_turns": {
+            "consultation": consultation.consultation_engine.turns.stats(),
+            "research": research.research_agent.turns.stats()
+        },
+        "idempotency": {
+            "consultation": consultation.chat_responses.stats(),
+            "research": research.chat_responses.stats()
+        },
+        "research_jobs": research.research_jobs.stats(),
+        "checkpoints": {
+            "consultation": checkpointer_stats(consultation.consultation_engine.graph.checkpointer),
+            "research": checkpointer_stats(research.research_agent.graph.checkpointer)
+        }
+    }
\ No newline at end of file
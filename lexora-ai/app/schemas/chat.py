@@ -28,5 +28,21 @@ class ChatResponse(BaseModel):
     )
 
 class StreamResponse(BaseModel):
+    event: Literal["start", "token", "tool_start", "tool_end", "queue", "message", "interrupt", "done", "error"] = Field(
+        "token", description="Kind of stream event"
+    )
     content: str = Field(default="", description="The content of the current chunk")
-    done: bool = Field(default=False, description="Whether the stream is complete")
\ No newline at end of file
+    done: bool = Field(default=False, description="Whether the stream is complete")
+    tool: Optional[str] = Field(None, description="Tool name for tool_start and tool_end events")
+    data: Optional[Dict[str, Any]] = Field(None, description="Tool arguments, interrupt details, search queue position or other event data")
+    response: Optional[ChatResponse] = Field(None, description="The complete response, sent with the done event")
+
+class ResearchClientFrame(BaseModel):
+    """Client frame on the research WebSocket: a new message or a reply to a source approval"""
+    type: Literal["message", "approval"] = Field(..., description="Kind of frame")
+    content: str = Field(default="", description="Message text (message frames)", max_length=15000)
+    interrupt_id: Optional[str] = Field(None, description="The source_approval interrupt being answered")
+    document_ids: List[str] = Field(default_factory=list, description="Approved document IDs (approval frames)")
+    action: Optional[Literal["all", "none", "retry", "broaden", "proceed"]] = Field(
+        None, description="Approve all sources, none, or retry/broaden the search instead of listing IDs"
+    )
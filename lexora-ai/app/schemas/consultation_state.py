@@ -21,6 +21,16 @@ class DocumentContent(BaseModel):
     content: str
     metadata: Dict[str, Any]
     parsing_date: str
+    # Sections, chapters and articles with character offsets into content
+    structure: List[Dict[str, Any]] = Field(default_factory=list)
+
+
+class DocumentRef(BaseModel):
+    """Reference to a document in the shared parsed-document store"""
+    document_id: str
+    title: str
+    url: str
+    parsing_date: str
 
 
 class ConsultationState(BaseModel):
@@ -35,8 +45,8 @@ class ConsultationState(BaseModel):
     search_results: List[SearchResult] = Field(default_factory=list)
     last_search_query: str = Field(default="")
     
-    # Parsed documents (if needed)
-    parsed_documents: Dict[str, DocumentContent] = Field(default_factory=dict)
+    # Parsed documents (references into the shared parsed-document store)
+    parsed_documents: Dict[str, DocumentRef] = Field(default_factory=dict)
     
     # Simple workflow tracking
     has_searched: bool = Field(default=False)
@@ -0,0 +1,23 @@
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+from app.schemas.chat import ChatResponse, Message
+
+
+class ResearchJobRequest(BaseModel):
+    messages: List[Message] = Field(..., description="New messages for the research session", min_length=1)
+    session_id: str = Field(..., description="Session ID for conversation tracking")
+
+
+class ResearchJobStatus(BaseModel):
+    job_id: str = Field(..., description="Job ID for polling, subscribing and cancelling")
+    session_id: str = Field(..., description="Session the job runs a turn of")
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"] = Field(..., description="Job state")
+    queue_position: Optional[int] = Field(None, description="Jobs ahead of this one while queued")
+    submitted_at: float = Field(..., description="Submission time (Unix seconds)")
+    started_at: Optional[float] = Field(None, description="Time a worker picked the job up")
+    finished_at: Optional[float] = Field(None, description="Completion time")
+    queue_seconds: Optional[float] = Field(None, description="Time spent waiting for a worker")
+    run_seconds: Optional[float] = Field(None, description="Time spent running")
+    result: Optional[ChatResponse] = Field(None, description="The research response once the job succeeded")
+    error: Optional[str] = Field(None, description="Failure reason")
@@ -34,6 +34,16 @@ class DocumentContent(BaseModel):
     content: str
     metadata: Dict[str, Any]
     parsing_date: str
+    # Sections, chapters and articles with character offsets into content
+    structure: List[Dict[str, Any]] = Field(default_factory=list)
+
+
+class DocumentRef(BaseModel):
+    """Reference to a document in the shared parsed-document store"""
+    document_id: str
+    title: str
+    url: str
+    parsing_date: str
 
 
 class DocumentSummary(BaseModel):
@@ -108,7 +118,7 @@ class LegalResearchState(BaseModel):
     rejected_document_ids: List[str] = Field(default_factory=list)
     
     # Document processing
-    parsed_documents: Dict[str, DocumentContent] = Field(default_factory=dict)
+    parsed_documents: Dict[str, DocumentRef] = Field(default_factory=dict)
     document_summaries: Dict[str, DocumentSummary] = Field(default_factory=dict)
     
     # Legal research context
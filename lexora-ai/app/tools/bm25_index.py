@@ -0,0 +1,359 @@
+import os
+import re
+import json
+import math
+import mmap
+import time
+import argparse
+from array import array
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Optional, Callable, Iterable, Tuple
+
+import numpy as np
+
+from app.tools.search_backend import SearchBackend
+
+
+# Uzbek Latin uses several apostrophe variants (oʻ, g‘, ma’lumot); fold them to one
+_CHAR_FOLDING = str.maketrans({
+    "‘": "'", "’": "'", "ʻ": "'", "ʼ": "'", "`": "'", "ё": "е"
+})
+_TOKEN_PATTERN = re.compile(r"[0-9a-zа-яўқғҳ']+")
+
+_STOPWORDS = {
+    # Russian
+    "и", "в", "во", "не", "что", "на", "с", "со", "как", "а", "то", "все", "так", "его", "но",
+    "к", "у", "же", "за", "бы", "по", "ее", "от", "о", "об", "из", "для", "при", "или", "это",
+    "этот", "который", "которые", "также", "если", "до", "после", "под", "над", "без", "их",
+    # Uzbek (Cyrillic and Latin)
+    "ва", "билан", "учун", "бу", "ҳам", "еки", "va", "bilan", "uchun", "bu", "ham", "yoki",
+    "site", "lex", "uz"
+}
+
+# Inflectional endings, longest first; stripping stops at a 4 character stem
+_SUFFIXES = sorted({
+    # Russian
+    "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ых", "их", "ой", "ей", "ий", "ый",
+    "ая", "яя", "ое", "ее", "ую", "юю", "ом", "ем", "ам", "ям", "ах", "ях", "ов", "ев", "ия",
+    "ие", "ию", "ии", "ья", "ье", "а", "я", "о", "е", "ы", "и", "у", "ю", "ь",
+    # Uzbek Cyrillic
+    "ларнинг", "лардан", "ларга", "лари", "нинг", "лар", "дан", "га", "да", "ни",
+    # Uzbek Latin
+    "larning", "lardan", "larga", "lari", "ning", "lar", "dan", "ga", "da", "ni"
+}, key=len, reverse=True)
+
+
+def _stem(token: str) -> str:
+    if token.isdigit() or len(token) <= 4:
+        return token
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenize Russian/Uzbek legal text into stemmed index terms"""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower().translate(_CHAR_FOLDING)):
+        token = token.strip("'")
+        if not token or token in _STOPWORDS:
+            continue
+        tokens.append(_stem(token))
+    return tokens
+
+
+def document_from_record(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Normalize a parse_legal_document result or a DocumentContent dict for indexing"""
+    if record.get("success") is False:
+        return None
+
+    metadata = record.get("metadata") or {}
+    document_id = record.get("document_id") or metadata.get("document_id")
+    content = record.get("content") or record.get("markdown") or ""
+    if not document_id or not content:
+        return None
+
+    url = metadata.get("source_url") or f"https://lex.uz/acts/{document_id}"
+    date_match = re.search(r'ONDATE=(\d{2}\.\d{2}\.\d{4})', url)
+    return {
+        "document_id": str(document_id),
+        "title": record.get("title") or metadata.get("title", ""),
+        "content": content,
+        "url": url,
+        "document_date": date_match.group(1) if date_match else ""
+    }
+
+
+class BM25IndexBuilder:
+    """Build an on-disk BM25 inverted index from parsed documents"""
+
+    def __init__(self, title_boost: int = 2, snippet_length: int = 300):
+        self.title_boost = title_boost
+        self.snippet_length = snippet_length
+        self._documents: List[Dict[str, str]] = []
+        self._doc_lengths: List[int] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._seen_ids = set()
+
+    def add_document(
+        self,
+        document_id: str,
+        title: str,
+        content: str,
+        url: str = "",
+        document_date: str = ""
+    ) -> bool:
+        """Add a document; returns False if the document ID was already added"""
+        if document_id in self._seen_ids:
+            return False
+        self._seen_ids.add(document_id)
+
+        # Title terms are repeated so they weigh more than body terms
+        terms = tokenize(title) * self.title_boost + tokenize(content)
+        doc_index = len(self._documents)
+        for term, frequency in Counter(terms).items():
+            self._postings[term].append((doc_index, frequency))
+        self._doc_lengths.append(len(terms))
+
+        snippet = re.sub(r"\s+", " ", content.replace("#", " ")).strip()[:self.snippet_length]
+        self._documents.append({
+            "document_id": document_id,
+            "title": title,
+            "snippet": snippet,
+            "url": url or f"https://lex.uz/acts/{document_id}",
+            "document_date": document_date
+        })
+        return True
+
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Add parser outputs or DocumentContent dicts; returns the number indexed"""
+        added = 0
+        for record in records:
+            document = document_from_record(record)
+            if document and self.add_document(**document):
+                added += 1
+        return added
+
+    def write(self, index_path: str, k1: float = 1.5, b: float = 0.75) -> None:
+        """Write the index files into index_path"""
+        os.makedirs(index_path, exist_ok=True)
+
+        postings = array("I")
+        vocabulary = {}
+        for term in sorted(self._postings):
+            entries = self._postings[term]
+            vocabulary[term] = [len(postings) // 2, len(entries)]
+            for doc_index, frequency in entries:
+                postings.append(doc_index)
+                postings.append(frequency)
+
+        with open(os.path.join(index_path, "postings.bin"), "wb") as f:
+            postings.tofile(f)
+        with open(os.path.join(index_path, "doc_lengths.bin"), "wb") as f:
+            array("I", self._doc_lengths).tofile(f)
+        with open(os.path.join(index_path, "vocabulary.json"), "w", encoding="utf-8") as f:
+            json.dump(vocabulary, f, ensure_ascii=False)
+        with open(os.path.join(index_path, "documents.json"), "w", encoding="utf-8") as f:
+            json.dump(self._documents, f, ensure_ascii=False)
+
+        num_docs = len(self._documents)
+        with open(os.path.join(index_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": 1,
+                "num_docs": num_docs,
+                "num_terms": len(vocabulary),
+                "avg_doc_length": sum(self._doc_lengths) / num_docs if num_docs else 0.0,
+                "k1": k1,
+                "b": b,
+                "built_at": time.time()
+            }, f)
+
+
+class BM25Index:
+    """Read-only BM25 index with memory-mapped postings"""
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+
+        with open(os.path.join(index_path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(index_path, "vocabulary.json"), encoding="utf-8") as f:
+            self.vocabulary: Dict[str, List[int]] = json.load(f)
+        with open(os.path.join(index_path, "documents.json"), encoding="utf-8") as f:
+            self.documents: List[Dict[str, str]] = json.load(f)
+
+        self._file = None
+        self._map = None
+        self._postings = self._map_uint32("postings.bin").reshape(-1, 2)
+        with open(os.path.join(index_path, "doc_lengths.bin"), "rb") as f:
+            doc_lengths = np.fromfile(f, dtype=np.uint32).astype(np.float32)
+
+        self.k1 = self.meta["k1"]
+        self.b = self.meta["b"]
+        self.num_docs = self.meta["num_docs"]
+        avg_doc_length = self.meta["avg_doc_length"] or 1.0
+        # Per-document length normalization is query independent, so compute it once
+        self._norms = self.k1 * (1 - self.b + self.b * doc_lengths / avg_doc_length)
+
+    def _map_uint32(self, filename: str) -> np.ndarray:
+        path = os.path.join(self.index_path, filename)
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=np.uint32)
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return np.frombuffer(self._map, dtype=np.uint32)
+
+    def search(
+        self,
+        query: str,
+        k: int = 10,
+        accept: Optional[Callable[[Dict[str, str]], bool]] = None
+    ) -> List[Tuple[int, float]]:
+        """Return the top-k (document index, BM25 score) pairs for a query"""
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        matched = False
+
+        for term in set(tokenize(query)):
+            entry = self.vocabulary.get(term)
+            if entry is None:
+                continue
+            offset, document_frequency = entry
+            idf = math.log(1 + (self.num_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+
+            postings = self._postings[offset:offset + document_frequency]
+            doc_indices = postings[:, 0]
+            frequencies = postings[:, 1].astype(np.float32)
+            scores[doc_indices] += idf * frequencies * (self.k1 + 1) / (frequencies + self._norms[doc_indices])
+            matched = True
+
+        if not matched:
+            return []
+
+        candidates = np.flatnonzero(scores)
+        if accept is not None:
+            candidates = np.array([i for i in candidates if accept(self.documents[i])], dtype=np.int64)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(i), float(scores[i])) for i in candidates]
+
+    def close(self) -> None:
+        # Arrays viewing the map must be dropped before it can be closed
+        self._postings = None
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+
+
+class LocalIndexSearchBackend(SearchBackend):
+    """Offline search over a local BM25 index of parsed lex.uz documents"""
+
+    name = "local"
+    lexical_scores = True
+
+    def __init__(self, index_path: str, max_results: int = 10):
+        self.index_path = index_path
+        self.max_results = max_results
+        self._index: Optional[BM25Index] = None
+        self._searches = 0
+        self._search_seconds = 0.0
+
+    def _get_index(self) -> BM25Index:
+        if self._index is None:
+            self._index = BM25Index(self.index_path)
+        return self._index
+
+    def reload(self) -> None:
+        """Reopen the index after it has been rebuilt on disk"""
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    async def search(
+        self,
+        query: str,
+        site_filter: Optional[str] = None,
+        timeout: Optional[float] = None,
+        priority: int = 0,
+        on_queue_position: Optional[Callable[[int], None]] = None
+    ) -> Dict[str, Any]:
+        try:
+            index = self._get_index()
+        except FileNotFoundError:
+            return {
+                "search_successful": False,
+                "error": f"Local search index not found at {self.index_path}",
+                "total_found": 0,
+                "documents": []
+            }
+
+        started = time.perf_counter()
+        accept = (lambda document: site_filter in document["url"]) if site_filter else None
+        hits = index.search(query, k=self.max_results, accept=accept)
+
+        documents = []
+        top_score = hits[0][1] if hits else 1.0
+        for doc_index, score in hits:
+            document = index.documents[doc_index]
+            documents.append({
+                'document_id': document["document_id"],
+                'title': document["title"],
+                'snippet': document["snippet"],
+                'url': document["url"],
+                'document_date': document["document_date"],
+                'relevance_score': round(score / top_score, 3)
+            })
+
+        self._searches += 1
+        self._search_seconds += time.perf_counter() - started
+        return {
+            "search_successful": True,
+            "total_found": len(documents),
+            "documents": documents
+        }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "local_index": {
+                "path": self.index_path,
+                "loaded": self._index is not None,
+                "num_docs": self._index.num_docs if self._index else 0,
+                "searches": self._searches,
+                "avg_search_ms": round(self._search_seconds * 1000 / self._searches, 3) if self._searches else 0.0
+            }
+        }
+
+    async def aclose(self) -> None:
+        self.reload()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the local BM25 index of lex.uz documents")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build an index from a JSONL file of parsed documents")
+    build_parser.add_argument("--input", required=True, help="JSONL of parse_legal_document results or DocumentContent dicts")
+    build_parser.add_argument("--output", required=True, help="Index directory")
+
+    search_parser = subparsers.add_parser("search", help="Query an index")
+    search_parser.add_argument("--index", required=True, help="Index directory")
+    search_parser.add_argument("query")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        builder = BM25IndexBuilder()
+        with open(args.input, encoding="utf-8") as f:
+            added = builder.add_records(json.loads(line) for line in f if line.strip())
+        builder.write(args.output)
+        print(f"Indexed {added} documents into {args.output}")
+    else:
+        index = BM25Index(args.index)
+        started = time.perf_counter()
+        hits = index.search(args.query)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for doc_index, score in hits:
+            document = index.documents[doc_index]
+            print(f"{score:.3f}  {document['document_id']}  {document['title']}")
+        print(f"{len(hits)} results in {elapsed_ms:.2f} ms")
@@ -1,25 +1,38 @@
-from typing import List, Dict, Any, Annotated
+from typing import List, Dict, Any, Annotated, Optional
 from langchain_core.tools import tool, InjectedToolCallId
 from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.prebuilt import InjectedState
 from langgraph.types import Command
 from datetime import datetime
 
-from app.schemas.consultation_state import SearchResult, DocumentContent
+from app.core.config import settings
+from app.core.streaming import search_queue_reporter
+from app.schemas.consultation_state import SearchResult, DocumentContent, DocumentRef
 from app.tools.legal_search_service import legal_search_service
 from app.tools.document_parser import legal_parser_instance
+from app.tools.document_structure import format_outline
+from app.tools.passage_retriever import passage_retriever, format_passages
+
+# Upper bound on article text returned by a single read_document_articles call
+MAX_ARTICLES_CHARS = 8000
 
 
 @tool
 def consultation_search(
     query: str,
     search_results: Annotated[List[SearchResult], InjectedState("search_results")],
-    tool_call_id: Annotated[str, InjectedToolCallId]
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    config: RunnableConfig
 ) -> Command:
     """Search for legal documents and return visible results for consultation agent."""
     
-    # Perform the search
-    results = legal_search_service.search_legal_documents(query)
+    # Perform the search; a client streaming the turn sees its place in the quota queue
+    report_queue_position = search_queue_reporter(config)
+    results = legal_search_service.search_legal_documents(
+        query,
+        on_queue_position=lambda position: report_queue_position(query, position)
+    )
     
     # Handle search failures
     if not results["search_successful"]:
@@ -56,6 +69,14 @@ def consultation_search(
             relevance_score=doc['relevance_score']
         ))
     
+    # Start parsing the top hits while the agent reads the snippets. Hits often link to
+    # an old edition, so warm the current one that parse_legal_document reads by default
+    if settings.PREFETCH_ENABLED:
+        legal_parser_instance.prefetch(
+            [legal_parser_instance.edition_url(doc.document_id) for doc in search_result_objects[:settings.PREFETCH_TOP_N]],
+            owner=config.get("configurable", {}).get("thread_id", "default")
+        )
+    
     # Format results for agent visibility
     results_text = f"Found {len(search_result_objects)} legal documents via Brave Search:\n\n"
     for i, doc in enumerate(search_result_objects, 1):
@@ -75,20 +96,74 @@ def consultation_search(
     )
 
 
+def _document_content(document_id: str, result: Dict[str, Any], parsing_date: str) -> DocumentContent:
+    return DocumentContent(
+        document_id=document_id,
+        title=result["metadata"]["title"],
+        content=result["markdown"],
+        metadata=result["metadata"],
+        parsing_date=parsing_date,
+        structure=result["structure"]
+    )
+
+
+def _load_document(ref: DocumentRef) -> Optional[DocumentContent]:
+    """Resolve a state reference through the shared store (re-parses it if evicted)"""
+    result = legal_parser_instance.parse_legal_document(ref.url)
+    if not result["success"]:
+        return None
+    return _document_content(ref.document_id, result, ref.parsing_date)
+
+
+def _is_edition(ref: DocumentRef, edition_date: str) -> bool:
+    """Whether a parsed document is the requested edition (the current one when edition_date is empty)"""
+    if edition_date:
+        return f"ONDATE={edition_date}" in ref.url
+    return "ONDATE=" not in ref.url
+
+
+def _relevant_passages_text(document: DocumentContent, question: str) -> str:
+    """Question-relevant passages of a parsed document, or its opening text if none match"""
+    passages = passage_retriever.retrieve(document.document_id, document.content, question, document.structure)
+    if passages:
+        return f"Relevant passages:\n{format_passages(passages)}"
+    
+    content_preview = document.content[:1000] + "..." if len(document.content) > 1000 else document.content
+    return f"Content preview:\n{content_preview}"
+
+
 @tool
 def parse_legal_document(
     document_id: str,
     search_results: Annotated[List[SearchResult], InjectedState("search_results")],
-    parsed_documents: Annotated[Dict[str, DocumentContent], InjectedState("parsed_documents")],
-    tool_call_id: Annotated[str, InjectedToolCallId]
+    parsed_documents: Annotated[Dict[str, DocumentRef], InjectedState("parsed_documents")],
+    current_question: Annotated[str, InjectedState("current_question")],
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    question: str = "",
+    edition_date: str = ""
 ) -> Command:
-    """Parse a specific legal document for consultation agent."""
+    """Parse a specific legal document for consultation agent.
+    
+    Returns the passages most relevant to `question` (defaults to the last search query).
+    Call again with a different question to get other passages of a parsed document.
+    The current edition is used unless `edition_date` (dd.mm.yyyy) asks for the
+    edition in force on that date.
+    """
+    question = question or current_question
     
-    # Check if already parsed
-    if document_id in parsed_documents:
+    # Already parsed (in the requested edition): only select passages for the question
+    ref = parsed_documents.get(document_id)
+    if ref is not None and _is_edition(ref, edition_date):
+        document = _load_document(ref)
+        if document is None:
+            return Command(
+                update={
+                    "messages": [ToolMessage(f"Failed to load document {document_id}", tool_call_id=tool_call_id)]
+                }
+            )
         return Command(
             update={
-                "messages": [ToolMessage(f"Document {document_id} already parsed", tool_call_id=tool_call_id)]
+                "messages": [ToolMessage(f"Document {document_id} already parsed: {document.title}\n\n{_relevant_passages_text(document, question)}", tool_call_id=tool_call_id)]
             }
         )
     
@@ -98,7 +173,8 @@ def parse_legal_document(
     
     for search_result in search_results:
         if search_result.document_id == document_id:
-            document_url = search_result.url
+            # Search hits often link to an old edition (ONDATE); prefer the current one
+            document_url = legal_parser_instance.edition_url(document_id, edition_date or None)
             document_title = search_result.title
             break
     
@@ -119,24 +195,81 @@ def parse_legal_document(
             }
         )
     
-    # Create DocumentContent object
-    document_content = DocumentContent(
+    document_content = _document_content(document_id, result, datetime.now().isoformat())
+    
+    # The content lives in the shared store; state only keeps a reference
+    document_ref = DocumentRef(
         document_id=document_id,
-        title=result["metadata"]["title"],
-        content=result["markdown"],
-        metadata=result["metadata"],
-        parsing_date=datetime.now().isoformat()
+        title=document_content.title,
+        url=document_url,
+        parsing_date=document_content.parsing_date
     )
-    
-    # Store in state
-    updated_parsed_documents = {**parsed_documents, document_id: document_content}
+    updated_parsed_documents = {**parsed_documents, document_id: document_ref}
     
     # Return parsed content for agent to see
-    content_preview = document_content.content[:1000] + "..." if len(document_content.content) > 1000 else document_content.content
+    message = f"Successfully parsed document {document_id}: {result['metadata']['title']}\n"
+    message += f"Edition in force on {edition_date}\n\n" if edition_date else "Current edition\n\n"
+    
+    # Show the table of contents so the agent can request specific articles
+    if document_content.structure:
+        message += f"Document structure:\n{format_outline(document_content.structure, max_entries=30)}\n\n"
+        message += "Use read_document_articles to read specific articles.\n\n"
+    message += _relevant_passages_text(document_content, question)
     
     return Command(
         update={
             "parsed_documents": updated_parsed_documents,
-            "messages": [ToolMessage(f"Successfully parsed document {document_id}: {result['metadata']['title']}\n\nContent preview:\n{content_preview}", tool_call_id=tool_call_id)]
+            "messages": [ToolMessage(message, tool_call_id=tool_call_id)]
+        }
+    )
+
+
+@tool
+def read_document_articles(
+    document_id: str,
+    articles: str,
+    parsed_documents: Annotated[Dict[str, DocumentRef], InjectedState("parsed_documents")],
+    tool_call_id: Annotated[str, InjectedToolCallId]
+) -> Command:
+    """Read specific articles of a parsed document, e.g. articles="5", "10-15" or "3, 7, 12-1"."""
+    
+    if document_id not in parsed_documents:
+        return Command(
+            update={
+                "messages": [ToolMessage(f"Document {document_id} is not parsed yet. Use parse_legal_document first.", tool_call_id=tool_call_id)]
+            }
+        )
+    
+    # Corpus documents are read article by article instead of loading the whole text
+    result = legal_parser_instance.read_articles(parsed_documents[document_id].url, articles)
+    if not result["success"]:
+        return Command(
+            update={
+                "messages": [ToolMessage(f"Failed to load document {document_id}: {result.get('error', 'Unknown error')}", tool_call_id=tool_call_id)]
+            }
+        )
+    
+    selected = result["articles"]
+    
+    if not selected:
+        return Command(
+            update={
+                "messages": [ToolMessage(f"No articles matching '{articles}' found in document {document_id}", tool_call_id=tool_call_id)]
+            }
+        )
+    
+    # Cap the returned text so a wide range does not flood the context
+    article_texts = []
+    total_length = 0
+    for text in selected:
+        if article_texts and total_length + len(text) > MAX_ARTICLES_CHARS:
+            article_texts.append(f"... {len(selected) - len(article_texts)} more articles omitted, request a narrower range")
+            break
+        article_texts.append(text)
+        total_length += len(text)
+    
+    return Command(
+        update={
+            "messages": [ToolMessage(f"Document {document_id}: {result['title']}\n\n" + "\n\n".join(article_texts), tool_call_id=tool_call_id)]
         }
     )
\ No newline at end of file
@@ -0,0 +1,408 @@
+import os
+import json
+import mmap
+import zlib
+import struct
+import argparse
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+import zstandard
+
+from app.tools.document_structure import select_articles
+from app.tools.parsed_document_store import ParsedDocumentStore
+
+
+MAGIC = b"LXCORP01"
+# index offset, index length, codec name
+_FOOTER = struct.Struct("<QQ8s")
+# What a torn or corrupt index raises when decoded
+_DECODE_ERRORS = (ValueError, KeyError, TypeError, zlib.error, zstandard.ZstdError)
+
+# Target uncompressed chunk size; chunks are cut at article/chapter starts when possible
+CHUNK_CHARS = 32 * 1024
+
+
+class _Codec:
+    """Block compression: zstd by default, zlib for corpora built with --codec zlib"""
+
+    def __init__(self, name: str, level: Optional[int] = None):
+        if name not in ("zstd", "zlib"):
+            raise ValueError(f"Unknown corpus codec: {name}")
+        self.name = name
+        self.level = level
+        # zstd (de)compressor objects must not be shared between threads
+        self._local = threading.local()
+
+    def compress(self, data: bytes) -> bytes:
+        if self.name == "zlib":
+            return zlib.compress(data, 6 if self.level is None else self.level)
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(level=self.level or 9)
+        return compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        if self.name == "zlib":
+            return zlib.decompress(data)
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = self._local.decompressor = zstandard.ZstdDecompressor()
+        return decompressor.decompress(data)
+
+
+def corpus_key(result: Dict[str, Any]) -> Optional[str]:
+    """Store key (document ID + edition) of a parse_legal_document result"""
+    metadata = result.get("metadata") or {}
+    document_id = metadata.get("document_id")
+    if not document_id:
+        return None
+    return ParsedDocumentStore.make_key(document_id, metadata.get("edition_date") or None)
+
+
+def _chunk_bounds(content: str, structure: List[Dict[str, Any]], chunk_chars: int) -> List[int]:
+    """Chunk start offsets, preferring heading starts, then line breaks, as cut points"""
+    heading_starts = [entry["start"] for entry in structure]
+    bounds = [0]
+    i = 0
+    while len(content) - bounds[-1] > chunk_chars:
+        target = bounds[-1] + chunk_chars
+        while i < len(heading_starts) and heading_starts[i] < target:
+            i += 1
+        if i < len(heading_starts) and heading_starts[i] < target + chunk_chars:
+            cut = heading_starts[i]
+        else:
+            newline = content.find("\n", target)
+            cut = newline + 1 if 0 < newline < target + chunk_chars else target
+        if cut >= len(content):
+            break
+        bounds.append(cut)
+    return bounds
+
+
+def _last_commit(data) -> Optional[Tuple[int, Dict[str, Dict[str, Any]], str]]:
+    """(end offset, documents, codec) of the last complete commit in corpus bytes.
+
+    Blocks added after the last commit (a writer killed mid-batch, or one still
+    writing) are skipped: the search walks back to the newest footer that points
+    at an index directly before it and whose index decodes.
+    """
+    end = len(data)
+    while True:
+        magic_at = data.rfind(MAGIC, len(MAGIC) + _FOOTER.size, end)
+        if magic_at < 0:
+            return None
+        end = magic_at + len(MAGIC) - 1
+        footer_at = magic_at - _FOOTER.size
+        index_offset, index_length, codec = _FOOTER.unpack(data[footer_at:magic_at])
+        codec = codec.rstrip(b"\0").decode("ascii", "replace")
+        if index_offset + index_length != footer_at or codec not in ("zstd", "zlib"):
+            continue
+        # Outside the try: a missing zstandard must not look like a torn commit
+        decoder = _Codec(codec)
+        try:
+            documents = json.loads(decoder.decompress(data[index_offset:footer_at]))["documents"]
+        except _DECODE_ERRORS:
+            continue
+        return magic_at + len(MAGIC), documents, codec
+
+
+class CorpusWriter:
+    """Append parsed documents to a corpus file.
+
+    Layout: MAGIC, then per document a compressed metadata block (metadata,
+    structure, parsing date) and the markdown in compressed chunks, then a
+    compressed JSON index and a fixed-size footer pointing at it. Opening an
+    existing file appends after its last index, so readers that already mapped the
+    file keep a consistent view; they pick up new documents after reopening.
+    Blocks a killed writer left after the last commit are truncated on open.
+    """
+
+    def __init__(self, path: str, codec: Optional[str] = None, level: Optional[int] = None, chunk_chars: int = CHUNK_CHARS):
+        self.path = path
+        self.chunk_chars = chunk_chars
+        self._documents: Dict[str, Dict[str, Any]] = {}
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "r+b") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    if data[:len(MAGIC)] != MAGIC:
+                        raise ValueError(f"Not a document corpus file: {path}")
+                    size = len(data)
+                    commit = _last_commit(data)
+                if commit is None:
+                    # Killed before its first commit
+                    committed_end, existing_codec = len(MAGIC), codec or "zstd"
+                else:
+                    committed_end, self._documents, existing_codec = commit
+                if codec and codec != existing_codec:
+                    raise ValueError(f"Corpus {path} uses {existing_codec}, not {codec}")
+                if committed_end < size:
+                    print(f"Corpus {path}: dropping {size - committed_end} bytes written after the last commit")
+                    f.truncate(committed_end)
+            self._codec = _Codec(existing_codec, level)
+            self._file = open(path, "ab")
+        else:
+            self._codec = _Codec(codec or "zstd", level)
+            self._file = open(path, "wb")
+            self._file.write(MAGIC)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._documents
+
+    def _write_block(self, data: bytes) -> List[int]:
+        compressed = self._codec.compress(data)
+        offset = self._file.tell()
+        self._file.write(compressed)
+        return [offset, len(compressed)]
+
+    def add(self, key: str, result: Dict[str, Any]) -> None:
+        """Add (or replace) a successful parse_legal_document result"""
+        content = result["markdown"]
+        structure = result.get("structure") or []
+        meta = {
+            "metadata": result.get("metadata") or {},
+            "structure": structure,
+            "parsing_date": result.get("parsing_date", "")
+        }
+
+        meta_block = self._write_block(json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        bounds = _chunk_bounds(content, structure, self.chunk_chars)
+        chunks = []
+        for start, end in zip(bounds, bounds[1:] + [len(content)]):
+            chunks.append([start] + self._write_block(content[start:end].encode("utf-8")))
+
+        self._documents[key] = {
+            "title": meta["metadata"].get("title", ""),
+            "parsing_date": meta["parsing_date"],
+            "length": len(content),
+            "meta": meta_block,
+            "chunks": chunks
+        }
+
+    def commit(self) -> None:
+        """Write the index and footer, making documents added so far readable.
+
+        Every commit appends a full index; compact_corpus drops superseded ones.
+        """
+        index = json.dumps({"version": 1, "documents": self._documents}, ensure_ascii=False).encode("utf-8")
+        index_block = self._write_block(index)
+        self._file.write(_FOOTER.pack(index_block[0], index_block[1], self._codec.name.encode("ascii")) + MAGIC)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self.commit()
+        self._file.close()
+
+
+class CorpusReader:
+    """Random access to documents and articles of a memory-mapped corpus file.
+
+    Only the index is held in memory. Reading an article decompresses the metadata
+    block and the chunks covering it, not the whole document; the mapped pages
+    live in the OS page cache and are shared by every process reading the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a document corpus file: {path}")
+
+        # The last commit; a batch still being written (or never committed) is ignored
+        commit = _last_commit(self._map)
+        if commit is None:
+            raise ValueError(f"Corpus {path} has no committed index")
+        _, self._documents, codec = commit
+        self._codec = _Codec(codec)
+        self._lock = threading.Lock()
+        self._stats = {"documents_read": 0, "ranges_read": 0, "chunks_decompressed": 0, "bytes_decompressed": 0}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._documents
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def keys(self) -> List[str]:
+        return list(self._documents)
+
+    def _read_block(self, block: List[int]) -> bytes:
+        offset, length = block[-2:]
+        data = self._codec.decompress(self._map[offset:offset + length])
+        with self._lock:
+            self._stats["chunks_decompressed"] += 1
+            self._stats["bytes_decompressed"] += len(data)
+        return data
+
+    def get_meta(self, key: str) -> Optional[Dict[str, Any]]:
+        """Metadata, structure and parsing date of a document, without its text"""
+        entry = self._documents.get(key)
+        if entry is None:
+            return None
+        return json.loads(self._read_block(entry["meta"]))
+
+    def parsed_at(self, key: str) -> Optional[float]:
+        """When a document was parsed (Unix time), or None if unknown"""
+        entry = self._documents.get(key)
+        if entry is None:
+            return None
+        # Files written before the index carried parsing dates keep them in the metadata block
+        parsing_date = entry["parsing_date"] if "parsing_date" in entry else self.get_meta(key)["parsing_date"]
+        try:
+            return datetime.fromisoformat(parsing_date).timestamp()
+        except (TypeError, ValueError):
+            return None
+
+    def read_range(self, key: str, start: int, end: int) -> str:
+        """content[start:end] of a document, decompressing only the chunks it spans"""
+        entry = self._documents[key]
+        chunks = entry["chunks"]
+        end = min(end, entry["length"])
+        parts = []
+        for i, chunk in enumerate(chunks):
+            chunk_start = chunk[0]
+            chunk_end = chunks[i + 1][0] if i + 1 < len(chunks) else entry["length"]
+            if chunk_end <= start or chunk_start >= end:
+                continue
+            text = self._read_block(chunk).decode("utf-8")
+            parts.append(text[max(start - chunk_start, 0):end - chunk_start])
+        with self._lock:
+            self._stats["ranges_read"] += 1
+        return "".join(parts)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Full document in the parse_legal_document result format"""
+        meta = self.get_meta(key)
+        if meta is None:
+            return None
+        content = "".join(self._read_block(chunk).decode("utf-8") for chunk in self._documents[key]["chunks"])
+        with self._lock:
+            self._stats["documents_read"] += 1
+        return {
+            "success": True,
+            "markdown": content,
+            "structure": meta["structure"],
+            "metadata": meta["metadata"],
+            "parsing_date": meta["parsing_date"]
+        }
+
+    def read_articles(self, key: str, spec: str) -> Optional[Dict[str, Any]]:
+        """Articles matching spec (see select_articles) as {"title", "articles"}"""
+        meta = self.get_meta(key)
+        if meta is None:
+            return None
+        return {
+            "title": meta["metadata"].get("title", ""),
+            "articles": [
+                self.read_range(key, entry["start"], entry["end"]).strip()
+                for entry in select_articles(meta["structure"], spec)
+            ]
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "documents": len(self._documents),
+                "file_bytes": len(self._map),
+                "codec": self._codec.name
+            }
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+
+def compact_corpus(path: str) -> Tuple[int, int]:
+    """Rewrite a corpus without replaced documents and superseded indexes.
+
+    Blocks are copied as they are, without recompressing. Returns the file size
+    before and after.
+    """
+    reader = CorpusReader(path)
+    temporary_path = f"{path}.compact"
+    documents = {}
+    with open(temporary_path, "wb") as f:
+        f.write(MAGIC)
+
+        def copy_block(block: List[int]) -> List[int]:
+            offset, length = block[-2:]
+            new_offset = f.tell()
+            f.write(reader._map[offset:offset + length])
+            return block[:-2] + [new_offset, length]
+
+        for key, entry in reader._documents.items():
+            documents[key] = {
+                **entry,
+                "meta": copy_block(entry["meta"]),
+                "chunks": [copy_block(chunk) for chunk in entry["chunks"]]
+            }
+
+        index = reader._codec.compress(json.dumps({"version": 1, "documents": documents}, ensure_ascii=False).encode("utf-8"))
+        index_offset = f.tell()
+        f.write(index)
+        f.write(_FOOTER.pack(index_offset, len(index), reader._codec.name.encode("ascii")) + MAGIC)
+        f.flush()
+        os.fsync(f.fileno())
+
+    size_before = len(reader._map)
+    reader.close()
+    os.replace(temporary_path, path)
+    return size_before, os.path.getsize(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect a compressed corpus of parsed lex.uz documents")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Append parsed documents from a JSONL file")
+    build_parser.add_argument("--input", required=True, help="JSONL of parse_legal_document results")
+    build_parser.add_argument("--output", required=True, help="Corpus file (appended to if it exists)")
+    build_parser.add_argument("--codec", choices=["zstd", "zlib"], default=None)
+
+    get_parser = subparsers.add_parser("get", help="Print a document or some of its articles")
+    get_parser.add_argument("--corpus", required=True)
+    get_parser.add_argument("key", help="Document key, e.g. 145261@current")
+    get_parser.add_argument("--articles", default="", help='Article spec such as "5" or "10-15"')
+
+    stats_parser = subparsers.add_parser("stats", help="Print corpus statistics")
+    stats_parser.add_argument("--corpus", required=True)
+
+    compact_parser = subparsers.add_parser("compact", help="Drop replaced documents and old indexes")
+    compact_parser.add_argument("--corpus", required=True)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        writer = CorpusWriter(args.output, codec=args.codec)
+        added = input_bytes = 0
+        with open(args.input, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                key = corpus_key(record)
+                if key and record.get("success", True) and record.get("markdown"):
+                    writer.add(key, record)
+                    added += 1
+                    input_bytes += len(line.encode("utf-8"))
+        writer.close()
+        output_bytes = os.path.getsize(args.output)
+        print(f"Added {added} documents to {args.output} ({input_bytes / 1e6:.1f} MB JSONL -> {output_bytes / 1e6:.1f} MB corpus)")
+    elif args.command == "get":
+        reader = CorpusReader(args.corpus)
+        if args.key not in reader:
+            print(f"{args.key} not in corpus")
+        elif args.articles:
+            print("\n\n".join(reader.read_articles(args.key, args.articles)["articles"]))
+        else:
+            print(reader.get(args.key)["markdown"])
+    elif args.command == "compact":
+        size_before, size_after = compact_corpus(args.corpus)
+        print(f"Compacted {args.corpus}: {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+    else:
+        print(json.dumps(CorpusReader(args.corpus).stats(), indent=2))
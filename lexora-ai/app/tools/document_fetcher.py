@@ -0,0 +1,270 @@
+import time
+import random
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.tools.single_flight import AsyncSingleFlight
+
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class DocumentCache:
+    """Validating HTTP cache for document pages.
+
+    Entries keep the body together with its ETag/Last-Modified validators. A fresh
+    entry is served directly; a stale one is kept so the next fetch can revalidate it
+    with a conditional request. The memory tier is an LRU bounded by total body size,
+    with an optional SQLite tier that survives restarts.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, fresh_ttl: float = 3600.0, db_path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.fresh_ttl = fresh_ttl
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS document_cache ("
+                "url TEXT PRIMARY KEY, body TEXT NOT NULL, etag TEXT, "
+                "last_modified TEXT, validated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["validated_at"] < self.fresh_ttl
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the stored entry (fresh or stale), or None"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+                self._stats["memory_hits"] += 1
+                return dict(entry)
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT body, etag, last_modified, validated_at FROM document_cache WHERE url = ?", (url,)
+                ).fetchone()
+                if row is not None:
+                    entry = {"body": row[0], "etag": row[1], "last_modified": row[2], "validated_at": row[3]}
+                    self._store_in_memory(url, entry)
+                    self._stats["disk_hits"] += 1
+                    return dict(entry)
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, url: str, body: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        entry = {"body": body, "etag": etag, "last_modified": last_modified, "validated_at": time.time()}
+        with self._lock:
+            self._store_in_memory(url, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO document_cache (url, body, etag, last_modified, validated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (url, body, etag, last_modified, entry["validated_at"])
+                )
+                self._db.commit()
+
+    def mark_validated(self, url: str) -> None:
+        """Record a 304: the stored body is fresh again"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                entry["validated_at"] = now
+            if self._db is not None:
+                self._db.execute("UPDATE document_cache SET validated_at = ? WHERE url = ?", (now, url))
+                self._db.commit()
+
+    def _store_in_memory(self, url: str, entry: Dict[str, Any]) -> None:
+        """Insert an entry and evict least recently used ones (lock must be held)"""
+        previous = self._entries.pop(url, None)
+        if previous is not None:
+            self._size -= previous["size"]
+        entry["size"] = len(entry["body"].encode("utf-8"))
+        self._entries[url] = entry
+        self._size += entry["size"]
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted["size"]
+            self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "persistent": self._db is not None
+            }
+
+
+class _RetryableResponse(Exception):
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class DocumentFetcher:
+    """Async page fetcher with a pooled client, conditional requests, retries and per-host limits.
+
+    All methods must run on a single event loop, which owns the client and semaphores.
+    """
+
+    def __init__(
+        self,
+        cache: DocumentCache,
+        timeout: float = 30.0,
+        max_connections: int = 20,
+        max_per_host: int = 4,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        max_retry_after: float = 30.0,
+        headers: Optional[Dict[str, str]] = None
+    ):
+        self.cache = cache
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_retry_after = max_retry_after
+        self.headers = headers or {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight = AsyncSingleFlight()
+        self._stats = {
+            "requests": 0,
+            "fresh_hits": 0,
+            "not_modified": 0,
+            "downloads": 0,
+            "bytes_downloaded": 0,
+            "retries": 0,
+            "failures": 0,
+            "retry_after_exceeded": 0,
+            "stale_served": 0
+        }
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._client
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return semaphore
+
+    def _backoff_delay(self, attempt: int, response: Optional[httpx.Response]) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None to give up"""
+        if response is not None:
+            retry_after = response.headers.get("retry-after", "")
+            if retry_after.isdigit():
+                # Don't hold the tool call for however long the server asks
+                if float(retry_after) > self.max_retry_after:
+                    return None
+                return float(retry_after)
+        # Exponential backoff with jitter
+        return self.backoff_base * (2 ** attempt) * (1 + random.random() / 2)
+
+    async def fetch(self, url: str) -> Optional[str]:
+        """Return the page body, or None if it could not be fetched"""
+        self._stats["requests"] += 1
+        return await self._in_flight.do(url, lambda: self._fetch(url))
+
+    async def _fetch(self, url: str) -> Optional[str]:
+        cached = self.cache.get(url)
+        if cached is not None and self.cache.is_fresh(cached):
+            self._stats["fresh_hits"] += 1
+            return cached["body"]
+
+        headers = {}
+        if cached is not None:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        client = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            retry_response = None
+            try:
+                async with self._host_semaphore(url):
+                    response = await client.get(url, headers=headers)
+
+                if response.status_code == 304 and cached is not None:
+                    self.cache.mark_validated(url)
+                    self._stats["not_modified"] += 1
+                    return cached["body"]
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    raise _RetryableResponse(response)
+                response.raise_for_status()
+
+                body = response.text
+                self.cache.set(url, body, response.headers.get("etag"), response.headers.get("last-modified"))
+                self._stats["downloads"] += 1
+                self._stats["bytes_downloaded"] += len(response.content)
+                return body
+
+            except _RetryableResponse as e:
+                error = e
+                retry_response = e.response
+            except httpx.TransportError as e:
+                error = e
+            except httpx.HTTPStatusError as e:
+                # Client errors will not improve on retry
+                error = e
+                break
+
+            if attempt < self.max_retries:
+                delay = self._backoff_delay(attempt, retry_response)
+                if delay is None:
+                    self._stats["retry_after_exceeded"] += 1
+                    break
+                self._stats["retries"] += 1
+                await asyncio.sleep(delay)
+
+        self._stats["failures"] += 1
+        print(f"Error fetching document {url}: {error}")
+        if cached is not None:
+            # Serving a stale copy beats failing the tool call
+            self._stats["stale_served"] += 1
+            return cached["body"]
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "in_flight": self._in_flight.stats(),
+            "cache": self.cache.stats()
+        }
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,260 @@
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Iterable
+
+from app.core.config import settings
+from app.tools.document_parser import LegalDocumentParser, legal_parser_instance
+from app.tools.document_corpus import CorpusWriter, CorpusReader, compact_corpus
+from app.tools.bm25_index import BM25IndexBuilder
+from app.tools.vector_index import VectorIndex
+
+
+def parse_document_ids(spec: str) -> List[str]:
+    """Expand an ID spec such as "145261, 6257288, 1000-1010" into document IDs"""
+    document_ids = []
+    for part in re.split(r"[,\s]+", spec.strip()):
+        if not part:
+            continue
+        if "-" in part:
+            first, last = (int(value) for value in part.split("-", 1))
+            document_ids.extend(str(i) for i in range(first, last + 1))
+        else:
+            document_ids.append(part)
+    return document_ids
+
+
+class IngestionCheckpoint:
+    """Append-only log of finished document IDs, so an interrupted crawl can resume"""
+
+    def __init__(self, path: str):
+        self.path = path
+        # document ID -> "ok" or "failed"
+        self.status: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:  # torn last line after a crash
+                        continue
+                    self.status[record["document_id"]] = record["status"]
+        self._file = open(path, "a", encoding="utf-8")
+
+    def pending(self, document_ids: Iterable[str], retry_failed: bool = False) -> List[str]:
+        return [
+            document_id for document_id in document_ids
+            if self.status.get(document_id) is None or (retry_failed and self.status[document_id] == "failed")
+        ]
+
+    def record(self, records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            self.status[record["document_id"]] = record["status"]
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class DocumentIngestor:
+    """Crawl lex.uz documents into the local corpus through LegalDocumentParser.
+
+    At most `concurrency` documents are in flight and request starts are spaced by
+    about `delay` seconds. Parsed documents are committed to the corpus every
+    `commit_every` documents and only then written to the checkpoint, so a crash
+    loses at most one batch and never marks a document done that the corpus lacks.
+    """
+
+    def __init__(
+        self,
+        parser: LegalDocumentParser,
+        corpus_path: str,
+        checkpoint_path: str,
+        concurrency: int = 2,
+        delay: float = 1.0,
+        commit_every: int = 50
+    ):
+        self.parser = parser
+        self.corpus_path = corpus_path
+        self.concurrency = concurrency
+        self.delay = delay
+        self.commit_every = commit_every
+        self.checkpoint = IngestionCheckpoint(checkpoint_path)
+        self._writer: Optional[CorpusWriter] = None
+        self._uncommitted: List[Dict[str, Any]] = []
+        self._next_start = 0.0
+        self._pace_lock: Optional[asyncio.Lock] = None
+        self._stats = {"ingested": 0, "failed": 0, "skipped": 0, "commits": 0}
+
+    def document_url(self, document_id: str) -> str:
+        return f"{settings.LEX_UZ_BASE_URL}/acts/{document_id}"
+
+    async def run(self, document_ids: List[str], retry_failed: bool = False) -> Dict[str, Any]:
+        """Ingest the documents not yet in the checkpoint; returns crawl statistics"""
+        started = time.perf_counter()
+        self._writer = CorpusWriter(self.corpus_path)
+        self._pace_lock = asyncio.Lock()
+
+        # Skip documents already checkpointed or already in the corpus
+        pending = [
+            document_id for document_id in self.checkpoint.pending(document_ids, retry_failed)
+            if self.parser.document_key(self.document_url(document_id)) not in self._writer
+        ]
+        self._stats["skipped"] = len(document_ids) - len(pending)
+
+        queue = iter(pending)
+        try:
+            await asyncio.gather(*(self._worker(queue) for _ in range(max(self.concurrency, 1))))
+        finally:
+            # Also reached on Ctrl-C: keep everything parsed so far
+            self._commit()
+            self._writer.close()
+            self.checkpoint.close()
+
+        elapsed = time.perf_counter() - started
+        return {
+            **self._stats,
+            "pending": len(pending),
+            "elapsed_seconds": round(elapsed, 1),
+            "documents_per_minute": round(60 * (self._stats["ingested"] + self._stats["failed"]) / elapsed, 1) if elapsed else 0.0,
+            "fetcher": self.parser.fetcher.stats()
+        }
+
+    async def _worker(self, queue: Iterable[str]) -> None:
+        for document_id in queue:
+            await self._pace()
+            record = await self._ingest_one(document_id)
+            self._uncommitted.append(record)
+            self._stats["ingested" if record["status"] == "ok" else "failed"] += 1
+            if len(self._uncommitted) >= self.commit_every:
+                self._commit()
+
+    async def _pace(self) -> None:
+        """Space request starts by the politeness delay, with jitter"""
+        async with self._pace_lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.delay * (0.5 + random.random())
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _ingest_one(self, document_id: str) -> Dict[str, Any]:
+        url = self.document_url(document_id)
+        result = await self.parser.aparse_legal_document(url)
+        if not result["success"]:
+            print(f"Failed to ingest document {document_id}: {result.get('error', 'Unknown error')}")
+            return {"document_id": document_id, "status": "failed", "error": result.get("error", "")}
+
+        self._writer.add(self.parser.document_key(url), result)
+        return {"document_id": document_id, "status": "ok", "title": result["metadata"]["title"]}
+
+    def _commit(self) -> None:
+        if not self._uncommitted:
+            return
+        self._writer.commit()
+        self.checkpoint.record(self._uncommitted)
+        self._stats["commits"] += 1
+        print(f"Committed {len(self._uncommitted)} documents ({self._stats['ingested']} ingested, {self._stats['failed']} failed)")
+        self._uncommitted = []
+
+
+def build_indexes(corpus_path: str, bm25_index_path: str = "", vector_index_path: str = "") -> None:
+    """Rebuild the local BM25 and/or vector index from every document in the corpus"""
+    reader = CorpusReader(corpus_path)
+    records = (reader.get(key) for key in reader.keys())
+    if bm25_index_path:
+        builder = BM25IndexBuilder()
+        added = builder.add_records(records)
+        builder.write(bm25_index_path)
+        print(f"Indexed {added} documents into {bm25_index_path}")
+        records = (reader.get(key) for key in reader.keys())
+    if vector_index_path:
+        index = VectorIndex()
+        added = index.add_records(records)
+        index.save(vector_index_path)
+        print(f"Indexed {added} documents ({len(index)} rows) into {vector_index_path}")
+    reader.close()
+
+
+def serve_saved_pages(html_dir: str, port: int) -> None:
+    """Serve <html_dir>/<id>.html at /acts/<id> and /docs/<id>, standing in for lex.uz"""
+
+    class SavedPageHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            match = re.match(r"^/(?:acts|docs)/(\d+)", self.path)
+            path = os.path.join(html_dir, f"{match.group(1)}.html") if match else ""
+            if not path or not os.path.exists(path):
+                self.send_error(404)
+                return
+            with open(path, "rb") as f:
+                body = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), SavedPageHandler)
+    print(f"Serving {html_dir} at http://127.0.0.1:{port} (set LEX_UZ_BASE_URL to crawl it)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-populate the local lex.uz corpus and indexes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    crawl_parser = subparsers.add_parser("crawl", help="Fetch and parse documents into the corpus (resumable)")
+    crawl_parser.add_argument("--ids", default="", help='Document IDs and ranges, e.g. "145261, 1000-1010"')
+    crawl_parser.add_argument("--ids-file", default="", help="File with one document ID per line")
+    crawl_parser.add_argument("--corpus", default=settings.DOCUMENT_CORPUS_PATH or "data/corpus.lxc")
+    crawl_parser.add_argument("--checkpoint", default="", help="Progress log (default: <corpus>.checkpoint.jsonl)")
+    crawl_parser.add_argument("--concurrency", type=int, default=2)
+    crawl_parser.add_argument("--delay", type=float, default=1.0, help="Seconds between request starts")
+    crawl_parser.add_argument("--commit-every", type=int, default=50)
+    crawl_parser.add_argument("--retry-failed", action="store_true")
+    crawl_parser.add_argument("--bm25-index", default="", help="Rebuild this BM25 index after the crawl")
+    crawl_parser.add_argument("--vector-index", default="", help="Rebuild this vector index after the crawl")
+
+    serve_parser = subparsers.add_parser("serve", help="Serve saved pages as a local lex.uz stand-in")
+    serve_parser.add_argument("--html-dir", required=True)
+    serve_parser.add_argument("--port", type=int, default=8765)
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve_saved_pages(args.html_dir, args.port)
+    else:
+        document_ids = parse_document_ids(args.ids)
+        if args.ids_file:
+            with open(args.ids_file, encoding="utf-8") as f:
+                document_ids.extend(parse_document_ids(f.read()))
+        if not document_ids:
+            parser.error("no document IDs given (--ids or --ids-file)")
+
+        os.makedirs(os.path.dirname(os.path.abspath(args.corpus)), exist_ok=True)
+        legal_parser_instance.parse_executor.start()
+        ingestor = DocumentIngestor(
+            legal_parser_instance,
+            corpus_path=args.corpus,
+            checkpoint_path=args.checkpoint or f"{args.corpus}.checkpoint.jsonl",
+            concurrency=args.concurrency,
+            delay=args.delay,
+            commit_every=args.commit_every
+        )
+        try:
+            stats = asyncio.run(ingestor.run(document_ids, retry_failed=args.retry_failed))
+            print(json.dumps(stats, indent=2))
+        finally:
+            asyncio.run(legal_parser_instance.aclose())
+
+        size_before, size_after = compact_corpus(args.corpus)
+        print(f"Corpus {args.corpus}: {size_after / 1e6:.1f} MB (compacted from {size_before / 1e6:.1f} MB)")
+        if args.bm25_index or args.vector_index:
+            build_indexes(args.corpus, args.bm25_index, args.vector_index)
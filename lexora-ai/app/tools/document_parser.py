@@ -1,26 +1,105 @@
+import os
 import re
-import requests
-from typing import Dict, Any, Optional
-from datetime import datetime
-from bs4 import BeautifulSoup
+import time
+import asyncio
+from typing import List, Dict, Any, Optional, Set
+from datetime import date, datetime
+
+from app.core.config import settings
+from app.core.background_loop import BackgroundLoop
+from app.tools.document_fetcher import DocumentCache, DocumentFetcher
+from app.tools.document_corpus import CorpusReader
+from app.tools.document_structure import select_articles, entry_text
+from app.tools.edition_store import EditionStore, parse_edition_date
+from app.tools.parse_executor import ParseExecutor
+from app.tools.parsed_document_store import ParsedDocumentStore, CURRENT_EDITION
+from app.tools.single_flight import AsyncSingleFlight
 
 
 class LegalDocumentParser:
     """Parser for lex.uz legal documents to extract clean, structured content"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        # Pooled async fetcher with a validating HTTP cache; it runs on its own loop
+        # so sync tools and async callers share connections and in-flight fetches
+        self._loop = BackgroundLoop("document-fetch-loop")
+        self.fetcher = DocumentFetcher(
+            cache=DocumentCache(
+                max_bytes=settings.DOCUMENT_CACHE_MAX_BYTES,
+                fresh_ttl=settings.DOCUMENT_CACHE_FRESH_TTL,
+                db_path=settings.DOCUMENT_CACHE_DB_PATH or None
+            ),
+            timeout=settings.DOCUMENT_FETCH_TIMEOUT,
+            max_connections=settings.DOCUMENT_FETCH_MAX_CONNECTIONS,
+            max_per_host=settings.DOCUMENT_FETCH_MAX_PER_HOST,
+            max_retries=settings.DOCUMENT_FETCH_MAX_RETRIES,
+            backoff_base=settings.DOCUMENT_FETCH_BACKOFF,
+            max_retry_after=settings.DOCUMENT_FETCH_MAX_RETRY_AFTER,
+            headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+        )
+        # HTML parsing is CPU-bound, so it runs on a bounded process pool
+        self.parse_executor = ParseExecutor(
+            backend_name=settings.HTML_PARSER_BACKEND,
+            max_workers=settings.PARSE_WORKERS,
+            max_queue=settings.PARSE_MAX_QUEUE,
+            start_method=settings.PARSE_START_METHOD
+        )
+        # Parsed documents are shared across sessions; concurrent requests for the
+        # same document (including speculative prefetches) share one parse
+        self.store = ParsedDocumentStore(
+            max_bytes=settings.PARSED_DOCUMENT_STORE_MAX_BYTES,
+            current_ttl=settings.PARSED_DOCUMENT_STORE_CURRENT_TTL,
+            db_path=settings.PARSED_DOCUMENT_STORE_DB_PATH or None,
+            disk_max_bytes=settings.PARSED_DOCUMENT_STORE_DISK_MAX_BYTES
+        )
+        self._parses_in_flight = AsyncSingleFlight()
+        # Every fetched edition of an act, as a base text plus deltas, so the edition in
+        # force on a date is often known without fetching it
+        self.editions = EditionStore(
+            max_bytes=settings.EDITION_STORE_MAX_BYTES,
+            db_path=settings.EDITION_STORE_DB_PATH or None
+        )
+        # Optional read-only corpus of pre-parsed documents, memory-mapped and
+        # decompressed per document or article on access
+        self.corpus: Optional[CorpusReader] = None
+        self._corpus_revalidations = 0
+        if settings.DOCUMENT_CORPUS_PATH and os.path.exists(settings.DOCUMENT_CORPUS_PATH):
+            try:
+                self.corpus = CorpusReader(settings.DOCUMENT_CORPUS_PATH)
+            except (OSError, ValueError) as e:
+                # A damaged corpus must not keep the API from starting; documents are fetched instead
+                print(f"Could not open document corpus {settings.DOCUMENT_CORPUS_PATH}, continuing without it: {e}")
+        
+        # Speculative prefetches per owner (session), so they can be cancelled
+        self._prefetch_slots: Optional[asyncio.Semaphore] = None
+        self._prefetches: Dict[str, Set[str]] = {}
+        self._prefetched_keys: Set[str] = set()
+        self._prefetch_stats = {"started": 0, "skipped": 0, "completed": 0, "cancelled": 0, "hits": 0}
     
     def convert_url_to_acts_format(self, url: str) -> str:
         """Convert lex.uz URLs to acts format for better content access"""
         doc_id = self._extract_document_id(url)
         if doc_id:
-            return f"https://lex.uz/acts/{doc_id}"
+            return self.edition_url(doc_id, self._extract_edition_date(url))
         return url
     
+    def edition_url(self, document_id: str, edition_date: Optional[str] = None) -> str:
+        """URL of an act as in force on edition_date (dd.mm.yyyy), or of its current edition"""
+        url = f"{settings.LEX_UZ_BASE_URL}/acts/{document_id}"
+        return f"{url}?ONDATE={edition_date}" if edition_date else url
+    
+    def document_key(self, url: str) -> str:
+        """Shared store key: document ID plus edition date, or the URL for non lex.uz pages"""
+        doc_id = self._extract_document_id(url)
+        if doc_id:
+            return self.store.make_key(doc_id, self._extract_edition_date(url))
+        return url
+    
+    def _extract_edition_date(self, url: str) -> Optional[str]:
+        """Extract the edition date (ONDATE=dd.mm.yyyy) from lex.uz URLs"""
+        match = re.search(r"ONDATE=(\d{2}\.\d{2}\.\d{4})", url)
+        return match.group(1) if match else None
+    
     def _extract_document_id(self, url: str) -> Optional[str]:
         """Extract document ID from lex.uz URLs"""
         patterns = [
@@ -38,89 +117,208 @@ class LegalDocumentParser:
     
     def fetch_document_html(self, url: str) -> Optional[str]:
         """Fetch HTML content from lex.uz document URL"""
-        try:
-            acts_url = self.convert_url_to_acts_format(url)
-            response = self.session.get(acts_url, timeout=30)
-            response.raise_for_status()
-            return response.text
-        except Exception as e:
-            print(f"Error fetching document: {e}")
-            return None
+        return self._loop.run_sync(self.fetcher.fetch(self.convert_url_to_acts_format(url)))
+    
+    async def afetch_document_html(self, url: str) -> Optional[str]:
+        """Async variant of fetch_document_html"""
+        return await self._loop.run(self.fetcher.fetch(self.convert_url_to_acts_format(url)))
     
-    def extract_document_metadata(self, soup: BeautifulSoup, url: str) -> Dict[str, Any]:
-        """Extract metadata from the document"""
-        metadata = {
+    def extract_document_metadata(self, page: Dict[str, Any], url: str) -> Dict[str, Any]:
+        """Build document metadata from the fields extracted by the HTML backend"""
+        return {
             "source_url": url,
             "document_id": self._extract_document_id(url),
+            "edition_date": self._extract_edition_date(url) or "",
             "parsed_date": datetime.now().isoformat(),
-            "title": "",
+            "title": page["title"],
             "document_type": "",
             "adoption_date": "",
             "effective_date": "",
-            "document_number": ""
+            "document_number": page["document_number"]
         }
+    
+    def parse_legal_document(self, url: str) -> Dict[str, Any]:
+        """Parse a legal document from lex.uz and return structured content"""
+        return self._loop.run_sync(self._parse_shared(url))
+    
+    async def aparse_legal_document(self, url: str) -> Dict[str, Any]:
+        """Async variant of parse_legal_document"""
+        return await self._loop.run(self._parse_shared(url))
+    
+    def read_articles(self, url: str, articles: str) -> Dict[str, Any]:
+        """Return {"success", "title", "articles"} for an article spec such as "5" or "10-15".
         
-        # Extract title
-        title_tag = soup.find('title')
-        if title_tag:
-            metadata["title"] = title_tag.get_text().strip()
+        Documents in the corpus are read without decompressing the rest of their text.
+        """
+        key = self.document_key(url)
+        if self._in_corpus(key) and not self.store.contains(key):
+            if self._corpus_stale(key):
+                self._loop.submit(self._revalidate(url, key))
+            return {"success": True, **self.corpus.read_articles(key, articles)}
         
-        # Try to find document details
-        for tag in soup.find_all(['h1', 'h2', 'h3']):
-            text = tag.get_text().strip()
-            if "№" in text or "от" in text:
-                metadata["document_number"] = text
-                break
+        result = self.parse_legal_document(url)
+        if not result["success"]:
+            return result
+        return {
+            "success": True,
+            "title": result["metadata"]["title"],
+            "articles": [entry_text(result["markdown"], entry) for entry in select_articles(result["structure"], articles)]
+        }
+    
+    def prefetch(self, urls: List[str], owner: str) -> None:
+        """Start background fetch+parse of documents likely to be requested next.
         
-        return metadata
+        Results land in the shared store, so a later parse_legal_document call is a
+        cache hit or joins the running parse. Returns immediately.
+        """
+        if urls:
+            self._loop.submit(self._start_prefetch(urls, owner))
     
-    def clean_and_structure_content(self, soup: BeautifulSoup) -> str:
-        """Extract and clean document content"""
-        # Remove unwanted elements
-        for element in soup(['script', 'style', 'nav', 'header', 'footer']):
-            element.decompose()
+    def cancel_prefetch(self, owner: str) -> int:
+        """Cancel an owner's prefetches that no caller is waiting on"""
+        if not self._loop.started:
+            return 0
+        return self._loop.run_sync(self._cancel_prefetch(owner))
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return document parser metrics"""
+        return {
+            "fetcher": self.fetcher.stats(),
+            "parse_executor": self.parse_executor.stats(),
+            "parses_in_flight": self._parses_in_flight.stats(),
+            "store": self.store.stats(),
+            "corpus": {**self.corpus.stats(), "revalidations": self._corpus_revalidations} if self.corpus is not None else None,
+            "editions": self.editions.stats(),
+            "prefetch": {**self._prefetch_stats, "owners": len(self._prefetches)}
+        }
+    
+    async def aclose(self) -> None:
+        """Close pooled connections, stop the fetch loop and the parse workers"""
+        self.parse_executor.shutdown()
+        if not self._loop.started:
+            return
         
-        # Find main content
-        content_div = soup.find('div', class_='document-content') or soup.find('div', id='content') or soup
+        await self._loop.run(self.fetcher.aclose())
+        self._loop.stop()
+    
+    def _in_corpus(self, key: str) -> bool:
+        return self.corpus is not None and key in self.corpus
+    
+    def _corpus_stale(self, key: str) -> bool:
+        """Whether a corpus entry is a current edition older than the store's current-edition TTL.
         
-        # Extract text and maintain structure
-        paragraphs = []
-        for element in content_div.find_all(['p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li']):
-            text = element.get_text().strip()
-            if text and len(text) > 10:  # Filter out very short texts
-                if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
-                    paragraphs.append(f"\n## {text}\n")
-                else:
-                    paragraphs.append(text)
+        Dated editions never change. A stale current edition is still served, while
+        it is re-parsed in the background to pick up amendments.
+        """
+        if not key.endswith(f"@{CURRENT_EDITION}"):
+            return False
+        parsed_at = self.corpus.parsed_at(key)
+        return parsed_at is None or time.time() - parsed_at > self.store.current_ttl
+    
+    async def _revalidate(self, url: str, key: str) -> None:
+        """Re-parse a stale corpus entry into the store without waiting on it"""
+        if not self._parses_in_flight.in_flight(key):
+            self._corpus_revalidations += 1
+            self._parses_in_flight.start(key, lambda: self._parse_legal_document(url))
+    
+    async def _parse_shared(self, url: str) -> Dict[str, Any]:
+        """Serve from the store, join a running parse, or parse (runs on the fetch loop)"""
+        key = self.document_key(url)
+        if key in self._prefetched_keys:
+            self._prefetched_keys.discard(key)
+            self._prefetch_stats["hits"] += 1
         
-        return "\n\n".join(paragraphs)
+        result = self.store.get(key)
+        if result is not None:
+            return result
+        if self._in_corpus(key):
+            if self._corpus_stale(key):
+                await self._revalidate(url, key)
+            return await asyncio.to_thread(self.corpus.get, key)
+        
+        document_id, edition_date = self._extract_document_id(url), self._extract_edition_date(url)
+        on_date = parse_edition_date(edition_date) if edition_date else None
+        if document_id and on_date:
+            result = await asyncio.to_thread(self.editions.get, document_id, on_date)
+            if result is not None:
+                self.store.set(key, result)
+                return result
+        return await self._parses_in_flight.do(key, lambda: self._parse_legal_document(url))
     
-    def parse_legal_document(self, url: str) -> Dict[str, Any]:
-        """Parse a legal document from lex.uz and return structured content"""
+    async def _start_prefetch(self, urls: List[str], owner: str) -> None:
+        if self._prefetch_slots is None:
+            self._prefetch_slots = asyncio.Semaphore(settings.PREFETCH_MAX_CONCURRENCY)
+        
+        for url in urls:
+            key = self.document_key(url)
+            if self.store.contains(key) or self._parses_in_flight.in_flight(key) or self._in_corpus(key):
+                self._prefetch_stats["skipped"] += 1
+                continue
+            
+            self._prefetch_stats["started"] += 1
+            self._prefetched_keys.add(key)
+            self._prefetches.setdefault(owner, set()).add(key)
+            task = self._parses_in_flight.start(key, lambda url=url: self._prefetch_one(url))
+            task.add_done_callback(lambda task, key=key: self._finish_prefetch(owner, key, task))
+    
+    async def _prefetch_one(self, url: str) -> Dict[str, Any]:
+        # Bounded so speculative work cannot crowd out interactive parses
+        async with self._prefetch_slots:
+            return await self._parse_legal_document(url)
+    
+    def _finish_prefetch(self, owner: str, key: str, task: asyncio.Task) -> None:
+        keys = self._prefetches.get(owner)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._prefetches[owner]
+        if task.cancelled():
+            self._prefetched_keys.discard(key)
+            self._prefetch_stats["cancelled"] += 1
+        else:
+            self._prefetch_stats["completed"] += 1
+    
+    async def _cancel_prefetch(self, owner: str) -> int:
+        cancelled = 0
+        for key in list(self._prefetches.get(owner, ())):
+            cancelled += self._parses_in_flight.cancel_unclaimed(key)
+        return cancelled
+    
+    async def _parse_legal_document(self, url: str) -> Dict[str, Any]:
+        """Fetch and parse a document (shared by coalesced callers)"""
         try:
             # Fetch HTML
-            html_content = self.fetch_document_html(url)
+            html_content = await self.fetcher.fetch(self.convert_url_to_acts_format(url))
             if not html_content:
                 return {"success": False, "error": "Failed to fetch document"}
             
-            # Parse HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
+            # Parse HTML and extract content on the parse workers
+            page = await self.parse_executor.aparse(html_content)
             
             # Extract metadata
-            metadata = self.extract_document_metadata(soup, url)
+            metadata = self.extract_document_metadata(page, url)
             
-            # Extract and clean content
-            content = self.clean_and_structure_content(soup)
+            content = page["markdown"]
             
             if not content:
                 return {"success": False, "error": "No content extracted"}
             
-            return {
+            result = {
                 "success": True,
                 "markdown": content,
+                "structure": page["structure"],
                 "metadata": metadata,
                 "parsing_date": datetime.now().isoformat()
             }
+            self.store.set(self.document_key(url), result)
+            
+            # The current edition is what was in force on the day it was fetched
+            if metadata["document_id"]:
+                edition_date = metadata["edition_date"]
+                observed_on = parse_edition_date(edition_date) if edition_date else date.today()
+                if observed_on:
+                    await asyncio.to_thread(self.editions.add, metadata["document_id"], observed_on, result)
+            return result
             
         except Exception as e:
             return {"success": False, "error": str(e)}
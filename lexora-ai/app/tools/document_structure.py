@@ -0,0 +1,130 @@
+import re
+from typing import List, Dict, Any, Optional
+
+
+_APOSTROPHE = "['‘’ʻʼ`]?"
+_ROMAN_OR_ARABIC = r"(?P<number>[ivxlc]+|\d+)"
+_ARTICLE_NUMBER = r"(?P<number>\d+(?:[-.]\d+)*)"
+
+# (kind, level, pattern) for Russian and Uzbek (Cyrillic and Latin) headings. A lower
+# level encloses higher ones: a chapter ends at the next chapter or section.
+_HEADING_PATTERNS = [
+    ("section", 0, rf"(?:раздел|бўлим|bo{_APOSTROPHE}lim)\s+{_ROMAN_OR_ARABIC}\b"),
+    ("section", 0, rf"{_ROMAN_OR_ARABIC}\s*-?\s*(?:бўлим|bo{_APOSTROPHE}lim)\b"),
+    ("chapter", 1, rf"(?:глава|боб|bob)\s+{_ROMAN_OR_ARABIC}\b"),
+    ("chapter", 1, r"(?P<number>\d+)\s*-\s*(?:боб|bob)\b"),
+    ("paragraph", 2, r"(?:§|параграф)\s*(?P<number>\d+)"),
+    ("paragraph", 2, r"(?P<number>\d+)\s*-\s*§"),
+    ("article", 3, rf"(?:статья|модда|modda)\s+{_ARTICLE_NUMBER}"),
+    ("article", 3, rf"{_ARTICLE_NUMBER}\s*-\s*(?:модда|modda)\b"),
+]
+_COMPILED_PATTERNS = [
+    (kind, level, re.compile(r"\s*(?:#+\s*)?" + pattern, re.IGNORECASE))
+    for kind, level, pattern in _HEADING_PATTERNS
+]
+_LINE = re.compile(r"[^\n]+")
+_RANGE = re.compile(r"^(\d+)\s*(?:-|–|\.\.)\s*(\d+)$")
+
+MAX_HEADING_LENGTH = 200
+# Outside heading markup, a heading line reads as a title: its number is followed by
+# a full stop, a colon or nothing, or the line is not a sentence. A body line that
+# opens with a cross-reference ("Статья 5 настоящего Кодекса ... .") is neither
+_TITLE_NUMBER_END = re.compile(r"\s*(?:[.:)]|$)")
+_SENTENCE_END = re.compile(r"[.;:,]\s*$")
+
+
+def _is_heading(text: str, match: "re.Match") -> bool:
+    if text.lstrip().startswith("#"):
+        return True
+    if len(text.strip()) > MAX_HEADING_LENGTH:
+        return False
+    return _TITLE_NUMBER_END.match(text, match.end()) is not None or _SENTENCE_END.search(text) is None
+
+
+def build_structure_index(content: str) -> List[Dict[str, Any]]:
+    """Find sections, chapters, paragraphs (§) and articles in parsed markdown.
+
+    Each entry is {"kind", "level", "number", "heading", "start", "end"} where
+    content[start:end] spans the heading and its body up to the next heading of the
+    same or an enclosing level. Entries are in document order.
+    """
+    structure: List[Dict[str, Any]] = []
+    open_entries: List[Dict[str, Any]] = []
+
+    for line in _LINE.finditer(content):
+        text = line.group()
+        for kind, level, pattern in _COMPILED_PATTERNS:
+            match = pattern.match(text)
+            if match is None or not _is_heading(text, match):
+                continue
+
+            entry = {
+                "kind": kind,
+                "level": level,
+                "number": match.group("number").upper() if kind in ("section", "chapter") else match.group("number"),
+                "heading": text.strip().lstrip("#").strip()[:MAX_HEADING_LENGTH],
+                "start": line.start(),
+                "end": len(content)
+            }
+            while open_entries and open_entries[-1]["level"] >= level:
+                open_entries.pop()["end"] = line.start()
+            open_entries.append(entry)
+            structure.append(entry)
+            break
+
+    return structure
+
+
+def find_entry(structure: List[Dict[str, Any]], kind: str, number: str) -> Optional[Dict[str, Any]]:
+    """First entry of a kind with the given number (codes may repeat numbers in annexes)"""
+    number = number.strip().upper()
+    for entry in structure:
+        if entry["kind"] == kind and entry["number"].upper() == number:
+            return entry
+    return None
+
+
+def entry_text(content: str, entry: Dict[str, Any]) -> str:
+    return content[entry["start"]:entry["end"]].strip()
+
+
+def select_articles(structure: List[Dict[str, Any]], spec: str) -> List[Dict[str, Any]]:
+    """Resolve an article spec such as "5", "12-1", "10-15" or "3, 7, 10..12".
+
+    An element that names an existing article (Uzbek codes number inserted articles
+    like "12-1") wins over its reading as a range.
+    """
+    articles = [entry for entry in structure if entry["kind"] == "article"]
+    selected: List[Dict[str, Any]] = []
+
+    for part in re.split(r"[,;\s]+(?![-–.])", spec.strip()):
+        part = part.strip()
+        if not part:
+            continue
+        entry = find_entry(structure, "article", part)
+        if entry is not None:
+            selected.append(entry)
+            continue
+
+        range_match = _RANGE.match(part)
+        if range_match:
+            first = find_entry(structure, "article", range_match.group(1))
+            last = find_entry(structure, "article", range_match.group(2))
+            if first is not None and last is not None:
+                first_index, last_index = articles.index(first), articles.index(last)
+                selected.extend(articles[min(first_index, last_index):max(first_index, last_index) + 1])
+
+    # De-duplicate, keep document order
+    unique = {entry["start"]: entry for entry in selected}
+    return [unique[start] for start in sorted(unique)]
+
+
+def format_outline(structure: List[Dict[str, Any]], max_entries: int = 60) -> str:
+    """Indented table of contents of the document"""
+    lines = [
+        "  " * entry["level"] + entry["heading"]
+        for entry in structure[:max_entries]
+    ]
+    if len(structure) > max_entries:
+        lines.append(f"... and {len(structure) - max_entries} more headings")
+    return "\n".join(lines)
@@ -0,0 +1,262 @@
+import json
+import time
+import bisect
+import hashlib
+import sqlite3
+import difflib
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional
+
+from app.tools.document_structure import build_structure_index
+
+
+EDITION_DATE_FORMAT = "%d.%m.%Y"
+
+
+def parse_edition_date(value: str) -> Optional[date]:
+    """dd.mm.yyyy (lex.uz ONDATE) to a date, None if it is not a valid date"""
+    try:
+        return datetime.strptime(value, EDITION_DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def format_edition_date(value: date) -> str:
+    return value.strftime(EDITION_DATE_FORMAT)
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def make_delta(newer: List[str], older: List[str]) -> List[list]:
+    """Line delta rebuilding `older` from `newer`: ["=", i1, i2] copies newer[i1:i2], ["+", lines] inserts"""
+    delta = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, newer, older).get_opcodes():
+        if tag == "equal":
+            delta.append(["=", i1, i2])
+        elif tag in ("replace", "insert"):
+            delta.append(["+", older[j1:j2]])
+    return delta
+
+
+def apply_delta(newer: List[str], delta: List[list]) -> List[str]:
+    older = []
+    for op in delta:
+        if op[0] == "=":
+            older.extend(newer[op[1]:op[2]])
+        else:
+            older.extend(op[1])
+    return older
+
+
+class DocumentEditions:
+    """Editions of one act stored as the newest text plus reverse line deltas.
+
+    versions[-1] holds the full markdown of the most recently observed edition;
+    every older version holds a delta against the next newer one. Observations
+    record which version lex.uz served for an ONDATE (or for the current edition
+    on the day it was fetched).
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        data = data or {"versions": [], "observations": []}
+        # {"hash", "metadata", "parsing_date", and "content" (newest) or "delta"}
+        self.versions: List[Dict[str, Any]] = data["versions"]
+        # Sorted [date ordinal, version hash] pairs
+        self.observations: List[list] = data["observations"]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"versions": self.versions, "observations": self.observations}
+
+    def _version_index(self, content_hash: str) -> Optional[int]:
+        for i, version in enumerate(self.versions):
+            if version["hash"] == content_hash:
+                return i
+        return None
+
+    def _texts(self) -> Dict[str, str]:
+        """Full markdown of every version by hash"""
+        if not self.versions:
+            return {}
+        lines = self.versions[-1]["content"].split("\n")
+        texts = {self.versions[-1]["hash"]: "\n".join(lines)}
+        for version in reversed(self.versions[:-1]):
+            lines = apply_delta(lines, version["delta"])
+            texts[version["hash"]] = "\n".join(lines)
+        return texts
+
+    def text(self, content_hash: str) -> str:
+        index = self._version_index(content_hash)
+        lines = self.versions[-1]["content"].split("\n")
+        for version in reversed(self.versions[index:-1]):
+            lines = apply_delta(lines, version["delta"])
+        return "\n".join(lines)
+
+    def _chain_order(self) -> List[str]:
+        """Hashes of observed versions, ordered by their latest observation"""
+        last_seen = {}
+        for ordinal, content_hash in self.observations:
+            last_seen[content_hash] = ordinal
+        return sorted(last_seen, key=last_seen.get)
+
+    def observe(self, observed_on: date, result: Dict[str, Any]) -> None:
+        """Record the edition served for a date, adding a version if its text is new"""
+        content_hash = _content_hash(result["markdown"])
+        ordinal = observed_on.toordinal()
+        position = bisect.bisect_left(self.observations, [ordinal])
+        if position < len(self.observations) and self.observations[position][0] == ordinal:
+            self.observations[position][1] = content_hash
+        else:
+            self.observations.insert(position, [ordinal, content_hash])
+
+        texts = None
+        if self._version_index(content_hash) is None:
+            texts = self._texts()
+            texts[content_hash] = result["markdown"]
+            self.versions.append({
+                "hash": content_hash,
+                "metadata": result["metadata"],
+                "parsing_date": result["parsing_date"]
+            })
+
+        order = self._chain_order()
+        if texts is None and order == [version["hash"] for version in self.versions]:
+            return
+        self._rebuild(order, texts if texts is not None else self._texts())
+
+    def _rebuild(self, order: List[str], texts: Dict[str, str]) -> None:
+        """Re-chain versions in the given order (oldest first), dropping unobserved ones"""
+        by_hash = {version["hash"]: version for version in self.versions}
+        versions = [by_hash[content_hash] for content_hash in order]
+
+        newer_lines = texts[order[-1]].split("\n")
+        for version in reversed(versions[:-1]):
+            lines = texts[version["hash"]].split("\n")
+            version.pop("content", None)
+            version["delta"] = make_delta(newer_lines, lines)
+            newer_lines = lines
+        versions[-1].pop("delta", None)
+        versions[-1]["content"] = texts[order[-1]]
+        self.versions = versions
+
+    def version_on(self, on_date: date) -> Optional[str]:
+        """Hash of the version in force on a date, if the observations determine it.
+
+        A date is covered when it was observed, or when the nearest observations
+        before and after it served the same text (no amendment in between).
+        """
+        ordinal = on_date.toordinal()
+        position = bisect.bisect_left(self.observations, [ordinal])
+        if position < len(self.observations) and self.observations[position][0] == ordinal:
+            return self.observations[position][1]
+        if 0 < position < len(self.observations):
+            before, after = self.observations[position - 1][1], self.observations[position][1]
+            if before == after:
+                return before
+        return None
+
+    def result(self, content_hash: str, edition_date: str) -> Dict[str, Any]:
+        """A parse_legal_document result for one version"""
+        version = self.versions[self._version_index(content_hash)]
+        content = self.text(content_hash)
+        return {
+            "success": True,
+            "markdown": content,
+            "structure": build_structure_index(content),
+            "metadata": {**version["metadata"], "edition_date": edition_date},
+            "parsing_date": version["parsing_date"]
+        }
+
+
+class EditionStore:
+    """Editions of lex.uz acts, stored per act as a base text plus compact deltas.
+
+    Answers "the edition in force on date X" without refetching whenever earlier
+    fetches pin it down. The memory tier is an LRU bounded by serialized size, with
+    an optional SQLite tier that survives restarts.
+    """
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024, db_path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        # document ID -> (size, editions)
+        self._documents: "OrderedDict[str, tuple]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "observations": 0, "new_versions": 0, "evictions": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS document_editions ("
+                "document_id TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def _load(self, document_id: str) -> Optional[DocumentEditions]:
+        """Editions of a document from memory or disk (lock must be held)"""
+        entry = self._documents.get(document_id)
+        if entry is not None:
+            self._documents.move_to_end(document_id)
+            return entry[1]
+        if self._db is not None:
+            row = self._db.execute("SELECT value FROM document_editions WHERE document_id = ?", (document_id,)).fetchone()
+            if row is not None:
+                editions = DocumentEditions(json.loads(row[0]))
+                self._store_in_memory(document_id, editions, len(row[0].encode("utf-8")))
+                return editions
+        return None
+
+    def _store_in_memory(self, document_id: str, editions: DocumentEditions, size: int) -> None:
+        previous = self._documents.pop(document_id, None)
+        if previous is not None:
+            self._size -= previous[0]
+        self._documents[document_id] = (size, editions)
+        self._size += size
+        while self._size > self.max_bytes and len(self._documents) > 1:
+            _, (evicted_size, _) = self._documents.popitem(last=False)
+            self._size -= evicted_size
+            self._stats["evictions"] += 1
+
+    def add(self, document_id: str, observed_on: date, result: Dict[str, Any]) -> None:
+        """Record the edition lex.uz served for a date (the fetch date for the current edition)"""
+        with self._lock:
+            editions = self._load(document_id) or DocumentEditions()
+            version_count = len(editions.versions)
+            editions.observe(observed_on, result)
+            self._stats["observations"] += 1
+            self._stats["new_versions"] += len(editions.versions) > version_count
+
+            value = json.dumps(editions.to_dict(), ensure_ascii=False)
+            self._store_in_memory(document_id, editions, len(value.encode("utf-8")))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO document_editions (document_id, value, updated_at) VALUES (?, ?, ?)",
+                    (document_id, value, time.time())
+                )
+                self._db.commit()
+
+    def get(self, document_id: str, on_date: date) -> Optional[Dict[str, Any]]:
+        """The edition in force on a date as a parse_legal_document result, or None if unknown"""
+        with self._lock:
+            editions = self._load(document_id)
+            content_hash = editions.version_on(on_date) if editions is not None else None
+            if content_hash is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            return editions.result(content_hash, format_edition_date(on_date))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "documents": len(self._documents),
+                "versions": sum(len(editions.versions) for _, editions in self._documents.values()),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "persistent": self._db is not None
+            }
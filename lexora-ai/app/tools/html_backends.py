@@ -0,0 +1,228 @@
+import os
+import time
+import logging
+import argparse
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Callable, Tuple
+
+from bs4 import BeautifulSoup
+
+from app.tools.html_content import (
+    BlockCollector,
+    SKIP_TAGS,
+    BLOCK_TAGS,
+    SEPARATOR_TAGS,
+    blocks_to_markdown,
+    extract_blocks,
+    find_content_root,
+    legacy_clean_and_structure_content
+)
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # lxml is a dependency, but html.parser still works without it
+    lxml = None
+
+logger = logging.getLogger(__name__)
+
+
+DOCUMENT_NUMBER_TAGS = ("h1", "h2", "h3")
+
+
+def _is_document_number(text: str) -> bool:
+    return "№" in text or "от" in text
+
+
+class HtmlParserBackend(ABC):
+    """HTML parsing backend behind LegalDocumentParser.
+
+    extract(html) returns {"title", "document_number", "blocks"}. The title comes from
+    <title>, the document number from the first h1-h3 containing "№" or "от", and
+    blocks are the (kind, text) pairs of html_content.extract_blocks.
+    """
+
+    name: str = "base"
+
+    @abstractmethod
+    def extract(self, html: str) -> Dict[str, Any]:
+        """Parse a page and extract its metadata fields and content blocks"""
+
+
+class BeautifulSoupBackend(HtmlParserBackend):
+    """Pure-Python backend using BeautifulSoup with the stdlib html.parser"""
+
+    name = "html.parser"
+
+    def extract(self, html: str) -> Dict[str, Any]:
+        soup = BeautifulSoup(html, "html.parser")
+
+        title_tag = soup.find("title")
+        document_number = ""
+        for tag in soup.find_all(DOCUMENT_NUMBER_TAGS):
+            text = tag.get_text().strip()
+            if _is_document_number(text):
+                document_number = text
+                break
+
+        return {
+            "title": title_tag.get_text().strip() if title_tag else "",
+            "document_number": document_number,
+            "blocks": extract_blocks(find_content_root(soup))
+        }
+
+
+class LxmlBackend(HtmlParserBackend):
+    """libxml2-backed backend; same contract as BeautifulSoupBackend, several times faster"""
+
+    name = "lxml"
+
+    def __init__(self):
+        if lxml is None:
+            raise ImportError("lxml is not installed")
+        self._parser = lxml.html.HTMLParser(encoding="utf-8")
+
+    def extract(self, html: str) -> Dict[str, Any]:
+        # Parse bytes so pages with an encoding declaration are accepted
+        root = lxml.html.document_fromstring(html.encode("utf-8"), parser=self._parser)
+
+        title_tag = root.find(".//title")
+        document_number = ""
+        for tag in root.iter(*DOCUMENT_NUMBER_TAGS):
+            text = tag.text_content().strip()
+            if _is_document_number(text):
+                document_number = text
+                break
+
+        content_root = (
+            root.xpath("//div[contains(concat(' ', normalize-space(@class), ' '), ' document-content ')]")
+            or root.xpath("//div[@id='content']")
+            or [root]
+        )[0]
+
+        return {
+            "title": title_tag.text_content().strip() if title_tag is not None else "",
+            "document_number": document_number,
+            "blocks": self._extract_blocks(content_root)
+        }
+
+    def _extract_blocks(self, root: Any) -> List[Tuple[str, str]]:
+        """Single-pass walk mirroring html_content.extract_blocks for lxml trees"""
+        collector = BlockCollector()
+        open_blocks: List[str] = []
+        # Entries are elements, ("close", block name) or ("text", tail text)
+        stack: list = [root]
+
+        while stack:
+            node = stack.pop()
+
+            if type(node) is tuple:
+                if node[0] == "close":
+                    collector.flush(node[1])
+                    open_blocks.pop()
+                else:
+                    collector.add_text(node[1])
+                continue
+
+            name = node.tag
+            if not isinstance(name, str) or name in SKIP_TAGS:  # comments, processing instructions
+                if node.tail and node is not root:
+                    collector.add_text(node.tail)
+                continue
+
+            if name in SEPARATOR_TAGS:
+                collector.add_text(" ")
+            if node.tail and node is not root:
+                stack.append(("text", node.tail))
+
+            if name in BLOCK_TAGS:
+                collector.flush(open_blocks[-1] if open_blocks else "p")
+                open_blocks.append(name)
+                stack.append(("close", name))
+
+            if node.text:
+                collector.add_text(node.text)
+            stack.extend(reversed(node))
+
+        collector.flush(open_blocks[-1] if open_blocks else "p")
+        return collector.blocks
+
+
+HTML_PARSER_BACKENDS: Dict[str, Callable[[], HtmlParserBackend]] = {
+    "html.parser": BeautifulSoupBackend,
+    "lxml": LxmlBackend
+}
+
+
+def create_html_backend(name: str) -> HtmlParserBackend:
+    """Create a backend by name, falling back to html.parser when lxml is missing"""
+    if name not in HTML_PARSER_BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend: {name}")
+    if name == "lxml" and lxml is None:
+        logger.warning("lxml is not installed, falling back to the html.parser backend")
+        return BeautifulSoupBackend()
+    return HTML_PARSER_BACKENDS[name]()
+
+
+def _normalized_text(blocks: List[Tuple[str, str]]) -> str:
+    return "".join("".join(text.split()) for _, text in blocks)
+
+
+def _time_backend(pages: List[str], extract: Callable[[str], Any], repeat: int) -> float:
+    """Best-of-N seconds to parse and extract every page"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for html in pages:
+            extract(html)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends on saved lex.uz pages")
+    parser.add_argument("--html-dir", required=True, help="Directory of saved .html pages")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = []
+    for filename in sorted(os.listdir(args.html_dir)):
+        if filename.endswith((".html", ".htm")):
+            with open(os.path.join(args.html_dir, filename), encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+    total_mb = sum(len(page.encode("utf-8")) for page in pages) / 1e6
+    print(f"{len(pages)} pages, {total_mb:.1f} MB")
+
+    backends = [BeautifulSoupBackend()]
+    if lxml is not None:
+        backends.append(LxmlBackend())
+
+    # Parse + extract, end to end
+    timings = {
+        "legacy find_all/get_text": lambda html: legacy_clean_and_structure_content(BeautifulSoup(html, "html.parser"))
+    }
+    for backend in backends:
+        timings[f"{backend.name} single-pass"] = lambda html, backend=backend: blocks_to_markdown(backend.extract(html)["blocks"])
+
+    baseline = None
+    for label, extract in timings.items():
+        elapsed = _time_backend(pages, extract, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{label:28s} {elapsed * 1000:9.1f} ms  {total_mb / elapsed:7.2f} MB/s  {baseline / elapsed:5.2f}x")
+
+    # Equivalence against the reference backend
+    if len(backends) > 1:
+        reference, candidate = backends
+        identical_pages = same_text_pages = same_metadata_pages = 0
+        for html in pages:
+            expected = reference.extract(html)
+            actual = candidate.extract(html)
+            identical_pages += expected["blocks"] == actual["blocks"]
+            same_text_pages += _normalized_text(expected["blocks"]) == _normalized_text(actual["blocks"])
+            same_metadata_pages += (
+                expected["title"] == actual["title"] and expected["document_number"] == actual["document_number"]
+            )
+        print(
+            f"{candidate.name} vs {reference.name}: identical blocks {identical_pages}/{len(pages)}, "
+            f"identical text {same_text_pages}/{len(pages)}, identical metadata {same_metadata_pages}/{len(pages)}"
+        )
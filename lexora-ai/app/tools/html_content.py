@@ -0,0 +1,126 @@
+from typing import List, Tuple
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4.element import PreformattedString
+
+
+# Elements that start a new text block; everything else is inline and joins the
+# enclosing block's text
+BLOCK_TAGS = {
+    "p", "div", "li", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article",
+    "blockquote", "pre", "table", "tr", "ul", "ol", "dl", "dt", "dd", "form", "main"
+}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+SKIP_TAGS = {"script", "style", "nav", "header", "footer", "noscript", "template", "head"}
+# Inline elements that separate words
+SEPARATOR_TAGS = {"br", "td", "th"}
+
+# Blocks of this length or shorter are layout noise (numbering, buttons, icons)
+MIN_BLOCK_LENGTH = 10
+
+# (kind, text) where kind is "heading", "list_item" or "paragraph"
+Block = Tuple[str, str]
+
+
+class BlockCollector:
+    """Accumulates inline text and emits each block's own text exactly once"""
+
+    def __init__(self):
+        self.blocks: List[Block] = []
+        self._parts: List[str] = []
+
+    def add_text(self, text: str) -> None:
+        self._parts.append(text)
+
+    def flush(self, tag_name: str) -> None:
+        """Close the text collected so far as a block of the given element type"""
+        if not self._parts:
+            return
+        text = " ".join("".join(self._parts).split())
+        self._parts = []
+        if len(text) <= MIN_BLOCK_LENGTH:
+            return
+        if tag_name in HEADING_TAGS:
+            self.blocks.append(("heading", text))
+        elif tag_name == "li":
+            self.blocks.append(("list_item", text))
+        else:
+            self.blocks.append(("paragraph", text))
+
+
+def extract_blocks(root: Tag) -> List[Block]:
+    """Walk a BeautifulSoup tree once and return its text blocks in document order.
+
+    Text directly inside a block element belongs to that block; nested blocks are
+    emitted separately, so no text is repeated.
+    """
+    collector = BlockCollector()
+    open_blocks: List[str] = []
+    # Entries are nodes to visit, or (block name,) markers that close a block
+    stack: list = [root]
+
+    while stack:
+        node = stack.pop()
+
+        if type(node) is tuple:
+            collector.flush(node[0])
+            open_blocks.pop()
+            continue
+
+        if isinstance(node, NavigableString):
+            if not isinstance(node, PreformattedString):  # comments, doctype, CDATA
+                collector.add_text(node)
+            continue
+
+        name = node.name
+        if name in SKIP_TAGS:
+            continue
+        if name in SEPARATOR_TAGS:
+            collector.add_text(" ")
+
+        if name in BLOCK_TAGS:
+            collector.flush(open_blocks[-1] if open_blocks else "p")
+            open_blocks.append(name)
+            stack.append((name,))
+
+        stack.extend(reversed(node.contents))
+
+    collector.flush(open_blocks[-1] if open_blocks else "p")
+    return collector.blocks
+
+
+def blocks_to_markdown(blocks: List[Block]) -> str:
+    """Render blocks in the parser's markdown format"""
+    rendered = []
+    for kind, text in blocks:
+        if kind == "heading":
+            rendered.append(f"\n## {text}\n")
+        elif kind == "list_item":
+            rendered.append(f"- {text}")
+        else:
+            rendered.append(text)
+    return "\n\n".join(rendered)
+
+
+def find_content_root(soup: BeautifulSoup) -> Tag:
+    """Locate the main document container"""
+    return soup.find("div", class_="document-content") or soup.find("div", id="content") or soup
+
+
+def legacy_clean_and_structure_content(soup: BeautifulSoup) -> str:
+    """Previous find_all/get_text extraction, kept as the benchmark baseline in html_backends"""
+    for element in soup(['script', 'style', 'nav', 'header', 'footer']):
+        element.decompose()
+
+    content_div = find_content_root(soup)
+
+    paragraphs = []
+    for element in content_div.find_all(['p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li']):
+        text = element.get_text().strip()
+        if text and len(text) > 10:
+            if element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']:
+                paragraphs.append(f"\n## {text}\n")
+            else:
+                paragraphs.append(text)
+
+    return "\n\n".join(paragraphs)
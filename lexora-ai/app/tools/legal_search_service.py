@@ -1,8 +1,12 @@
 import re
+import copy
 import json
-from typing import List, Dict, Any, Annotated
+import asyncio
+import functools
+from typing import List, Dict, Any, Annotated, Optional, Callable
 from datetime import datetime
 
+import httpx
 from dotenv import load_dotenv
 from langchain_core.tools import tool, InjectedToolCallId
 from langchain_core.messages import ToolMessage
@@ -10,18 +14,97 @@ from langchain_community.utilities.brave_search import BraveSearchWrapper
 from langgraph.prebuilt import InjectedState
 from langgraph.types import Command
 
+from app.core.config import settings
+from app.core.background_loop import BackgroundLoop
 from app.schemas.consultation_state import SearchResult
+from app.tools.search_cache import SearchResultCache
+from app.tools.single_flight import AsyncSingleFlight
+from app.tools.rate_limiter import PriorityRateLimiter, SearchPriority
+from app.tools.search_backend import SearchBackend
+from app.tools.vector_index import hybrid_scorer
 
 load_dotenv()
 
 
-class LegalSearchService:
-    """Legal document search tool using Brave Search API with lex.uz filtering"""
+class BraveRateLimitError(Exception):
+    """Raised when Brave Search answers with HTTP 429"""
+    
+    def __init__(self, retry_after: float):
+        super().__init__(f"HTTP error 429 (retry after {retry_after}s)")
+        self.retry_after = retry_after
+
+
+class BraveSearchBackend(SearchBackend):
+    """Brave Search API backend with lex.uz filtering"""
+    
+    name = "brave"
     
     def __init__(self, max_results: int = 10):
+        # The wrapper is kept for its API key, base URL and search kwargs handling;
+        # requests themselves go through the pooled async client below
         self.brave_search = BraveSearchWrapper(
             search_kwargs={"count": max_results}
         )
+        self.timeout = settings.BRAVE_SEARCH_TIMEOUT
+        self.limits = httpx.Limits(
+            max_connections=settings.BRAVE_SEARCH_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.BRAVE_SEARCH_MAX_KEEPALIVE,
+            keepalive_expiry=settings.BRAVE_SEARCH_KEEPALIVE_EXPIRY
+        )
+        # Created lazily on the search service loop so the pool lives there
+        self._client: Optional[httpx.AsyncClient] = None
+        
+        # Brave API quota: interactive searches are served ahead of research fan-out
+        self.rate_limiter = PriorityRateLimiter(
+            rate=settings.BRAVE_SEARCH_RATE_LIMIT,
+            burst=settings.BRAVE_SEARCH_BURST
+        )
+        self.max_rate_limit_retries = settings.BRAVE_SEARCH_MAX_RETRIES
+        # Priority of each search in progress, raised when a more urgent caller joins it
+        self._priorities: Dict[str, int] = {}
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client (must be called on the service loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                headers={"Accept": "application/json"}
+            )
+        return self._client
+    
+    async def _brave_search_request(self, query: str, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Send a single Brave Search request through the pooled client"""
+        client = self._get_client()
+        params = {**self.brave_search.search_kwargs, "q": query, "extra_snippets": True}
+        headers = {"X-Subscription-Token": self.brave_search.api_key.get_secret_value()}
+        
+        response = await client.get(
+            self.brave_search.base_url,
+            params=params,
+            headers=headers,
+            timeout=timeout if timeout is not None else self.timeout
+        )
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.headers.get("Retry-After", "1"))
+            except ValueError:
+                retry_after = 1.0
+            raise BraveRateLimitError(retry_after)
+        if response.is_error:
+            raise Exception(f"HTTP error {response.status_code}")
+        
+        # Same result shape as BraveSearchWrapper.run
+        return [
+            {
+                "title": item.get("title"),
+                "link": item.get("url"),
+                "snippet": " ".join(
+                    filter(None, [item.get("description"), *item.get("extra_snippets", [])])
+                )
+            }
+            for item in response.json().get("web", {}).get("results", [])
+        ]
     
     def extract_document_info(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Extract and structure document information from Brave search results"""
@@ -44,7 +127,8 @@ class LegalSearchService:
                 date_match = re.search(r'ONDATE=(\d{2}\.\d{2}\.\d{4})', url)
                 document_date = date_match.group(1) if date_match else ""
                 
-                # Calculate relevance score (simple heuristic)
+                # Query-independent heuristic score; the hybrid reranker replaces it
+                # with query term overlap fused with dense similarity
                 relevance_score = self._calculate_relevance_score(title, description, url)
                 
                 documents.append({
@@ -97,89 +181,125 @@ class LegalSearchService:
         
         return min(score, 1.0)  # Cap at 1.0
     
-    def search_legal_documents(self, query: str, site_filter: str = None) -> Dict[str, Any]:
-        """Search for legal documents using Brave Search with lex.uz filtering"""
-        try:
-            # Use proper site filtering with Brave Search syntax
-            if site_filter:
-                search_query = f"{query.strip()} site:{site_filter}"
-            else:
-                # Use site:lex.uz to search specifically within lex.uz
-                search_query = f"{query.strip()} site:lex.uz"
-            
-            # Perform search using BraveSearchWrapper
+    def _build_search_query(self, query: str, site_filter: Optional[str] = None) -> str:
+        """Build a Brave Search query with proper site filtering"""
+        if site_filter:
+            return f"{query.strip()} site:{site_filter}"
+        # Use site:lex.uz to search specifically within lex.uz
+        return f"{query.strip()} site:lex.uz"
+    
+    def _process_search_results(self, search_results: Any) -> Dict[str, Any]:
+        """Normalize raw Brave Search output into the documents response"""
+        # Handle empty or None results
+        if not search_results:
+            return {
+                "search_successful": True,
+                "total_found": 0,
+                "documents": []
+            }
+        
+        # The error suggests the issue is in how we handle the response
+        # Let's be more defensive and check what we actually got
+        web_results = []
+        
+        if isinstance(search_results, str):
+            # If it's JSON string, parse it
             try:
-                search_results = self.brave_search.run(search_query)
-            except Exception as wrapper_error:
+                results_data = json.loads(search_results)
+                if isinstance(results_data, dict):
+                    web_results = results_data.get("web", {}).get("results", [])
+                elif isinstance(results_data, list):
+                    web_results = results_data
+            except json.JSONDecodeError as e:
                 return {
                     "search_successful": False,
-                    "error": f"BraveSearchWrapper error: {str(wrapper_error)}",
-                    "total_found": 0,
-                    "documents": []
-                }
-            
-            # Handle empty or None results
-            if not search_results:
-                return {
-                    "search_successful": True,
+                    "error": f"Failed to parse Brave Search JSON: {str(e)}",
                     "total_found": 0,
                     "documents": []
                 }
-            
-            # The error suggests the issue is in how we handle the response
-            # Let's be more defensive and check what we actually got
-            web_results = []
-            
-            if isinstance(search_results, str):
-                # If it's JSON string, parse it
+        elif isinstance(search_results, list):
+            # If it's already a list of results, use directly
+            web_results = search_results
+        elif isinstance(search_results, dict):
+            # If it's a dict, try different extraction paths
+            web_results = (search_results.get("web", {}).get("results", []) or 
+                         search_results.get("results", []) or
+                         [])
+        else:
+            return {
+                "search_successful": False,
+                "error": f"Unexpected response format: {type(search_results).__name__}",
+                "total_found": 0,
+                "documents": []
+            }
+        
+        # Ensure we have a list to work with
+        if not isinstance(web_results, list):
+            return {
+                "search_successful": False,
+                "error": f"Expected list of results, got {type(web_results).__name__}",
+                "total_found": 0,
+                "documents": []
+            }
+        
+        
+        if not web_results:
+            return {
+                "search_successful": True,
+                "total_found": 0,
+                "documents": []
+            }
+        
+        # Extract and structure results
+        return self.extract_document_info(web_results)
+    
+    async def search(
+        self,
+        query: str,
+        site_filter: Optional[str] = None,
+        timeout: Optional[float] = None,
+        priority: int = SearchPriority.INTERACTIVE,
+        on_queue_position: Optional[Callable[[int], None]] = None
+    ) -> Dict[str, Any]:
+        """Query Brave Search within the API quota and normalize the response"""
+        search_query = self._build_search_query(query, site_filter)
+        self._priorities[search_query] = min(priority, self._priorities.get(search_query, priority))
+        try:
+            for attempt in range(self.max_rate_limit_retries + 1):
+                # Wait for a quota token before every upstream call
+                await self.rate_limiter.acquire(self._priorities[search_query], on_queue_position, key=search_query)
+                
+                # Perform search using the pooled Brave client
                 try:
-                    results_data = json.loads(search_results)
-                    if isinstance(results_data, dict):
-                        web_results = results_data.get("web", {}).get("results", [])
-                    elif isinstance(results_data, list):
-                        web_results = results_data
-                except json.JSONDecodeError as e:
+                    search_results = await self._brave_search_request(search_query, timeout=timeout)
+                    break
+                except BraveRateLimitError as rate_limit_error:
+                    # Hold back every queued caller, then retry this one
+                    self.rate_limiter.pause(rate_limit_error.retry_after)
+                    if attempt < self.max_rate_limit_retries:
+                        continue
                     return {
                         "search_successful": False,
-                        "error": f"Failed to parse Brave Search JSON: {str(e)}",
+                        "error": f"Brave Search rate limit exceeded after {attempt + 1} attempts",
+                        "total_found": 0,
+                        "documents": []
+                    }
+                except httpx.TimeoutException:
+                    return {
+                        "search_successful": False,
+                        "error": f"Brave Search timed out after {timeout if timeout is not None else self.timeout}s",
+                        "total_found": 0,
+                        "documents": []
+                    }
+                except Exception as request_error:
+                    return {
+                        "search_successful": False,
+                        "error": f"Brave Search request error: {str(request_error)}",
                         "total_found": 0,
                         "documents": []
                     }
-            elif isinstance(search_results, list):
-                # If it's already a list of results, use directly
-                web_results = search_results
-            elif isinstance(search_results, dict):
-                # If it's a dict, try different extraction paths
-                web_results = (search_results.get("web", {}).get("results", []) or 
-                             search_results.get("results", []) or
-                             [])
-            else:
-                return {
-                    "search_successful": False,
-                    "error": f"Unexpected response format: {type(search_results).__name__}",
-                    "total_found": 0,
-                    "documents": []
-                }
-            
-            # Ensure we have a list to work with
-            if not isinstance(web_results, list):
-                return {
-                    "search_successful": False,
-                    "error": f"Expected list of results, got {type(web_results).__name__}",
-                    "total_found": 0,
-                    "documents": []
-                }
-            
-            
-            if not web_results:
-                return {
-                    "search_successful": True,
-                    "total_found": 0,
-                    "documents": []
-                }
             
-            # Extract and structure results
-            return self.extract_document_info(web_results)
+            return self._process_search_results(search_results)
             
         except Exception as e:
             return {
@@ -188,6 +308,216 @@ class LegalSearchService:
                 "total_found": 0,
                 "documents": []
             }
+        finally:
+            self._priorities.pop(search_query, None)
+    
+    def promote(self, query: str, site_filter: Optional[str], priority: int) -> None:
+        """Serve a search in progress at a more urgent priority, including while it is queued"""
+        search_query = self._build_search_query(query, site_filter)
+        if search_query in self._priorities and priority < self._priorities[search_query]:
+            self._priorities[search_query] = priority
+            self.rate_limiter.promote(search_query, priority)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return Brave quota metrics"""
+        return {
+            "rate_limiter": self.rate_limiter.stats()
+        }
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LegalSearchService:
+    """Legal document search service with caching, request coalescing and pluggable backends"""
+    
+    def __init__(self, max_results: int = 10, backend: Optional[SearchBackend] = None):
+        self.max_results = max_results
+        self.backend = backend or self._create_backend(settings.SEARCH_BACKEND)
+        
+        # Long-lived event loop that owns backend resources such as the HTTP
+        # connection pool. Sync and async callers from any thread share it.
+        self._loop = BackgroundLoop("legal-search-loop")
+        
+        # Successful responses are cached per normalized query + site filter
+        self.cache = SearchResultCache(
+            max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+            ttl=settings.SEARCH_CACHE_TTL,
+            db_path=settings.SEARCH_CACHE_DB_PATH or None
+        )
+        # Identical searches already in flight share a single upstream call
+        self._in_flight = AsyncSingleFlight()
+        # Dense+lexical reranking is applied on top of raw (cached) backend results
+        self.reranker = hybrid_scorer if settings.HYBRID_RERANK else None
+    
+    def _create_backend(self, name: str) -> SearchBackend:
+        """Create the search backend selected in settings"""
+        if name == "brave":
+            return BraveSearchBackend(max_results=self.max_results)
+        if name == "local":
+            from app.tools.bm25_index import LocalIndexSearchBackend
+            return LocalIndexSearchBackend(
+                index_path=settings.LOCAL_INDEX_PATH,
+                max_results=self.max_results
+            )
+        raise ValueError(f"Unknown search backend: {name}")
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return search service metrics"""
+        return {
+            "backend": self.backend.name,
+            "cache": self.cache.stats(),
+            "in_flight": self._in_flight.stats(),
+            **self.backend.get_metrics()
+        }
+    
+    async def aclose(self) -> None:
+        """Release backend resources and stop the background loop"""
+        if not self._loop.started:
+            return
+        
+        await self._loop.run(self.backend.aclose())
+        self._loop.stop()
+    
+    async def _asearch(
+        self,
+        query: str,
+        site_filter: Optional[str],
+        timeout: Optional[float],
+        priority: int = SearchPriority.INTERACTIVE,
+        on_queue_position: Optional[Callable[[int], None]] = None
+    ) -> Dict[str, Any]:
+        """Search implementation, always executed on the service loop"""
+        # Backends rank differently, so their responses are cached separately
+        cache_key = f"{self.backend.name}:{self.cache.make_key(query, site_filter)}"
+        cached_response = self.cache.get(cache_key)
+        if cached_response is not None:
+            return self._rerank(query, cached_response)
+        
+        async def _fetch() -> Dict[str, Any]:
+            response = await self.backend.search(query, site_filter, timeout, priority, on_queue_position)
+            if response["search_successful"]:
+                self.cache.set(cache_key, response)
+            return response
+        
+        # A caller joining a running search shares its upstream call, so that call must
+        # not keep waiting for quota at a less urgent priority than the joining caller
+        if self._in_flight.in_flight(cache_key):
+            self.backend.promote(query, site_filter, priority)
+        
+        # Waiters get their own copy, the same way cache hits do
+        response = await self._in_flight.do(cache_key, _fetch)
+        return self._rerank(query, copy.deepcopy(response))
+    
+    def _rerank(self, query: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Rescore response documents with the hybrid scorer when enabled"""
+        if self.reranker is not None and response.get("documents"):
+            response["documents"] = self.reranker.rerank(query, response["documents"], self.backend.lexical_scores)
+        return response
+    
+    async def asearch_legal_documents(
+        self,
+        query: str,
+        site_filter: str = None,
+        timeout: Optional[float] = None,
+        priority: int = SearchPriority.INTERACTIVE,
+        on_queue_position: Optional[Callable[[int], None]] = None
+    ) -> Dict[str, Any]:
+        """Search for legal documents asynchronously without blocking the caller's event loop.
+        
+        on_queue_position is called with the caller's 1-based queue position whenever
+        the search has to wait for API quota (it runs on the service loop thread).
+        """
+        return await self._loop.run(self._asearch(query, site_filter, timeout, priority, on_queue_position))
+    
+    def search_legal_documents(
+        self,
+        query: str,
+        site_filter: str = None,
+        timeout: Optional[float] = None,
+        priority: int = SearchPriority.INTERACTIVE,
+        on_queue_position: Optional[Callable[[int], None]] = None
+    ) -> Dict[str, Any]:
+        """Search for legal documents using Brave Search with lex.uz filtering"""
+        return self._loop.run_sync(self._asearch(query, site_filter, timeout, priority, on_queue_position))
+    
+    async def _asearch_many(
+        self,
+        queries: List[str],
+        site_filter: Optional[str],
+        max_concurrency: int,
+        deadline: float,
+        priority: int,
+        on_queue_position: Optional[Callable[[str, int], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """Fan-out implementation, always executed on the service loop"""
+        semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+        
+        async def _search_one(query: str) -> Dict[str, Any]:
+            report = functools.partial(on_queue_position, query) if on_queue_position else None
+            async with semaphore:
+                try:
+                    # The deadline starts once the query gets a concurrency slot; it covers
+                    # the wait for API quota in the rate limiter as well as the request
+                    return await asyncio.wait_for(
+                        self._asearch(query, site_filter, deadline, priority, report),
+                        timeout=deadline
+                    )
+                except asyncio.TimeoutError:
+                    return {
+                        "search_successful": False,
+                        "error": f"Search deadline of {deadline}s exceeded",
+                        "total_found": 0,
+                        "documents": []
+                    }
+        
+        return await asyncio.gather(*[_search_one(query) for query in queries])
+    
+    async def asearch_many(
+        self,
+        queries: List[str],
+        site_filter: str = None,
+        max_concurrency: Optional[int] = None,
+        deadline: Optional[float] = None,
+        priority: int = SearchPriority.RESEARCH,
+        on_queue_position: Optional[Callable[[str, int], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """Run several searches concurrently and return one response per query, in order.
+        
+        A query that fails or misses its deadline yields an unsuccessful response
+        without affecting the others. on_queue_position is called with the query and
+        its queue position while that search waits for API quota.
+        """
+        return await self._loop.run(self._asearch_many(
+            queries,
+            site_filter,
+            max_concurrency or settings.MULTI_SEARCH_CONCURRENCY,
+            deadline or settings.MULTI_SEARCH_QUERY_DEADLINE,
+            priority,
+            on_queue_position
+        ))
+    
+    def search_many(
+        self,
+        queries: List[str],
+        site_filter: str = None,
+        max_concurrency: Optional[int] = None,
+        deadline: Optional[float] = None,
+        priority: int = SearchPriority.RESEARCH,
+        on_queue_position: Optional[Callable[[str, int], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """Blocking variant of asearch_many for sync tools"""
+        return self._loop.run_sync(self._asearch_many(
+            queries,
+            site_filter,
+            max_concurrency or settings.MULTI_SEARCH_CONCURRENCY,
+            deadline or settings.MULTI_SEARCH_QUERY_DEADLINE,
+            priority,
+            on_queue_position
+        ))
 
 
 # Create global instance
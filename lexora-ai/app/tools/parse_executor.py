@@ -0,0 +1,184 @@
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional
+
+from app.tools.html_backends import HtmlParserBackend, create_html_backend
+from app.tools.html_content import blocks_to_markdown
+from app.tools.document_structure import build_structure_index
+
+
+_WARM_UP_HTML = "<html><head><title>warm-up</title></head><body><div id='content'><p>Статья 1. Warm-up paragraph</p></div></body></html>"
+
+# Per-process backend, created by the pool initializer
+_worker_backend: Optional[HtmlParserBackend] = None
+
+
+def extract_page(html: str, backend: HtmlParserBackend) -> Dict[str, Any]:
+    """Parse a page into {"title", "document_number", "markdown", "structure"}.
+
+    Only these compact results cross the process boundary, never the parse tree.
+    """
+    page = backend.extract(html)
+    markdown = blocks_to_markdown(page["blocks"])
+    return {
+        "title": page["title"],
+        "document_number": page["document_number"],
+        "markdown": markdown,
+        "structure": build_structure_index(markdown)
+    }
+
+
+def _init_worker(backend_name: str) -> None:
+    """Import the parser stack and run one parse so the first real job starts hot"""
+    global _worker_backend
+    _worker_backend = create_html_backend(backend_name)
+    extract_page(_WARM_UP_HTML, _worker_backend)
+
+
+def _parse_in_worker(html: str) -> Dict[str, Any]:
+    return extract_page(html, _worker_backend)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class ParseExecutor:
+    """Bounded process pool for CPU-bound HTML parsing.
+
+    At most max_workers pages are parsed at once and at most max_queue more wait for
+    a worker; further callers block until a slot frees up. With max_workers=0 pages
+    are parsed in the calling thread. If a worker dies, the jobs on the pool fail
+    and the next parse starts a fresh pool.
+    """
+
+    def __init__(self, backend_name: str, max_workers: int = 2, max_queue: int = 16, start_method: str = "spawn"):
+        self.backend_name = backend_name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.start_method = start_method
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inline_backend: Optional[HtmlParserBackend] = None
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue) if max_workers > 0 else None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "max_queue_depth": 0,
+            "pool_restarts": 0,
+            "slot_wait_seconds": 0.0,
+            "parse_seconds": 0.0
+        }
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(self.backend_name,)
+                )
+            return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Drop a broken pool so the next job creates a new one"""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self._stats["pool_restarts"] += 1
+        print("Parse worker died, restarting the parse pool")
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def start(self) -> None:
+        """Spawn and warm every worker up front instead of on the first parse"""
+        if self.max_workers <= 0:
+            return
+        pool = self._get_pool()
+        for future in [pool.submit(_ping) for _ in range(self.max_workers)]:
+            future.result()
+
+    def _submit(self, html: str) -> Future:
+        """Submit a page, blocking while the pool and its queue are full"""
+        started = time.perf_counter()
+        self._slots.acquire()
+        submitted_at = time.perf_counter()
+
+        with self._lock:
+            self._stats["slot_wait_seconds"] += submitted_at - started
+            self._stats["submitted"] += 1
+            self._pending += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queue_depth())
+
+        try:
+            pool = self._get_pool()
+            try:
+                future = pool.submit(_parse_in_worker, html)
+            except BrokenProcessPool:
+                # A worker died since the last job: retry once on a new pool
+                self._discard_pool(pool)
+                pool = self._get_pool()
+                future = pool.submit(_parse_in_worker, html)
+        except Exception:
+            self._finish(submitted_at, failed=True)
+            raise
+        future.add_done_callback(lambda f: self._job_done(f, pool, submitted_at))
+        return future
+
+    def _job_done(self, future: Future, pool: ProcessPoolExecutor, submitted_at: float) -> None:
+        failed = future.cancelled() or future.exception() is not None
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._discard_pool(pool)
+        self._finish(submitted_at, failed=failed)
+
+    def _finish(self, submitted_at: float, failed: bool) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._stats["failed" if failed else "completed"] += 1
+            self._stats["parse_seconds"] += time.perf_counter() - submitted_at
+        self._slots.release()
+
+    def _queue_depth(self) -> int:
+        """Jobs waiting for a worker (lock must be held)"""
+        return max(self._pending - self.max_workers, 0)
+
+    def parse(self, html: str) -> Dict[str, Any]:
+        """Parse a page on the pool (or inline when the pool is disabled)"""
+        if self.max_workers <= 0:
+            if self._inline_backend is None:
+                self._inline_backend = create_html_backend(self.backend_name)
+            return extract_page(html, self._inline_backend)
+        return self._submit(html).result()
+
+    async def aparse(self, html: str) -> Dict[str, Any]:
+        """Async variant of parse; waiting for a queue slot happens off the event loop"""
+        if self.max_workers <= 0:
+            return await asyncio.to_thread(self.parse, html)
+        future = await asyncio.to_thread(self._submit, html)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self._stats["completed"] + self._stats["failed"]
+            return {
+                **self._stats,
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._pending,
+                "queue_depth": self._queue_depth(),
+                "avg_parse_ms": round(1000 * self._stats["parse_seconds"] / finished, 2) if finished else 0.0
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,154 @@
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+
+CURRENT_EDITION = "current"
+
+
+class ParsedDocumentStore:
+    """Process-wide store of successful parse_legal_document results.
+
+    Entries are keyed by document ID and edition date (lex.uz ONDATE), so every
+    session citing the same act shares one parsed copy and session state only keeps
+    references. The memory tier is an LRU bounded by total content size, with an
+    optional SQLite tier (also size-bounded) that survives restarts. Dated editions
+    never change; the current edition is re-parsed after current_ttl seconds so
+    amendments are picked up. Results are treated as immutable by callers.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        current_ttl: float = 86400.0,
+        db_path: Optional[str] = None,
+        disk_max_bytes: int = 2 * 1024 * 1024 * 1024
+    ):
+        self.max_bytes = max_bytes
+        self.current_ttl = current_ttl
+        self.disk_max_bytes = disk_max_bytes
+        # key -> (stored_at, size, result)
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS parsed_documents ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(document_id: str, edition_date: Optional[str] = None) -> str:
+        return f"{document_id}@{edition_date or CURRENT_EDITION}"
+
+    def _expired(self, key: str, stored_at: float, now: float) -> bool:
+        return key.endswith(f"@{CURRENT_EDITION}") and now - stored_at > self.current_ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, size, result = entry
+                if not self._expired(key, stored_at, now):
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return result
+                del self._entries[key]
+                self._size -= size
+                self._stats["expirations"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, size, stored_at FROM parsed_documents WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value_json, size, stored_at = row
+                    if not self._expired(key, stored_at, now):
+                        result = json.loads(value_json)
+                        self._db.execute("UPDATE parsed_documents SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        # Promote to the memory tier
+                        self._store_in_memory(key, stored_at, size, result)
+                        self._stats["hits"] += 1
+                        self._stats["disk_hits"] += 1
+                        return result
+                    self._db.execute("DELETE FROM parsed_documents WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._stats["expirations"] += 1
+
+            self._stats["misses"] += 1
+            return None
+
+    def contains(self, key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return not self._expired(key, entry[0], now)
+            if self._db is not None:
+                row = self._db.execute("SELECT stored_at FROM parsed_documents WHERE key = ?", (key,)).fetchone()
+                return row is not None and not self._expired(key, row[0], now)
+            return False
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        now = time.time()
+        value_json = json.dumps(result, ensure_ascii=False)
+        size = len(value_json.encode("utf-8"))
+
+        with self._lock:
+            self._store_in_memory(key, now, size, result)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO parsed_documents (key, value, size, stored_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, value_json, size, now, now)
+                )
+                self._evict_from_disk()
+                self._db.commit()
+
+    def _store_in_memory(self, key: str, stored_at: float, size: int, result: Dict[str, Any]) -> None:
+        """Insert an entry and evict least recently used ones (lock must be held)"""
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= previous[1]
+        self._entries[key] = (stored_at, size, result)
+        self._size += size
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+            self._stats["evictions"] += 1
+
+    def _evict_from_disk(self) -> None:
+        """Drop least recently accessed rows beyond the disk budget (lock must be held)"""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM parsed_documents").fetchone()[0]
+        if total <= self.disk_max_bytes:
+            return
+        for key, size in self._db.execute(
+            "SELECT key, size FROM parsed_documents ORDER BY accessed_at ASC"
+        ).fetchall():
+            if total <= self.disk_max_bytes:
+                break
+            self._db.execute("DELETE FROM parsed_documents WHERE key = ?", (key,))
+            total -= size
+            self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "persistent": self._db is not None
+            }
@@ -0,0 +1,183 @@
+import re
+import zlib
+import math
+import bisect
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.tools.bm25_index import tokenize
+
+
+# Rough characters-per-token ratio of the chat model tokenizer on Cyrillic legal text
+CHARS_PER_TOKEN = 3.5
+
+_PASSAGE = re.compile(r"(?:[^\n]|\n(?!\s*\n))+")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class PassageIndex:
+    """BM25 index over the paragraphs of one parsed document"""
+
+    def __init__(self, content: str, structure: Optional[List[Dict[str, Any]]] = None, k1: float = 1.2, b: float = 0.75):
+        self.content = content
+        self.k1 = k1
+        self.b = b
+        self.spans: List[Tuple[int, int]] = []
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        lengths = []
+
+        for match in _PASSAGE.finditer(content):
+            text = match.group()
+            stripped = text.strip()
+            if not stripped:
+                continue
+            start = match.start() + (len(text) - len(text.lstrip()))
+            passage_id = len(self.spans)
+            self.spans.append((start, start + len(stripped)))
+            terms = tokenize(stripped)
+            lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                postings[term].append((passage_id, frequency))
+
+        self._postings = {
+            term: (np.asarray([p for p, _ in entries], dtype=np.int32), np.asarray([f for _, f in entries], dtype=np.float32))
+            for term, entries in postings.items()
+        }
+        passage_lengths = np.asarray(lengths, dtype=np.float32)
+        average_length = float(passage_lengths.mean()) if len(passage_lengths) else 1.0
+        self._norms = self.k1 * (1 - self.b + self.b * passage_lengths / max(average_length, 1.0))
+        self._headings = self._assign_headings(structure or [])
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def _assign_headings(self, structure: List[Dict[str, Any]]) -> List[str]:
+        """Innermost enclosing structure heading of every passage"""
+        starts = [entry["start"] for entry in structure]
+        headings = []
+        for start, _ in self.spans:
+            heading = ""
+            i = bisect.bisect_right(starts, start) - 1
+            while i >= 0:
+                entry = structure[i]
+                if entry["end"] > start:
+                    heading = entry["heading"]
+                    break
+                i -= 1
+            headings.append(heading)
+        return headings
+
+    def search(self, question: str, k: int) -> List[Tuple[int, float]]:
+        """Top-k (passage id, score) pairs with a positive score"""
+        scores = np.zeros(len(self.spans), dtype=np.float32)
+        num_passages = len(self.spans)
+        for term in set(tokenize(question)):
+            entry = self._postings.get(term)
+            if entry is None:
+                continue
+            passage_ids, frequencies = entry
+            idf = math.log(1 + (num_passages - len(passage_ids) + 0.5) / (len(passage_ids) + 0.5))
+            scores[passage_ids] += idf * frequencies * (self.k1 + 1) / (frequencies + self._norms[passage_ids])
+
+        candidates = np.flatnonzero(scores > 0)
+        if not len(candidates):
+            return []
+        top = candidates[np.argsort(-scores[candidates], kind="stable")[:k]]
+        return [(int(passage_id), float(scores[passage_id])) for passage_id in top]
+
+    def passage(self, passage_id: int, score: float = 0.0) -> Dict[str, Any]:
+        start, end = self.spans[passage_id]
+        return {
+            "text": self.content[start:end],
+            "start": start,
+            "end": end,
+            "heading": self._headings[passage_id],
+            "score": round(score, 3)
+        }
+
+
+class PassageRetriever:
+    """Question-aware passage selection with per-document indexes built once and cached"""
+
+    def __init__(self, max_documents: int = 64):
+        self.max_documents = max_documents
+        self._indexes: "OrderedDict[Tuple[str, int], PassageIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"index_hits": 0, "index_builds": 0, "evictions": 0}
+
+    def get_index(self, document_id: str, content: str, structure: Optional[List[Dict[str, Any]]] = None) -> PassageIndex:
+        # The checksum keeps a re-parsed (changed) document from reusing a stale index
+        key = (document_id, zlib.crc32(content.encode("utf-8")))
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                self._stats["index_hits"] += 1
+                return index
+
+        index = PassageIndex(content, structure)
+        with self._lock:
+            self._indexes[key] = index
+            self._stats["index_builds"] += 1
+            while len(self._indexes) > self.max_documents:
+                self._indexes.popitem(last=False)
+                self._stats["evictions"] += 1
+        return index
+
+    def retrieve(
+        self,
+        document_id: str,
+        content: str,
+        question: str,
+        structure: Optional[List[Dict[str, Any]]] = None,
+        k: Optional[int] = None,
+        token_budget: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Best passages for the question that fit the token budget, in document order"""
+        k = k or settings.PASSAGE_TOP_K
+        token_budget = token_budget or settings.PASSAGE_TOKEN_BUDGET
+        index = self.get_index(document_id, content, structure)
+
+        selected = []
+        used_tokens = 0
+        for passage_id, score in index.search(question, k):
+            passage = index.passage(passage_id, score)
+            tokens = estimate_tokens(passage["heading"]) + estimate_tokens(passage["text"])
+            if used_tokens + tokens > token_budget:
+                if selected:
+                    continue
+                # Always return something: trim a single oversized passage
+                passage["text"] = passage["text"][:int(token_budget * CHARS_PER_TOKEN)] + "..."
+                tokens = token_budget
+            selected.append(passage)
+            used_tokens += tokens
+
+        return sorted(selected, key=lambda passage: passage["start"])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "cached_documents": len(self._indexes), "max_documents": self.max_documents}
+
+
+def format_passages(passages: List[Dict[str, Any]]) -> str:
+    """Render passages grouped under their article/chapter headings"""
+    parts = []
+    current_heading = None
+    for passage in passages:
+        heading = passage["heading"]
+        if heading and heading != current_heading and heading != passage["text"]:
+            parts.append(f"[{heading}]")
+        current_heading = heading
+        parts.append(passage["text"])
+    return "\n\n".join(parts)
+
+
+# Create global instance
+passage_retriever = PassageRetriever(max_documents=settings.PASSAGE_CACHE_SIZE)
@@ -0,0 +1,179 @@
+import time
+import heapq
+import asyncio
+import itertools
+from enum import IntEnum
+from typing import List, Dict, Any, Optional, Callable, Tuple, Hashable
+
+
+class SearchPriority(IntEnum):
+    """Scheduling priority for upstream search calls (lower is served first)"""
+    INTERACTIVE = 0  # Consultation searches a user is waiting on
+    RESEARCH = 1     # Research multi-search fan-out
+
+
+class PriorityRateLimiter:
+    """Token bucket that hands out tokens to waiting callers in priority order.
+
+    Must be used from a single event loop; only stats() may be called from other
+    threads. Callers that cannot get a token immediately are queued by (priority,
+    arrival order) and can be notified of their queue position as it changes. A
+    queued caller that passed a key can be moved up with promote().
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+        # (priority, arrival order, future, position callback, key)
+        self._waiters: List[Tuple[int, int, asyncio.Future, Optional[Callable[[int], None]], Optional[Hashable]]] = []
+        self._sequence = itertools.count()
+        self._dispatch_handle: Optional[asyncio.TimerHandle] = None
+
+        self._stats = {
+            "granted": 0,
+            "throttled": 0,
+            "throttle_seconds": 0.0,
+            "max_queue_depth": 0,
+            "upstream_rate_limited": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _available(self, now: float) -> float:
+        """Tokens in the bucket at `now`, without updating it"""
+        start = max(self._updated, self._paused_until)
+        if now > start:
+            return min(float(self.burst), self._tokens + (now - start) * self.rate)
+        return self._tokens
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = self._available(now)
+        self._updated = now
+
+    def _can_grant(self) -> bool:
+        return self._tokens >= 1 and time.monotonic() >= self._paused_until
+
+    async def acquire(
+        self,
+        priority: int = SearchPriority.INTERACTIVE,
+        on_queue_position: Optional[Callable[[int], None]] = None,
+        key: Optional[Hashable] = None
+    ) -> float:
+        """Wait for a token and return the seconds spent queued"""
+        if not self.enabled:
+            self._stats["granted"] += 1
+            return 0.0
+
+        self._refill()
+        if not self._waiters and self._can_grant():
+            self._tokens -= 1
+            self._stats["granted"] += 1
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (int(priority), next(self._sequence), future, on_queue_position, key)
+        heapq.heappush(self._waiters, entry)
+        self._stats["throttled"] += 1
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._waiters))
+        self._notify_positions()
+        self._schedule_dispatch()
+
+        started = time.monotonic()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The entry may have been replaced by promote(), so match on the future
+            waiters = [waiter for waiter in self._waiters if waiter[2] is not future]
+            if len(waiters) != len(self._waiters):
+                self._waiters = waiters
+                heapq.heapify(self._waiters)
+                self._notify_positions()
+            raise
+        finally:
+            self._stats["throttle_seconds"] += time.monotonic() - started
+
+        return time.monotonic() - started
+
+    def promote(self, key: Hashable, priority: int) -> bool:
+        """Move queued callers that acquired with this key up to priority; True if any moved"""
+        promoted = False
+        for i, (current, sequence, future, callback, waiter_key) in enumerate(self._waiters):
+            if waiter_key == key and priority < current and not future.done():
+                self._waiters[i] = (int(priority), sequence, future, callback, waiter_key)
+                promoted = True
+        if promoted:
+            heapq.heapify(self._waiters)
+            self._notify_positions()
+        return promoted
+
+    def pause(self, seconds: float) -> None:
+        """Stop granting tokens for a while, e.g. after an upstream 429"""
+        self._stats["upstream_rate_limited"] += 1
+        self._refill()
+        self._tokens = 0.0
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _schedule_dispatch(self) -> None:
+        if self._dispatch_handle is not None or not self._waiters:
+            return
+
+        self._refill()
+        now = time.monotonic()
+        if now < self._paused_until:
+            delay = self._paused_until - now + max(0.0, 1 - self._tokens) / self.rate
+        else:
+            delay = max(0.0, 1 - self._tokens) / self.rate
+        self._dispatch_handle = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def _dispatch(self) -> None:
+        self._dispatch_handle = None
+        self._refill()
+
+        granted = False
+        while self._waiters and self._can_grant():
+            _, _, future, _, _ = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._tokens -= 1
+            self._stats["granted"] += 1
+            future.set_result(None)
+            granted = True
+
+        if granted:
+            self._notify_positions()
+        self._schedule_dispatch()
+
+    def _notify_positions(self) -> None:
+        for position, (_, _, _, callback, _) in enumerate(sorted(self._waiters), 1):
+            if callback is not None:
+                try:
+                    callback(position)
+                except Exception as e:
+                    print(f"Queue position callback failed: {e}")
+
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> Dict[str, Any]:
+        """Read-only snapshot, safe to take from another thread (e.g. the /metrics handler)"""
+        waiters = list(self._waiters)
+        depth_by_priority = {priority.name.lower(): 0 for priority in SearchPriority}
+        for priority, *_ in waiters:
+            name = SearchPriority(priority).name.lower() if priority in SearchPriority._value2member_map_ else str(priority)
+            depth_by_priority[name] = depth_by_priority.get(name, 0) + 1
+
+        return {
+            **self._stats,
+            "queue_depth": len(waiters),
+            "queue_depth_by_priority": depth_by_priority,
+            "tokens_available": round(self._available(time.monotonic()), 2),
+            "rate": self.rate,
+            "burst": self.burst
+        }
@@ -1,6 +1,7 @@
 from typing import List, Dict, Any, Annotated, Optional
 from langchain_core.tools import tool, InjectedToolCallId
 from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.prebuilt import InjectedState
 from langgraph.types import Command, interrupt
 from datetime import datetime
@@ -8,10 +9,17 @@ import re
 
 from app.schemas.research_state import (
     SearchResult, ValidationResult, MultiSearchQuery, 
-    DocumentContent, Artifact, ArtifactVersion
+    DocumentContent, DocumentRef, Artifact, ArtifactVersion
 )
 from app.tools.legal_search_service import legal_search_service
+from app.tools.rate_limiter import SearchPriority
+from app.tools.bm25_index import tokenize
+from app.tools.vector_index import hybrid_scorer
+from app.core.config import settings
+from app.core.streaming import search_queue_reporter
 from app.tools.document_parser import legal_parser_instance
+from app.tools.document_structure import build_structure_index
+from app.tools.passage_retriever import passage_retriever, format_passages
 
 
 @tool
@@ -160,12 +168,13 @@ def execute_multi_search(
     search_queries_planned: Annotated[List[MultiSearchQuery], InjectedState("search_queries_planned")],
     search_queries_executed: Annotated[List[str], InjectedState("search_queries_executed")],
     raw_search_results: Annotated[List[SearchResult], InjectedState("raw_search_results")],
-    tool_call_id: Annotated[str, InjectedToolCallId]
+    tool_call_id: Annotated[str, InjectedToolCallId],
+    config: RunnableConfig
 ) -> Command:
     """⚠️ PREREQUISITE: Must call `generate_multi_search_strategy` first to plan search queries.
     
     Execute the planned search queries using Brave Search and collect legal documents.
-    This tool runs 3-5 progressive searches from general to specific terms.
+    This tool runs 3-5 progressive searches from general to specific terms concurrently.
     
     WORKFLOW REQUIREMENT: This is Step 2 of the mandatory research sequence:
     1. generate_multi_search_strategy → 2. execute_multi_search → 3. validate_and_rank_sources → 4. request_source_approval
@@ -188,14 +197,21 @@ def execute_multi_search(
     
     new_results = []
     executed_queries = []
+    failed_queries = []
+    
+    pending_queries = [
+        query_plan.query for query_plan in search_queries_planned
+        if query_plan.query not in search_queries_executed  # Skip already executed
+    ]
+    
+    # Execute all pending searches concurrently using Brave Search
+    search_responses = legal_search_service.search_many(
+        pending_queries,
+        priority=SearchPriority.RESEARCH,
+        on_queue_position=search_queue_reporter(config)
+    )
     
-    for query_plan in search_queries_planned:
-        if query_plan.query in search_queries_executed:
-            continue  # Skip already executed
-            
-        # Execute search using Brave Search
-        search_response = legal_search_service.search_legal_documents(query_plan.query)
-        
+    for query, search_response in zip(pending_queries, search_responses):
         if search_response["search_successful"] and search_response["documents"]:
             # Convert to SearchResult objects
             for doc in search_response["documents"]:
@@ -209,7 +225,9 @@ def execute_multi_search(
                 )
                 new_results.append(search_result)
             
-            executed_queries.append(query_plan.query)
+            executed_queries.append(query)
+        elif not search_response["search_successful"]:
+            failed_queries.append(query)
     
     # Remove duplicates based on document_id
     all_results = raw_search_results + new_results
@@ -221,8 +239,18 @@ def execute_multi_search(
             unique_results.append(result)
             seen_ids.add(result.document_id)
     
+    # Warm the top hits while the agent validates and the user approves sources
+    if settings.PREFETCH_ENABLED and new_results:
+        top_results = sorted(unique_results, key=lambda r: r.relevance_score, reverse=True)[:settings.PREFETCH_TOP_N]
+        legal_parser_instance.prefetch(
+            [result.url for result in top_results],
+            owner=config.get("configurable", {}).get("thread_id", "default")
+        )
+    
     # Create detailed results for agent visibility
     execution_summary = f"Executed {len(executed_queries)} searches, found {len(new_results)} new documents, total unique: {len(unique_results)}"
+    if failed_queries:
+        execution_summary += f"\n{len(failed_queries)} searches failed or timed out: {', '.join(failed_queries)}"
     
     if unique_results:
         detailed_results = f"{execution_summary}\n\nFound documents:\n"
@@ -284,88 +312,50 @@ def validate_and_rank_sources(
         )
     
     validated_results = []
-    question_keywords = set(current_user_question.lower().split())
-    
-    # Enhanced keyword matching for pension research
-    pension_keywords = {'пенсия', 'пенсии', 'пенсионн', 'размер', 'минимальн', 'повышен', 'сум', 'выплат'}
-    year_keywords = {'2023', '2024', '2025'}
-    amount_keywords = {'000', 'сум', 'размер', 'миқдор'}
-    
-    for result in raw_search_results:
-        # Calculate relevance based on title and snippet
-        title_lower = result.title.lower()
-        snippet_lower = result.snippet.lower() if result.snippet else ""
-        combined_text = title_lower + " " + snippet_lower
-        
-        title_words = set(title_lower.split())
-        snippet_words = set(snippet_lower.split()) if snippet_lower else set()
-        all_words = title_words.union(snippet_words)
-        
-        # Base keyword overlap score
-        title_overlap = len(question_keywords.intersection(title_words)) / max(len(question_keywords), 1)
-        snippet_overlap = len(question_keywords.intersection(snippet_words)) / max(len(question_keywords), 1)
-        
-        # Enhanced scoring for pension-specific content
-        pension_score = 0
-        year_score = 0
-        amount_score = 0
-        
-        # Pension keywords bonus
-        pension_matches = len(pension_keywords.intersection(all_words))
-        if pension_matches > 0:
-            pension_score = min(pension_matches * 0.2, 0.4)  # Up to 0.4 bonus
-        
-        # Year keywords bonus - critical for this question
-        year_matches = len(year_keywords.intersection(all_words))
-        if year_matches > 0:
-            year_score = min(year_matches * 0.3, 0.6)  # Up to 0.6 bonus for years
-        
-        # Check for specific years in title (extra bonus)
-        if any(year in title_lower for year in year_keywords):
-            year_score += 0.2
-        
-        # Amount/number bonus (for documents with actual pension amounts)
-        if any(amt_word in combined_text for amt_word in amount_keywords):
-            amount_score = 0.2
-            
-        # Special bonus for documents about pension increases
-        if 'повышении размеров' in title_lower and any(word in title_lower for word in ['пенси', 'пособ']):
-            pension_score += 0.3
-            
-        # Combined relevance score with enhanced weighting
-        base_score = (title_overlap * 0.3 + snippet_overlap * 0.2 + result.relevance_score * 0.2)
-        enhanced_score = base_score + pension_score + year_score + amount_score
+    question_terms = set(tokenize(current_user_question))
+    question_years = set(re.findall(r'\b(?:19|20)\d{2}\b', current_user_question))
+    
+    # Lexical overlap of the stemmed question terms with title and snippet, and dense
+    # similarity, each scored for every source in one batch. The search relevance_score
+    # already fuses both for the search query, so it is not mixed in again
+    lexical_scores = hybrid_scorer.lexical_scores(
+        current_user_question,
+        [{"title": result.title, "snippet": result.snippet} for result in raw_search_results]
+    )
+    dense_scores = hybrid_scorer.dense_scores(
+        current_user_question,
+        [f"{result.title} {result.snippet}" for result in raw_search_results],
+        [result.document_id for result in raw_search_results]
+    )
+    fused_scores = hybrid_scorer.fuse(lexical_scores, dense_scores)
+    
+    for result, dense_score, fused_score in zip(raw_search_results, dense_scores, fused_scores):
+        title_terms = set(tokenize(result.title))
+        snippet_terms = set(tokenize(result.snippet)) if result.snippet else set()
+        combined_text = f"{result.title} {result.snippet}".lower()
+        matched_terms = question_terms.intersection(title_terms.union(snippet_terms))
         
-        relevance_score = min(enhanced_score, 1.0)  # Cap at 1.0
+        # Bonus for documents mentioning the years the question asks about
+        matched_years = sorted(year for year in question_years if year in combined_text)
+        year_score = 0.15 * len(matched_years) / len(question_years) if question_years else 0
         
-        # Lower threshold for enhanced algorithm
-        is_relevant = relevance_score >= 0.25 or (pension_score > 0 and year_score > 0)
+        # Hybrid relevance: lexical and dense scores fused once, plus year bonus
+        relevance_score = min(float(fused_score) + year_score, 1.0)
+        is_relevant = relevance_score >= settings.VALIDATION_RELEVANCE_THRESHOLD
         
-        # Generate enhanced reasoning based on scoring factors
+        # Generate reasoning based on scoring factors
         if is_relevant:
-            reasons = []
+            reasons = [f"Semantic similarity {float(dense_score):.2f}"]
             
-            if year_score > 0:
-                matched_years = [year for year in year_keywords if year in combined_text]
-                reasons.append(f"Contains target years: {', '.join(matched_years)}")
-                
-            if pension_score > 0:
-                pension_matches = pension_keywords.intersection(all_words)
-                if pension_matches:
-                    reasons.append(f"Pension-related terms: {', '.join(list(pension_matches)[:2])}")
-                    
-            if 'повышении размеров' in title_lower:
-                reasons.append("Document about increasing pension/salary amounts")
+            if matched_terms:
+                reasons.append(f"Matching terms: {', '.join(sorted(matched_terms)[:3])}")
                 
-            if amount_score > 0:
-                reasons.append("Contains monetary amounts or financial details")
+            if matched_years:
+                reasons.append(f"Contains target years: {', '.join(matched_years)}")
             
-            if reasons:
-                reasoning = "; ".join(reasons)
-            else:
-                reasoning = f"High relevance score ({relevance_score:.2f}) - matches question intent"
+            reasoning = "; ".join(reasons)
         else:
-            reasoning = f"Limited relevance ({relevance_score:.2f}) - insufficient pension/year keywords"
+            reasoning = f"Limited relevance ({relevance_score:.2f}) - low term overlap and semantic similarity"
         
         validation_result = ValidationResult(
             document_id=result.document_id,
@@ -530,7 +520,7 @@ def create_legal_analysis_from_approved_sources(
     approved_document_ids: Annotated[List[str], InjectedState("approved_document_ids")],
     validation_results: Annotated[List[ValidationResult], InjectedState("validation_results")],
     current_user_question: Annotated[str, InjectedState("current_user_question")],
-    parsed_documents: Annotated[Dict[str, DocumentContent], InjectedState("parsed_documents")],
+    parsed_documents: Annotated[Dict[str, DocumentRef], InjectedState("parsed_documents")],
     tool_call_id: Annotated[str, InjectedToolCallId]
 ) -> Command:
     """🎯 Create legal analysis based on approved sources with actual document content.
@@ -544,7 +534,7 @@ def create_legal_analysis_from_approved_sources(
         approved_document_ids: Document IDs approved by human (injected from state)
         validation_results: Validation results with document info (injected from state)  
         current_user_question: User's research question (injected from state)
-        parsed_documents: Already parsed document content (injected from state)
+        parsed_documents: References to already parsed documents (injected from state)
     
     Returns:
         Command with legal analysis artifact based on real document content
@@ -586,25 +576,35 @@ def create_legal_analysis_from_approved_sources(
     
     print(f"DEBUG: Creating analysis based on {len(approved_sources)} approved sources")
     
-    # Parse documents that haven't been parsed yet for better analysis
-    updated_parsed_documents = dict(parsed_documents)  # Copy existing
+    # Load approved documents from the shared store, parsing those not parsed yet
+    updated_parsed_documents = dict(parsed_documents)  # Copy existing references
+    loaded_documents: Dict[str, DocumentContent] = {}
     
     for source in approved_sources:
-        if source.document_id not in parsed_documents and hasattr(source, 'url') and source.url:
+        ref = parsed_documents.get(source.document_id)
+        url = ref.url if ref else getattr(source, 'url', None)
+        if url:
             try:
-                print(f"DEBUG: Attempting to parse document {source.document_id}")
-                parsing_result = legal_parser_instance.parse_legal_document(source.url)
+                print(f"DEBUG: Attempting to load document {source.document_id}")
+                parsing_result = legal_parser_instance.parse_legal_document(url)
                 
                 if parsing_result.get("success", False):
-                    document_content = DocumentContent(
+                    parsing_date = ref.parsing_date if ref else datetime.now().isoformat()
+                    loaded_documents[source.document_id] = DocumentContent(
                         document_id=source.document_id,
                         title=parsing_result["metadata"]["title"],
                         content=parsing_result["markdown"],
                         metadata=parsing_result["metadata"],
-                        parsing_date=datetime.now().isoformat()
+                        parsing_date=parsing_date,
+                        structure=parsing_result["structure"]
                     )
-                    updated_parsed_documents[source.document_id] = document_content
-                    print(f"DEBUG: Successfully parsed document {source.document_id}")
+                    updated_parsed_documents[source.document_id] = DocumentRef(
+                        document_id=source.document_id,
+                        title=parsing_result["metadata"]["title"],
+                        url=url,
+                        parsing_date=parsing_date
+                    )
+                    print(f"DEBUG: Successfully loaded document {source.document_id}")
                 else:
                     print(f"DEBUG: Failed to parse document {source.document_id}: {parsing_result.get('error', 'Unknown error')}")
             except Exception as e:
@@ -623,11 +623,19 @@ def create_legal_analysis_from_approved_sources(
         analysis_content += f"**Обоснование включения:** {source.reasoning}\n\n"
         
         # Use parsed document content if available, otherwise use snippet
-        if source.document_id in updated_parsed_documents:
-            doc_content = updated_parsed_documents[source.document_id].content
-            # Extract first 1000 characters of relevant content for better analysis
-            content_preview = doc_content[:1000] + "..." if len(doc_content) > 1000 else doc_content
-            analysis_content += f"**Полное содержание документа:**\n{content_preview}\n\n"
+        if source.document_id in loaded_documents:
+            document = loaded_documents[source.document_id]
+            doc_content = document.content
+            # Documents parsed before structure indexing have an empty structure
+            structure = document.structure or build_structure_index(doc_content)
+            passages = passage_retriever.retrieve(source.document_id, doc_content, current_user_question, structure)
+            
+            if passages:
+                analysis_content += f"**Релевантные положения документа:**\n{format_passages(passages)}\n\n"
+            else:
+                # No paragraph shares terms with the question: fall back to the opening text
+                content_preview = doc_content[:1000] + "..." if len(doc_content) > 1000 else doc_content
+                analysis_content += f"**Полное содержание документа:**\n{content_preview}\n\n"
         else:
             # Use validation snippet from search results
             snippet_content = source.snippet if hasattr(source, 'snippet') and source.snippet else 'Содержание недоступно'
@@ -657,7 +665,7 @@ def create_legal_analysis_from_approved_sources(
                 "content": analysis_content,
                 "stage": "final"
             }},
-            "parsed_documents": updated_parsed_documents,  # Save newly parsed documents
+            "parsed_documents": updated_parsed_documents,  # Save references to newly parsed documents
             "current_artifact_id": f"legal_analysis_{len(approved_sources)}_sources",
             "workflow_stage": "analysis_completed",
             "completed_stages": ["analysis_created"],
@@ -0,0 +1,38 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional, Callable
+
+
+class SearchBackend(ABC):
+    """Retrieval backend behind LegalSearchService.
+
+    Backends return the same response shape as LegalSearchService.search_legal_documents:
+    {"search_successful", "total_found", "documents", ["error"]}, where each document has
+    document_id, title, snippet, url, document_date and relevance_score. Searches are
+    always awaited on the search service loop.
+    """
+
+    name: str = "base"
+    # Whether relevance_score is a query-dependent lexical score (BM25) the hybrid
+    # reranker can fuse as is; otherwise the reranker scores term overlap itself
+    lexical_scores: bool = False
+
+    @abstractmethod
+    async def search(
+        self,
+        query: str,
+        site_filter: Optional[str] = None,
+        timeout: Optional[float] = None,
+        priority: int = 0,
+        on_queue_position: Optional[Callable[[int], None]] = None
+    ) -> Dict[str, Any]:
+        """Run a single search"""
+
+    def promote(self, query: str, site_filter: Optional[str], priority: int) -> None:
+        """Raise the priority of a search in progress (no-op for backends without a queue)"""
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return backend specific metrics"""
+        return {}
+
+    async def aclose(self) -> None:
+        """Release backend resources (called on the search service loop)"""
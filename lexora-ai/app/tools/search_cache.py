@@ -0,0 +1,120 @@
+import re
+import copy
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+
+class SearchResultCache:
+    """Two-tier cache for search responses: in-memory LRU plus optional SQLite persistence"""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600.0, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+        # Optional second tier that survives restarts
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(query: str, site_filter: Optional[str] = None) -> str:
+        """Build a cache key from the normalized query and site filter"""
+        normalized_query = re.sub(r"\s+", " ", query.strip().lower())
+        return f"{site_filter or 'lex.uz'}|{normalized_query}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached response, or None on miss or expiry"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return copy.deepcopy(value)
+                del self._entries[key]
+                self._stats["expirations"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM search_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value_json, expires_at = row
+                    if expires_at > now:
+                        value = json.loads(value_json)
+                        # Promote to the memory tier
+                        self._store_in_memory(key, value, expires_at)
+                        self._stats["hits"] += 1
+                        self._stats["disk_hits"] += 1
+                        return copy.deepcopy(value)
+                    self._db.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._stats["expirations"] += 1
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """Store a response for ttl seconds (defaults to the cache TTL)"""
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        value = copy.deepcopy(value)
+
+        with self._lock:
+            self._store_in_memory(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), expires_at)
+                )
+                self._db.commit()
+
+    def _store_in_memory(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        """Insert into the LRU tier, evicting the least recently used entries (lock held)"""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Drop all cached entries from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM search_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "persistent": self._db is not None
+            }
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Dict, Any, Callable, Awaitable, Hashable
+
+
+class AsyncSingleFlight:
+    """Coalesce concurrent identical coroutine calls into one upstream call.
+
+    All callers with the same key share the result (or exception) of the first
+    caller's call. A caller that is cancelled stops waiting but does not cancel the
+    shared call, so the remaining waiters still receive its result. Speculative work
+    can be started without a waiter and cancelled later if nobody claimed it.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def start(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Start (or return the already running) shared call without waiting on it"""
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return task
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if key in self._calls:
+            self.coalesced += 1
+        task = self.start(key, fn)
+
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def cancel_unclaimed(self, key: Hashable) -> bool:
+        """Cancel a running call that no caller is waiting on"""
+        task = self._calls.get(key)
+        if task is None or task.done() or self._waiters.get(key):
+            return False
+        task.cancel()
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls)
+        }
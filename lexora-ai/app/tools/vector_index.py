@@ -0,0 +1,247 @@
+import os
+import re
+import json
+import zlib
+import argparse
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.tools.bm25_index import document_from_record, tokenize
+
+
+class HashingEmbedder:
+    """Offline text embedder based on hashed character n-grams.
+
+    Words are split into boundary-marked character n-grams which are hashed into a
+    fixed number of dimensions, so inflected forms (пенсия/пенсии/пенсионный) land
+    close together without any model download. Any object with the same
+    embed(texts) -> (n, dim) float32 L2-normalized matrix contract can replace it.
+    """
+
+    def __init__(self, dim: int = 512, ngram_sizes: Tuple[int, ...] = (3, 4, 5)):
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+
+    def config(self) -> Dict[str, Any]:
+        return {"type": "hashing", "dim": self.dim, "ngram_sizes": list(self.ngram_sizes)}
+
+    def _features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        buckets = []
+        signs = []
+        for word in tokenize(text):
+            marked = f"<{word}>"
+            grams = [marked]
+            for n in self.ngram_sizes:
+                grams.extend(marked[i:i + n] for i in range(max(len(marked) - n + 1, 0)))
+            for gram in grams:
+                # crc32 is stable across processes, unlike hash()
+                h = zlib.crc32(gram.encode("utf-8"))
+                buckets.append(h % self.dim)
+                signs.append(1.0 if (h >> 31) & 1 else -1.0)
+        return np.asarray(buckets, dtype=np.int64), np.asarray(signs, dtype=np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            buckets, signs = self._features(text)
+            if len(buckets):
+                matrix[row] = np.bincount(buckets, weights=signs, minlength=self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+def split_paragraphs(content: str, min_length: int = 40, max_paragraphs: int = 400) -> List[str]:
+    """Split parsed markdown into paragraphs worth embedding"""
+    paragraphs = []
+    for block in re.split(r"\n\s*\n", content):
+        block = block.replace("#", " ").strip()
+        if len(block) >= min_length:
+            paragraphs.append(block)
+        if len(paragraphs) >= max_paragraphs:
+            break
+    return paragraphs
+
+
+class VectorIndex:
+    """Dense index of title/snippet/paragraph embeddings stored as a NumPy matrix"""
+
+    def __init__(self, embedder: Optional[HashingEmbedder] = None):
+        self.embedder = embedder or HashingEmbedder()
+        self.vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self.rows: List[Tuple[str, str]] = []  # (document_id, kind)
+        self._rows_by_document: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Index titles and paragraphs of parser outputs or DocumentContent dicts"""
+        added = 0
+        all_vectors = [self.vectors]
+        for record in records:
+            document = document_from_record(record)
+            if not document:
+                continue
+            paragraphs = split_paragraphs(document["content"])
+            texts = [document["title"], *paragraphs]
+            all_vectors.append(self.embedder.embed(texts))
+            self.rows.extend([(document["document_id"], "title")] + [(document["document_id"], "paragraph")] * len(paragraphs))
+            added += 1
+        self.vectors = np.vstack(all_vectors)
+        self._rebuild_row_lookup()
+        return added
+
+    def _rebuild_row_lookup(self) -> None:
+        rows_by_document = defaultdict(list)
+        for row, (document_id, _) in enumerate(self.rows):
+            rows_by_document[document_id].append(row)
+        self._rows_by_document = {
+            document_id: np.asarray(rows, dtype=np.int64)
+            for document_id, rows in rows_by_document.items()
+        }
+
+    def search(self, query_vector: np.ndarray, k: int = 10) -> List[Tuple[str, float]]:
+        """Return the top-k (document_id, cosine) pairs, one per document"""
+        if not len(self.rows):
+            return []
+        similarities = self.vectors @ query_vector
+        best: Dict[str, float] = {}
+        for row in np.argsort(-similarities):
+            document_id = self.rows[row][0]
+            if document_id not in best:
+                best[document_id] = float(similarities[row])
+                if len(best) >= k:
+                    break
+        return list(best.items())
+
+    def document_scores(self, query_vector: np.ndarray, document_ids: List[str]) -> np.ndarray:
+        """Best cosine per document over its indexed rows (NaN when not indexed)"""
+        scores = np.full(len(document_ids), np.nan, dtype=np.float32)
+        for i, document_id in enumerate(document_ids):
+            rows = self._rows_by_document.get(document_id)
+            if rows is not None:
+                scores[i] = float(np.max(self.vectors[rows] @ query_vector))
+        return scores
+
+    def save(self, index_path: str) -> None:
+        os.makedirs(index_path, exist_ok=True)
+        np.save(os.path.join(index_path, "vectors.npy"), self.vectors)
+        with open(os.path.join(index_path, "rows.json"), "w", encoding="utf-8") as f:
+            json.dump(self.rows, f, ensure_ascii=False)
+        with open(os.path.join(index_path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "embedder": self.embedder.config(), "num_rows": len(self.rows)}, f)
+
+    @classmethod
+    def load(cls, index_path: str) -> "VectorIndex":
+        """Load an index; the vector matrix is memory-mapped read-only"""
+        with open(os.path.join(index_path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        embedder_config = meta["embedder"]
+        index = cls(HashingEmbedder(
+            dim=embedder_config["dim"],
+            ngram_sizes=tuple(embedder_config["ngram_sizes"])
+        ))
+        index.vectors = np.load(os.path.join(index_path, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(index_path, "rows.json"), encoding="utf-8") as f:
+            index.rows = [tuple(row) for row in json.load(f)]
+        index._rebuild_row_lookup()
+        return index
+
+
+class HybridScorer:
+    """Fuse lexical relevance scores with dense cosine similarity"""
+
+    def __init__(
+        self,
+        embedder: Optional[HashingEmbedder] = None,
+        vector_index: Optional[VectorIndex] = None,
+        dense_weight: float = 0.5
+    ):
+        self.vector_index = vector_index
+        self.embedder = vector_index.embedder if vector_index is not None else (embedder or HashingEmbedder())
+        self.dense_weight = dense_weight
+
+    def dense_scores(self, query: str, texts: List[str], document_ids: Optional[List[str]] = None) -> np.ndarray:
+        """Cosine similarity of the query with each text, in one batched product.
+
+        When a vector index is loaded, a document's score is the best of its text and
+        its indexed title/paragraph embeddings.
+        """
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        query_vector = self.embedder.embed([query])[0]
+        scores = self.embedder.embed(texts) @ query_vector
+
+        if self.vector_index is not None and document_ids:
+            indexed_scores = self.vector_index.document_scores(query_vector, document_ids)
+            scores = np.where(np.isnan(indexed_scores), scores, np.maximum(scores, indexed_scores))
+        return np.clip(scores, 0.0, 1.0)
+
+    def fuse(self, lexical_scores: np.ndarray, dense_scores: np.ndarray) -> np.ndarray:
+        """Weighted sum of lexical scores (expected in [0, 1]) and dense scores"""
+        return (1 - self.dense_weight) * lexical_scores + self.dense_weight * dense_scores
+
+    def lexical_scores(self, query: str, documents: List[Dict[str, Any]]) -> np.ndarray:
+        """Share of stemmed query terms found in each document's title (weight 0.6) and snippet (0.4)"""
+        query_terms = set(tokenize(query))
+        scores = np.zeros(len(documents), dtype=np.float32)
+        if not query_terms:
+            return scores
+        for i, doc in enumerate(documents):
+            title_terms = set(tokenize(doc['title']))
+            snippet_terms = set(tokenize(doc['snippet'] or ""))
+            scores[i] = (
+                0.6 * len(query_terms & title_terms) + 0.4 * len(query_terms & snippet_terms)
+            ) / len(query_terms)
+        return scores
+
+    def rerank(self, query: str, documents: List[Dict[str, Any]], use_document_scores: bool = False) -> List[Dict[str, Any]]:
+        """Rescore search response documents and sort them by fused relevance.
+
+        use_document_scores fuses the documents' own relevance_score as the lexical
+        half (for BM25 results); otherwise query term overlap is scored here.
+        """
+        if not documents:
+            return documents
+        texts = [f"{doc['title']} {doc['snippet']}" for doc in documents]
+        dense = self.dense_scores(query, texts, [doc['document_id'] for doc in documents])
+        if use_document_scores:
+            lexical = np.asarray([doc['relevance_score'] for doc in documents], dtype=np.float32)
+        else:
+            lexical = self.lexical_scores(query, documents)
+        fused = self.fuse(lexical, dense)
+
+        reranked = []
+        for doc, score in zip(documents, fused):
+            reranked.append({**doc, 'relevance_score': round(float(min(score, 1.0)), 3)})
+        reranked.sort(key=lambda doc: doc['relevance_score'], reverse=True)
+        return reranked
+
+
+def create_hybrid_scorer() -> HybridScorer:
+    """Create the scorer from settings, using the vector index if one has been built"""
+    vector_index = None
+    if os.path.exists(os.path.join(settings.VECTOR_INDEX_PATH, "meta.json")):
+        vector_index = VectorIndex.load(settings.VECTOR_INDEX_PATH)
+    return HybridScorer(vector_index=vector_index, dense_weight=settings.HYBRID_DENSE_WEIGHT)
+
+
+# Create global instance
+hybrid_scorer = create_hybrid_scorer()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the local vector index of lex.uz documents")
+    parser.add_argument("--input", required=True, help="JSONL of parse_legal_document results or DocumentContent dicts")
+    parser.add_argument("--output", required=True, help="Index directory")
+    args = parser.parse_args()
+
+    index = VectorIndex()
+    with open(args.input, encoding="utf-8") as f:
+        added = index.add_records(json.loads(line) for line in f if line.strip())
+    index.save(args.output)
+    print(f"Indexed {added} documents ({len(index)} rows) into {args.output}")
@@ -0,0 +1,56 @@
+import os
+import sys
+import json
+from typing import List
+
+import pytest
+
+# Import the app package from the source tree, and parse in-process in tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PARSE_WORKERS", "0")
+os.environ.setdefault("DOCUMENT_CORPUS_PATH", "")
+os.environ.setdefault("CHECKPOINTER", "memory")
+# Clients are built at import time; tests never reach the real APIs
+os.environ.setdefault("BRAVE_SEARCH_API_KEY", "test")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.prebuilt import create_react_agent
+
+
+class FakeAgentModel(BaseChatModel):
+    """Chat model that answers with scripted messages, streamed word by word"""
+
+    responses: List[AIMessage]
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-agent"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.responses.pop(0))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        response = self.responses.pop(0)
+        for i, word in enumerate(response.content.split(" ")):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else f" {word}"))
+        if response.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(response.tool_calls)
+            ]))
+
+
+@pytest.fixture
+def fake_agent_graph():
+    """Build a ReAct graph like the app's agents, answering with scripted messages"""
+    def build(responses, tools=(), **kwargs):
+        model = FakeAgentModel(responses=list(responses))
+        return create_react_agent(model, tools=list(tools), checkpointer=InMemorySaver(), **kwargs)
+    return build
@@ -0,0 +1,115 @@
+import asyncio
+import math
+from collections import Counter
+
+import pytest
+
+from app.tools.bm25_index import BM25Index, BM25IndexBuilder, LocalIndexSearchBackend, tokenize
+
+RECORDS = [
+    {
+        "success": True,
+        "markdown": "Трудовой договор заключается в письменной форме. Расторжение трудового договора.",
+        "metadata": {"document_id": "1", "title": "Трудовой кодекс", "source_url": "https://lex.uz/acts/1"}
+    },
+    {
+        "document_id": "2",
+        "title": "Налоговый кодекс",
+        "content": "Налог на доходы физических лиц. Трудовой доход облагается налогом.",
+    },
+    {
+        "success": True,
+        "markdown": "Пенсия по возрасту назначается при достижении пенсионного возраста.",
+        "metadata": {"document_id": "3", "title": "Закон о пенсионном обеспечении", "source_url": "https://norma.uz/acts/3?ONDATE=01.02.2024"}
+    },
+    {"success": False, "error": "Failed to fetch document"},
+    {"document_id": "1", "title": "Трудовой кодекс (дубликат)", "content": "Другой текст"},
+]
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    builder = BM25IndexBuilder()
+    assert builder.add_records(RECORDS) == 3
+    path = str(tmp_path / "index")
+    builder.write(path)
+    return path
+
+
+def reference_scores(query, k1=1.5, b=0.75, title_boost=2):
+    """Plain BM25 over the same documents, term by term"""
+    documents = [
+        tokenize("Трудовой кодекс") * title_boost + tokenize(RECORDS[0]["markdown"]),
+        tokenize("Налоговый кодекс") * title_boost + tokenize(RECORDS[1]["content"]),
+        tokenize("Закон о пенсионном обеспечении") * title_boost + tokenize(RECORDS[2]["markdown"]),
+    ]
+    avg_length = sum(map(len, documents)) / len(documents)
+    scores = []
+    for terms in documents:
+        counts = Counter(terms)
+        score = 0.0
+        for term in set(tokenize(query)):
+            document_frequency = sum(term in document for document in documents)
+            if not counts[term]:
+                continue
+            idf = math.log(1 + (len(documents) - document_frequency + 0.5) / (document_frequency + 0.5))
+            norm = k1 * (1 - b + b * len(terms) / avg_length)
+            score += idf * counts[term] * (k1 + 1) / (counts[term] + norm)
+        scores.append(score)
+    return scores
+
+
+def test_tokenize_stems_inflections_and_folds_apostrophes():
+    assert tokenize("трудового договора") == tokenize("трудовой договор")
+    assert tokenize("ma’lumot va oʻquv") == ["ma'lumot", "o'quv"]
+    assert tokenize("site:lex.uz и статья 15") == tokenize("статья 15")
+    assert len(tokenize("статья 15")) == 2
+
+
+def test_loaded_index_matches_plain_bm25(index_path):
+    index = BM25Index(index_path)
+    hits = index.search("трудовой договор")
+    expected = reference_scores("трудовой договор")
+
+    assert [index.documents[i]["document_id"] for i, _ in hits] == ["1", "2"]
+    for doc_index, score in hits:
+        assert score == pytest.approx(expected[doc_index], rel=1e-5)
+    assert index.search("несуществующий") == []
+    assert len(index.search("кодекс", k=1)) == 1
+    index.close()
+
+
+def test_local_backend_normalizes_scores_and_filters_sites(index_path):
+    backend = LocalIndexSearchBackend(index_path)
+
+    response = asyncio.run(backend.search("трудовой договор"))
+    assert response["search_successful"]
+    assert [document["document_id"] for document in response["documents"]] == ["1", "2"]
+    assert response["documents"][0]["relevance_score"] == 1.0
+    assert 0 < response["documents"][1]["relevance_score"] < 1
+
+    filtered = asyncio.run(backend.search("кодекс пенсия", site_filter="norma.uz"))
+    assert [document["document_id"] for document in filtered["documents"]] == ["3"]
+    assert filtered["documents"][0]["document_date"] == "01.02.2024"
+    assert backend.get_metrics()["local_index"]["searches"] == 2
+    asyncio.run(backend.aclose())
+
+
+def test_local_backend_reports_a_missing_index(tmp_path):
+    response = asyncio.run(LocalIndexSearchBackend(str(tmp_path / "missing")).search("налог"))
+    assert not response["search_successful"]
+    assert "Local search index not found" in response["error"]
+
+
+def test_reload_picks_up_a_rebuilt_index(index_path):
+    backend = LocalIndexSearchBackend(index_path)
+    assert asyncio.run(backend.search("пенсия"))["total_found"] == 1
+
+    builder = BM25IndexBuilder()
+    builder.add_document("4", "Пенсионный фонд", "Пенсия выплачивается ежемесячно.")
+    builder.write(index_path)
+    backend.reload()
+
+    response = asyncio.run(backend.search("пенсия"))
+    assert [document["document_id"] for document in response["documents"]] == ["4"]
+    asyncio.run(backend.aclose())
@@ -0,0 +1,145 @@
+import operator
+from typing import Annotated, List
+
+import pytest
+from pydantic import BaseModel
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.graph import StateGraph, START, END
+
+from app.core.checkpointer import SqliteCheckpointSaver, create_checkpointer
+
+
+class CounterState(BaseModel):
+    steps: Annotated[List[str], operator.add] = []
+
+
+def counter_graph(checkpointer):
+    graph = StateGraph(CounterState)
+    graph.add_node("step", lambda state: {"steps": [f"step {len(state.steps) + 1}"]})
+    graph.add_edge(START, "step")
+    graph.add_edge("step", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def thread(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "checkpoints.db")
+
+
+def put_checkpoint(saver, thread_id: str, step: int, parent: dict = None) -> dict:
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"steps": [f"step {step}"]}
+    checkpoint["channel_versions"] = {"steps": saver.get_next_version(None if step == 1 else str(step - 1), None)}
+    config = parent or {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    return saver.put(config, checkpoint, {"source": "loop", "step": step}, checkpoint["channel_versions"])
+
+
+def test_graph_round_trip(db_path):
+    saver = SqliteCheckpointSaver("test", db_path)
+    graph = counter_graph(saver)
+    graph.invoke({"steps": ["start"]}, thread("a"))
+    graph.invoke({"steps": ["again"]}, thread("a"))
+
+    state = graph.get_state(thread("a"))
+    assert state.values["steps"] == ["start", "step 2", "again", "step 4"]
+    assert graph.get_state(thread("b")).values == {}
+    saver.close()
+
+
+def test_thread_survives_restart(db_path):
+    saver = SqliteCheckpointSaver("test", db_path)
+    counter_graph(saver).invoke({"steps": ["start"]}, thread("a"))
+    saver.close()
+
+    # A new process opens the same database
+    restarted = SqliteCheckpointSaver("test", db_path)
+    graph = counter_graph(restarted)
+    graph.invoke({"steps": ["again"]}, thread("a"))
+    assert graph.get_state(thread("a")).values["steps"] == ["start", "step 2", "again", "step 4"]
+
+    # Namespaces are separate
+    other = SqliteCheckpointSaver("other", db_path)
+    assert other.get_tuple(thread("a")) is None
+    restarted.close()
+    other.close()
+
+
+def test_opened_on_first_use(db_path):
+    import os
+
+    saver = SqliteCheckpointSaver("test", db_path)
+    counter_graph(saver)
+    assert not os.path.exists(db_path)
+    assert saver.get_tuple(thread("a")) is None
+    assert os.path.exists(db_path)
+    saver.close()
+
+
+def test_pending_writes(db_path):
+    saver = SqliteCheckpointSaver("test", db_path)
+    config = put_checkpoint(saver, "a", 1)
+
+    saver.put_writes(config, [("steps", ["b1"]), ("steps", ["b2"])], task_id="task-b", task_path="~__pregel_pull, b")
+    saver.put_writes(config, [("steps", ["a1"])], task_id="task-a", task_path="~__pregel_pull, a")
+    # A retried task's regular writes are kept from the first attempt
+    saver.put_writes(config, [("steps", ["a1 retried"])], task_id="task-a", task_path="~__pregel_pull, a")
+    saver.close()
+
+    checkpoint_tuple = SqliteCheckpointSaver("test", db_path).get_tuple(config)
+    assert checkpoint_tuple.pending_writes == [
+        ("task-a", "steps", ["a1"]),
+        ("task-b", "steps", ["b1"]),
+        ("task-b", "steps", ["b2"]),
+    ]
+    assert checkpoint_tuple.checkpoint["channel_values"] == {"steps": ["step 1"]}
+
+
+def test_list_before_and_filter(db_path):
+    saver = SqliteCheckpointSaver("test", db_path)
+    first = put_checkpoint(saver, "a", 1)
+    second = put_checkpoint(saver, "a", 2, parent=first)
+    third = put_checkpoint(saver, "a", 3, parent=second)
+    put_checkpoint(saver, "b", 1)
+
+    ids = lambda tuples: [t.config["configurable"]["checkpoint_id"] for t in tuples]
+    checkpoint_id = lambda config: config["configurable"]["checkpoint_id"]
+
+    assert ids(saver.list(thread("a"))) == [checkpoint_id(third), checkpoint_id(second), checkpoint_id(first)]
+    assert ids(saver.list(thread("a"), before=third)) == [checkpoint_id(second), checkpoint_id(first)]
+    assert ids(saver.list(thread("a"), before=third, limit=1)) == [checkpoint_id(second)]
+    assert ids(saver.list(thread("a"), filter={"step": 2})) == [checkpoint_id(second)]
+    assert ids(saver.list(thread("a"), filter={"step": 2, "source": "input"})) == []
+    assert len(list(saver.list(None, filter={"step": 1}))) == 2
+
+    latest = saver.get_tuple(thread("a"))
+    assert latest.parent_config["configurable"]["checkpoint_id"] == checkpoint_id(second)
+    saver.close()
+
+
+def test_prunes_old_checkpoints(db_path):
+    saver = SqliteCheckpointSaver("test", db_path, keep_checkpoints=2)
+    graph = counter_graph(saver)
+    for _ in range(5):
+        graph.invoke({"steps": ["turn"]}, thread("a"))
+
+    assert len(graph.get_state(thread("a")).values["steps"]) == 10
+    assert len(list(saver.list(thread("a")))) <= 4
+    assert saver.stats()["pruned"] > 0
+    saver.close()
+
+
+def test_create_checkpointer(monkeypatch, db_path):
+    from app.core import checkpointer
+
+    monkeypatch.setattr(checkpointer.settings, "CHECKPOINTER", "sqlite")
+    monkeypatch.setattr(checkpointer.settings, "CHECKPOINT_DB_PATH", db_path)
+    saver = create_checkpointer("test", CounterState)
+    assert isinstance(saver, SqliteCheckpointSaver)
+    graph = counter_graph(saver)
+    graph.invoke({"steps": ["start"]}, thread("a"))
+    assert graph.get_state(thread("a")).values["steps"] == ["start", "step 2"]
+    saver.close()
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.core import session_store
+from app.core.consultation_engine import ConsultationEngine
+from app.schemas.chat import Message
+
+
+@pytest.fixture
+def shared_sessions(tmp_path, monkeypatch):
+    """Engines in different workers sharing one SQLite session store"""
+    monkeypatch.setattr(session_store.settings, "SESSION_STORE", "sqlite")
+    monkeypatch.setattr(session_store.settings, "SESSION_STORE_DB_PATH", str(tmp_path / "sessions.db"))
+
+
+def engine_with(graph) -> ConsultationEngine:
+    engine = ConsultationEngine()
+    engine.graph = graph
+    return engine
+
+
+def thread_messages(graph, session_id: str):
+    return graph.get_state({"configurable": {"thread_id": session_id}}).values["messages"]
+
+
+def test_session_continues_on_another_worker(shared_sessions, fake_agent_graph):
+    graph = fake_agent_graph([AIMessage(content="Birinchi javob"), AIMessage(content="Ikkinchi javob")])
+    worker_1, worker_2 = engine_with(graph), engine_with(graph)
+    first = [Message(role="user", content="Salom")]
+
+    reply = asyncio.run(worker_1.get_response(first, "s1"))
+    assert reply == [Message(role="assistant", content="Birinchi javob")]
+
+    # The client resends the conversation; only the new message reaches the thread
+    history = worker_2.get_session_history("s1")
+    assert history == first + reply
+    second = history + [Message(role="user", content="Yana savol")]
+    reply = asyncio.run(worker_2.get_response(second, "s1"))
+
+    assert reply == [Message(role="assistant", content="Ikkinchi javob")]
+    assert worker_1.get_session_history("s1") == second + reply
+    assert [message.content for message in thread_messages(graph, "s1")] == [
+        "Salom", "Birinchi javob", "Yana savol", "Ikkinchi javob"
+    ]
+
+
+def test_clear_session_drops_history_and_thread(shared_sessions, fake_agent_graph):
+    graph = fake_agent_graph([AIMessage(content="Javob"), AIMessage(content="Yangi javob")])
+    engine = engine_with(graph)
+    asyncio.run(engine.get_response([Message(role="user", content="Salom")], "s1"))
+
+    assert engine.clear_session("s1")
+    assert engine.get_session_history("s1") == []
+    assert not engine.clear_session("s1")
+
+    asyncio.run(engine.get_response([Message(role="user", content="Boshqa savol")], "s1"))
+    assert [message.content for message in thread_messages(graph, "s1")] == ["Boshqa savol", "Yangi javob"]
+
+
+def test_expired_session_starts_a_new_thread(fake_agent_graph):
+    graph = fake_agent_graph([AIMessage(content="Javob"), AIMessage(content="Yangi javob")])
+    engine = engine_with(graph)
+    asyncio.run(engine.get_response([Message(role="user", content="Salom")], "s1"))
+
+    engine.sessions.delete("s1")
+    asyncio.run(engine.get_response([Message(role="user", content="Boshqa savol")], "s1"))
+    assert [message.content for message in thread_messages(graph, "s1")] == ["Boshqa savol", "Yangi javob"]
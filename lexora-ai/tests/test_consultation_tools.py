@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from app.schemas.consultation_state import SearchResult
+from app.tools import consultation_tools
+from app.tools.consultation_tools import consultation_search, parse_legal_document
+from app.tools.document_parser import legal_parser_instance
+
+DOCUMENT_ID = "9900001"
+PAGE = (
+    "<html><head><title>Mehnat kodeksi</title></head><body><div id='content'>"
+    "<h2>1-modda. Ushbu Kodeksning maqsadi</h2>"
+    "<p>Ushbu Kodeksning maqsadi mehnat munosabatlarini tartibga solishdan iborat.</p>"
+    "</div></body></html>"
+)
+HIT = {
+    "document_id": DOCUMENT_ID,
+    "title": "Mehnat kodeksi",
+    "snippet": "mehnat munosabatlari",
+    # Search hits link to a dated edition
+    "url": f"https://lex.uz/docs/{DOCUMENT_ID}?ONDATE=01.01.2020",
+    "document_date": "",
+    "relevance_score": 0.9,
+}
+
+
+@pytest.fixture
+def fetched_urls(monkeypatch):
+    urls = []
+
+    async def fetch(url):
+        urls.append(url)
+        return PAGE
+
+    monkeypatch.setattr(legal_parser_instance.fetcher, "fetch", fetch)
+    monkeypatch.setattr(legal_parser_instance, "corpus", None)
+    monkeypatch.setattr(
+        consultation_tools.legal_search_service, "search_legal_documents",
+        lambda query, **kwargs: {"search_successful": True, "total_found": 1, "documents": [HIT]}
+    )
+    return urls
+
+
+def wait_for_prefetch(completed: int) -> None:
+    deadline = time.monotonic() + 10
+    while legal_parser_instance.get_metrics()["prefetch"]["completed"] < completed and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_prefetched_document_is_not_fetched_again(fetched_urls, monkeypatch):
+    monkeypatch.setattr(consultation_tools.settings, "PREFETCH_ENABLED", True)
+    prefetch = legal_parser_instance.get_metrics()["prefetch"]
+
+    consultation_search.func("mehnat kodeksi", search_results=[], tool_call_id="search", config={"configurable": {"thread_id": "prefetch-test"}})
+    wait_for_prefetch(prefetch["completed"] + 1)
+    assert len(fetched_urls) == 1
+
+    command = parse_legal_document.func(
+        DOCUMENT_ID,
+        search_results=[SearchResult(**HIT)],
+        parsed_documents={},
+        current_question="maqsadi",
+        tool_call_id="parse"
+    )
+    assert "Successfully parsed document" in command.update["messages"][0].content
+    assert fetched_urls == [legal_parser_instance.edition_url(DOCUMENT_ID)]
+    assert legal_parser_instance.get_metrics()["prefetch"]["hits"] == prefetch["hits"] + 1
@@ -0,0 +1,236 @@
+import os
+import sys
+import asyncio
+import subprocess
+import textwrap
+from datetime import datetime
+
+import pytest
+
+from app.tools.document_corpus import CorpusWriter, CorpusReader, compact_corpus
+from app.tools.document_ingestion import DocumentIngestor, IngestionCheckpoint
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parsed_document(document_id: str, text: str = "") -> dict:
+    """A successful parse_legal_document result"""
+    text = text or f"Document {document_id}\n\n" + "\n\n".join(f"{i}-modda. Article {i} of {document_id}" for i in range(1, 20))
+    return {
+        "success": True,
+        "markdown": text,
+        "structure": [],
+        "metadata": {"document_id": document_id, "title": f"Act {document_id}", "edition_date": ""},
+        "parsing_date": "2026-01-01T00:00:00"
+    }
+
+
+class StubParser:
+    """Stands in for LegalDocumentParser; kills the process on the document in kill_on"""
+
+    def __init__(self, kill_on: str = ""):
+        self.kill_on = kill_on
+        self.fetcher = self
+
+    async def aparse_legal_document(self, url: str) -> dict:
+        document_id = url.rsplit("/", 1)[-1]
+        if document_id == self.kill_on:
+            # No cleanup, no commit: like SIGKILL or the OOM killer
+            os._exit(9)
+        # Larger than the file buffer, so a batch reaches the disk before its commit
+        return parsed_document(document_id, os.urandom(64 * 1024).hex())
+
+    def document_key(self, url: str) -> str:
+        return f"{url.rsplit('/', 1)[-1]}@current"
+
+    def stats(self) -> dict:
+        return {}
+
+
+def run_killed(script: str) -> None:
+    """Run a script in a child process that dies without cleanup"""
+    process = subprocess.run(
+        [sys.executable, "-c", textwrap.dedent(script)],
+        cwd=os.path.dirname(TESTS_DIR),
+        env={**os.environ, "PYTHONPATH": os.pathsep.join([os.path.dirname(TESTS_DIR), TESTS_DIR])}
+    )
+    assert process.returncode == 9
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "corpus.lxc")
+    writer = CorpusWriter(path, chunk_chars=64)
+    writer.add("1@current", parsed_document("1"))
+    writer.close()
+
+    reader = CorpusReader(path)
+    assert reader.keys() == ["1@current"]
+    assert reader.get("1@current")["markdown"] == parsed_document("1")["markdown"]
+    reader.close()
+
+
+@pytest.mark.parametrize("codec", ["zstd", "zlib"])
+def test_codecs(tmp_path, codec):
+    path = str(tmp_path / "corpus.lxc")
+    writer = CorpusWriter(path, codec=codec)
+    writer.add("1@current", parsed_document("1"))
+    writer.close()
+
+    reader = CorpusReader(path)
+    assert reader.stats()["codec"] == codec
+    assert reader.get("1@current")["markdown"] == parsed_document("1")["markdown"]
+    reader.close()
+
+    # Appending keeps the corpus codec
+    writer = CorpusWriter(path)
+    writer.add("2@current", parsed_document("2"))
+    writer.close()
+    reader = CorpusReader(path)
+    assert reader.stats()["codec"] == codec
+    assert sorted(reader.keys()) == ["1@current", "2@current"]
+    reader.close()
+
+
+def test_default_codec_is_zstd(tmp_path):
+    path = str(tmp_path / "corpus.lxc")
+    CorpusWriter(path).close()
+    reader = CorpusReader(path)
+    assert reader.stats()["codec"] == "zstd"
+    reader.close()
+
+
+def test_writer_killed_between_commits_resumes(tmp_path):
+    path = str(tmp_path / "corpus.lxc")
+    run_killed(f"""
+        import os
+        from app.tools.document_corpus import CorpusWriter
+        from test_document_corpus import parsed_document
+        writer = CorpusWriter({path!r}, chunk_chars=64)
+        writer.add("1@current", parsed_document("1"))
+        writer.commit()
+        writer.add("2@current", parsed_document("2"))
+        writer._file.flush()
+        os._exit(9)
+    """)
+
+    # Readers see the last commit
+    reader = CorpusReader(path)
+    assert reader.keys() == ["1@current"]
+    reader.close()
+
+    # The writer drops the uncommitted tail and appends after the last commit
+    size = os.path.getsize(path)
+    writer = CorpusWriter(path)
+    assert os.path.getsize(path) < size
+    assert "1@current" in writer and "2@current" not in writer
+    writer.add("3@current", parsed_document("3"))
+    writer.close()
+
+    reader = CorpusReader(path)
+    assert sorted(reader.keys()) == ["1@current", "3@current"]
+    assert reader.get("1@current")["markdown"] == parsed_document("1")["markdown"]
+    assert reader.get("3@current")["markdown"] == parsed_document("3")["markdown"]
+    reader.close()
+
+
+def test_writer_killed_before_first_commit(tmp_path):
+    path = str(tmp_path / "corpus.lxc")
+    run_killed(f"""
+        import os
+        from app.tools.document_corpus import CorpusWriter
+        from test_document_corpus import parsed_document
+        writer = CorpusWriter({path!r})
+        writer.add("1@current", parsed_document("1"))
+        writer._file.flush()
+        os._exit(9)
+    """)
+
+    with pytest.raises(ValueError):
+        CorpusReader(path)
+
+    writer = CorpusWriter(path)
+    writer.add("2@current", parsed_document("2"))
+    writer.close()
+    reader = CorpusReader(path)
+    assert reader.keys() == ["2@current"]
+    reader.close()
+
+
+def test_reader_ignores_batch_in_progress(tmp_path):
+    path = str(tmp_path / "corpus.lxc")
+    writer = CorpusWriter(path)
+    writer.add("1@current", parsed_document("1"))
+    writer.commit()
+    writer.add("2@current", parsed_document("2"))
+    writer._file.flush()
+
+    reader = CorpusReader(path)
+    assert reader.keys() == ["1@current"]
+    reader.close()
+
+    writer.close()
+    reader = CorpusReader(path)
+    assert sorted(reader.keys()) == ["1@current", "2@current"]
+    reader.close()
+
+
+def test_compact_keeps_latest_documents(tmp_path):
+    path = str(tmp_path / "corpus.lxc")
+    writer = CorpusWriter(path)
+    writer.add("1@current", parsed_document("1", "old text of document one"))
+    writer.commit()
+    writer.add("1@current", parsed_document("1", "new text of document one"))
+    writer.add("2@current", parsed_document("2"))
+    writer.close()
+
+    size_before, size_after = compact_corpus(path)
+    assert size_after < size_before
+    reader = CorpusReader(path)
+    assert reader.get("1@current")["markdown"] == "new text of document one"
+    assert "2@current" in reader
+    reader.close()
+
+
+def test_ingestion_resumes_after_kill(tmp_path):
+    corpus_path = str(tmp_path / "corpus.lxc")
+    checkpoint_path = str(tmp_path / "checkpoint.jsonl")
+    document_ids = [str(i) for i in range(1, 6)]
+
+    # Killed while parsing the fourth document: the first batch of two is committed,
+    # the third document is written but not committed
+    run_killed(f"""
+        import asyncio
+        from app.tools.document_ingestion import DocumentIngestor
+        from test_document_corpus import StubParser
+        ingestor = DocumentIngestor(StubParser(kill_on="4"), {corpus_path!r}, {checkpoint_path!r}, concurrency=1, delay=0, commit_every=2)
+        asyncio.run(ingestor.run({document_ids!r}))
+    """)
+    checkpoint = IngestionCheckpoint(checkpoint_path)
+    assert checkpoint.status == {"1": "ok", "2": "ok"}
+    checkpoint._file.close()
+
+    ingestor = DocumentIngestor(StubParser(), corpus_path, checkpoint_path, concurrency=1, delay=0, commit_every=2)
+    stats = asyncio.run(ingestor.run(document_ids))
+    assert stats["skipped"] == 2
+    assert stats["ingested"] == 3
+
+    reader = CorpusReader(corpus_path)
+    assert sorted(reader.keys()) == [f"{i}@current" for i in document_ids]
+    reader.close()
+    checkpoint = IngestionCheckpoint(checkpoint_path)
+    assert checkpoint.status == {document_id: "ok" for document_id in document_ids}
+    checkpoint._file.close()
+
+
+def test_parsed_at(tmp_path):
+    path = str(tmp_path / "corpus.lxc")
+    writer = CorpusWriter(path)
+    writer.add("1@current", parsed_document("1"))
+    writer.add("2@current", {**parsed_document("2"), "parsing_date": ""})
+    writer.close()
+
+    reader = CorpusReader(path)
+    assert reader.parsed_at("1@current") == datetime.fromisoformat("2026-01-01T00:00:00").timestamp()
+    assert reader.parsed_at("2@current") is None
+    assert reader.parsed_at("3@current") is None
+    reader.close()
@@ -0,0 +1,41 @@
+import asyncio
+
+import httpx
+
+from app.tools.document_fetcher import DocumentCache, DocumentFetcher
+
+URL = "https://lex.uz/docs/145261"
+
+
+def fetcher_for(handler, **kwargs) -> DocumentFetcher:
+    fetcher = DocumentFetcher(DocumentCache(), backoff_base=0.01, **kwargs)
+    fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return fetcher
+
+
+def test_retry_after_within_cap_is_honoured():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, text="page")
+
+    fetcher = fetcher_for(handler, max_retry_after=5.0)
+    assert asyncio.run(fetcher.fetch(URL)) == "page"
+    assert fetcher.stats()["retries"] == 1
+
+
+def test_retry_after_over_cap_gives_up():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503, headers={"Retry-After": "3600"})
+
+    fetcher = fetcher_for(handler, max_retry_after=5.0)
+    assert asyncio.run(asyncio.wait_for(fetcher.fetch(URL), timeout=5)) is None
+    assert len(calls) == 1
+    assert fetcher.stats()["retry_after_exceeded"] == 1
+    assert fetcher.stats()["failures"] == 1
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.tools.document_corpus import CorpusWriter, CorpusReader
+from app.tools.document_parser import legal_parser_instance
+
+PAGE = (
+    "<html><head><title>Mehnat kodeksi</title></head><body><div id='content'>"
+    "<h2>1-modda. Ushbu Kodeksning maqsadi</h2>"
+    "<p>Amended text of the first article, as published today.</p>"
+    "</div></body></html>"
+)
+
+
+def corpus_document(document_id: str, parsed_at: datetime) -> dict:
+    return {
+        "success": True,
+        "markdown": "## 1-modda. Ushbu Kodeksning maqsadi\n\nText of the first article from the corpus.",
+        "structure": [],
+        "metadata": {"document_id": document_id, "title": "Mehnat kodeksi", "edition_date": ""},
+        "parsing_date": parsed_at.isoformat()
+    }
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    path = str(tmp_path / "corpus.lxc")
+    writer = CorpusWriter(path)
+    writer.add("9900101@current", corpus_document("9900101", datetime.now()))
+    ttl = legal_parser_instance.store.current_ttl
+    writer.add("9900102@current", corpus_document("9900102", datetime.now() - timedelta(seconds=ttl + 3600)))
+    writer.close()
+
+    reader = CorpusReader(path)
+    monkeypatch.setattr(legal_parser_instance, "corpus", reader)
+    yield reader
+    reader.close()
+
+
+@pytest.fixture
+def fetched_urls(monkeypatch):
+    urls = []
+
+    async def fetch(url):
+        urls.append(url)
+        return PAGE
+
+    monkeypatch.setattr(legal_parser_instance.fetcher, "fetch", fetch)
+    return urls
+
+
+def wait_for_store(key: str) -> None:
+    deadline = time.monotonic() + 10
+    while not legal_parser_instance.store.contains(key) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_fresh_corpus_entry_is_served_without_fetching(corpus, fetched_urls):
+    result = legal_parser_instance.parse_legal_document(legal_parser_instance.edition_url("9900101"))
+    assert "from the corpus" in result["markdown"]
+    assert fetched_urls == []
+
+
+def test_stale_corpus_entry_is_served_then_revalidated(corpus, fetched_urls):
+    url = legal_parser_instance.edition_url("9900102")
+    revalidations = legal_parser_instance.get_metrics()["corpus"]["revalidations"]
+
+    # Past the TTL the corpus copy is still served at once
+    result = legal_parser_instance.parse_legal_document(url)
+    assert "from the corpus" in result["markdown"]
+    assert legal_parser_instance.read_articles(url, "1")["success"]
+
+    # ...while the current edition is re-parsed in the background, once
+    wait_for_store("9900102@current")
+    assert fetched_urls == [url]
+    assert legal_parser_instance.get_metrics()["corpus"]["revalidations"] == revalidations + 1
+
+    result = legal_parser_instance.parse_legal_document(url)
+    assert "Amended text" in result["markdown"]
+    assert "Amended text" in legal_parser_instance.read_articles(url, "1")["articles"][0]
+    assert fetched_urls == [url]
+
+
+def test_concurrent_parses_of_a_document_share_one_fetch(monkeypatch):
+    urls = []
+
+    async def fetch(url):
+        urls.append(url)
+        await asyncio.sleep(0.1)
+        return PAGE
+
+    monkeypatch.setattr(legal_parser_instance.fetcher, "fetch", fetch)
+    url = legal_parser_instance.edition_url("9900103")
+
+    async def scenario():
+        return await asyncio.gather(*[legal_parser_instance.aparse_legal_document(url) for _ in range(3)])
+
+    results = asyncio.run(scenario())
+    assert urls == [url]
+    assert all(result["success"] and "Amended text" in result["markdown"] for result in results)
+
+
+@pytest.fixture
+def held_fetch(monkeypatch):
+    """Fetches that block until released, so prefetches stay in flight"""
+    release = threading.Event()
+    urls = []
+
+    async def fetch(url):
+        urls.append(url)
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        return PAGE
+
+    monkeypatch.setattr(legal_parser_instance.fetcher, "fetch", fetch)
+    monkeypatch.setattr(legal_parser_instance, "corpus", None)
+    yield urls, release
+    release.set()
+
+
+def wait_until(condition) -> None:
+    deadline = time.monotonic() + 10
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_unclaimed_prefetches_are_cancelled(held_fetch):
+    urls, release = held_fetch
+    keys = ["9900201@current", "9900202@current"]
+    before = legal_parser_instance.get_metrics()["prefetch"]
+
+    legal_parser_instance.prefetch([legal_parser_instance.edition_url(key.split("@")[0]) for key in keys], owner="cancel-test")
+    wait_until(lambda: len(urls) == 2)
+
+    assert legal_parser_instance.cancel_prefetch("cancel-test") == 2
+    wait_until(lambda: legal_parser_instance.get_metrics()["prefetch"]["cancelled"] == before["cancelled"] + 2)
+    prefetch = legal_parser_instance.get_metrics()["prefetch"]
+    assert prefetch["started"] == before["started"] + 2
+    assert prefetch["cancelled"] == before["cancelled"] + 2
+    assert not any(legal_parser_instance.store.contains(key) for key in keys)
+    assert legal_parser_instance.cancel_prefetch("cancel-test") == 0
+
+
+def test_claimed_prefetch_survives_cancellation(held_fetch):
+    urls, release = held_fetch
+    url = legal_parser_instance.edition_url("9900203")
+    before = legal_parser_instance.get_metrics()["prefetch"]
+
+    legal_parser_instance.prefetch([url], owner="claimed-test")
+    wait_until(lambda: len(urls) == 1)
+    # The user asks for the document the prefetch is already parsing
+    parse = legal_parser_instance._loop.submit(legal_parser_instance._parse_shared(url))
+    wait_until(lambda: legal_parser_instance.get_metrics()["prefetch"]["hits"] == before["hits"] + 1)
+
+    assert legal_parser_instance.cancel_prefetch("claimed-test") == 0
+    release.set()
+    assert parse.result(timeout=10)["success"]
+    assert urls == [url]
+
+    # Documents already parsed are not prefetched again
+    legal_parser_instance.prefetch([url], owner="claimed-test")
+    wait_until(lambda: legal_parser_instance.get_metrics()["prefetch"]["skipped"] == before["skipped"] + 1)
+    assert legal_parser_instance.get_metrics()["prefetch"]["skipped"] == before["skipped"] + 1
@@ -0,0 +1,81 @@
+from app.tools.document_structure import build_structure_index, entry_text, select_articles
+
+CODE = """Трудовой кодекс
+
+## РАЗДЕЛ I. ОБЩИЕ ПОЛОЖЕНИЯ
+
+Глава 1. Основные положения
+
+Статья 1. Задачи трудового законодательства
+
+Трудовое законодательство регулирует трудовые отношения.
+
+Статья 2. Право на труд
+
+Статья 1 настоящего Кодекса применяется ко всем работодателям.
+
+Каждый имеет право на труд.
+
+Статья 2-1. Запрещение принудительного труда
+
+Принудительный труд запрещается.
+
+Глава 2 Трудовой договор
+
+Статья 3
+
+Трудовой договор заключается в письменной форме.
+"""
+
+UZBEK = """1-bob. Umumiy qoidalar
+
+1-modda. Ushbu Kodeksning maqsadi
+
+1-modda talablari barcha ish beruvchilarga nisbatan qo'llaniladi.
+
+2-modda. Mehnat huquqi
+"""
+
+
+def headings(content: str):
+    return [(entry["kind"], entry["number"]) for entry in build_structure_index(content)]
+
+
+def test_headings():
+    assert headings(CODE) == [
+        ("section", "I"),
+        ("chapter", "1"),
+        ("article", "1"),
+        ("article", "2"),
+        ("article", "2-1"),
+        ("chapter", "2"),
+        ("article", "3"),
+    ]
+    assert headings(UZBEK) == [("chapter", "1"), ("article", "1"), ("article", "2")]
+
+
+def test_cross_reference_at_line_start_stays_in_its_article():
+    structure = build_structure_index(CODE)
+    article = select_articles(structure, "2")[0]
+    text = entry_text(CODE, article)
+    assert text.startswith("Статья 2. Право на труд")
+    assert "Статья 1 настоящего Кодекса применяется" in text
+    assert "Каждый имеет право на труд." in text
+
+    uzbek_article = select_articles(build_structure_index(UZBEK), "1")[0]
+    assert "1-modda talablari" in entry_text(UZBEK, uzbek_article)
+
+
+def test_heading_ranges():
+    structure = build_structure_index(CODE)
+    chapter = next(entry for entry in structure if entry["kind"] == "chapter" and entry["number"] == "1")
+    assert "Статья 2-1" in entry_text(CODE, chapter)
+    assert "Глава 2" not in entry_text(CODE, chapter)
+
+    assert [entry["number"] for entry in select_articles(structure, "1-3")] == ["1", "2", "2-1", "3"]
+    assert [entry["number"] for entry in select_articles(structure, "2-1")] == ["2-1"]
+
+
+def test_long_paragraph_is_not_a_heading():
+    content = "Статья 5. Title\n\nСтатья 7 " + "и другие нормы " * 20 + "действуют"
+    assert headings(content) == [("article", "5")]
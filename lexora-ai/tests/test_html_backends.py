@@ -0,0 +1,69 @@
+import pytest
+
+from app.tools.html_backends import BeautifulSoupBackend, create_html_backend
+
+pytest.importorskip("lxml")
+
+from app.tools.html_backends import LxmlBackend  # noqa: E402
+
+PAGES = {
+    "act": """<!DOCTYPE html>
+        <html><head><meta charset="utf-8"><title>O'zbekiston Respublikasining Qonuni</title>
+        <style>.x { color: red }</style></head>
+        <body>
+          <header>Site header text</header>
+          <h1>O'zbekiston Respublikasining Qonuni</h1>
+          <h2>2019 yil 14 oktyabr, № O'RQ-570</h2>
+          <div class="document-content">
+            <h3>1-modda. Ushbu Qonunning maqsadi</h3>
+            <p>Ushbu Qonunning maqsadi <b>mehnat</b> munosabatlarini<br/>tartibga solishdan iborat.</p>
+            <div>Quyidagilar
+              <ol><li>birinchi band matni;</li><li>ikkinchi band matni.</li></ol>
+              ham hisobga olinadi.</div>
+            <!-- comment -->
+            <table><tr><th>Ustun nomi</th><td>ustun qiymati</td></tr></table>
+            <script>window.x = 1;</script>
+          </div>
+          <footer>Site footer text</footer>
+        </body></html>""",
+    "content_id": """<html><head><title>Постановление</title></head>
+        <body><div id="content">
+          <h1>Постановление от 12.03.2020 г. № 150</h1>
+          <p>Статья 1. Утвердить положение о порядке рассмотрения обращений.</p>
+          <p>Статья 2. Контроль за исполнением возложить на министерство.</p>
+        </div></body></html>""",
+    "no_container": """<html><body>
+          <p>Text outside of any content container, long enough.</p>
+          <div>Text with <span>inline</span> &amp; entities &laquo;quoted&raquo;</div>
+        </body></html>""",
+}
+
+
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_lxml_matches_html_parser(name):
+    expected = BeautifulSoupBackend().extract(PAGES[name])
+    actual = LxmlBackend().extract(PAGES[name])
+    assert expected["blocks"]
+    assert actual == expected
+
+
+def test_metadata():
+    extracted = LxmlBackend().extract(PAGES["act"])
+    assert extracted["title"] == "O'zbekiston Respublikasining Qonuni"
+    assert extracted["document_number"] == "2019 yil 14 oktyabr, № O'RQ-570"
+
+
+def test_create_html_backend():
+    assert isinstance(create_html_backend("lxml"), LxmlBackend)
+    assert isinstance(create_html_backend("html.parser"), BeautifulSoupBackend)
+    with pytest.raises(ValueError):
+        create_html_backend("html5lib")
+
+
+def test_missing_lxml_falls_back_with_a_warning(monkeypatch, caplog):
+    from app.tools import html_backends
+
+    monkeypatch.setattr(html_backends, "lxml", None)
+    with caplog.at_level("WARNING", logger="app.tools.html_backends"):
+        assert isinstance(create_html_backend("lxml"), BeautifulSoupBackend)
+    assert "lxml is not installed" in caplog.text
@@ -0,0 +1,46 @@
+from bs4 import BeautifulSoup
+
+from app.tools.html_content import blocks_to_markdown, extract_blocks, find_content_root
+
+
+def blocks_of(html: str):
+    return extract_blocks(find_content_root(BeautifulSoup(html, "html.parser")))
+
+
+def test_nested_blocks_are_not_repeated():
+    blocks = blocks_of("""
+        <div id="content">
+          <div>Outer text before the list
+            <ul><li>First list item text</li><li>Second list item text</li></ul>
+            outer text after the list
+          </div>
+        </div>
+    """)
+    assert blocks == [
+        ("paragraph", "Outer text before the list"),
+        ("list_item", "First list item text"),
+        ("list_item", "Second list item text"),
+        ("paragraph", "outer text after the list"),
+    ]
+
+
+def test_document_order_and_inline_text():
+    blocks = blocks_of("""
+        <html><head><title>Act</title><script>var ignored = 1;</script></head>
+        <body>
+          <nav>Navigation links here</nav>
+          <div class="document-content">
+            <h2>1-modda. <b>Umumiy</b> qoidalar</h2>
+            <p>Ushbu <a href="#">Qonunning</a> maqsadi<br>va vazifalari</p>
+            <!-- a comment that must not show up -->
+            <table><tr><td>Cell number one</td><td>cell number two</td></tr></table>
+            <p>short</p>
+          </div>
+        </body></html>
+    """)
+    assert blocks == [
+        ("heading", "1-modda. Umumiy qoidalar"),
+        ("paragraph", "Ushbu Qonunning maqsadi va vazifalari"),
+        ("paragraph", "Cell number one cell number two"),
+    ]
+    assert blocks_to_markdown(blocks).startswith("\n## 1-modda. Umumiy qoidalar\n")
@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+
+from app.api.v1 import consultation
+from app.core import session_store
+from app.core.idempotency import IdempotencyKeyReusedError, IdempotentResponses, UnrecordedResponse
+from app.schemas.chat import ChatRequest, ChatResponse, Message
+
+
+def chat_request(content: str = "Salom", session_id: str = "s1") -> ChatRequest:
+    return ChatRequest(messages=[Message(role="user", content=content)], session_id=session_id)
+
+
+class Runs:
+    """Chat runs that answer with a numbered reply, optionally failing or waiting"""
+
+    def __init__(self):
+        self.count = 0
+        self.release = None
+
+    async def reply(self, error: Exception = None) -> ChatResponse:
+        self.count += 1
+        if self.release is not None:
+            await self.release.wait()
+        if error is not None:
+            raise error
+        return ChatResponse(messages=[Message(role="assistant", content=f"reply {self.count}")], session_id="s1")
+
+
+def test_retry_gets_the_recorded_response():
+    async def scenario():
+        responses, runs = IdempotentResponses("test"), Runs()
+        first = await responses.run("key-1", chat_request(), runs.reply)
+        retry = await responses.run("key-1", chat_request(), runs.reply)
+        other = await responses.run("key-2", chat_request(), runs.reply)
+        return responses, first, retry, other
+
+    responses, first, retry, other = asyncio.run(scenario())
+    assert first == retry
+    assert first.messages[0].content == "reply 1"
+    assert other.messages[0].content == "reply 2"
+    assert responses.stats()["runs"] == 2 and responses.stats()["replayed"] == 1
+
+
+def test_retry_attaches_to_the_run_in_flight():
+    async def scenario():
+        responses, runs = IdempotentResponses("test"), Runs()
+        runs.release = asyncio.Event()
+        first = asyncio.ensure_future(responses.run("key-1", chat_request(), runs.reply))
+        await asyncio.sleep(0)
+        # The first caller disconnects; the run continues for the retry
+        first.cancel()
+        retry = asyncio.ensure_future(responses.run("key-1", chat_request(), runs.reply))
+        await asyncio.sleep(0)
+        runs.release.set()
+        return responses, runs, await retry
+
+    responses, runs, retry = asyncio.run(scenario())
+    assert runs.count == 1
+    assert retry.messages[0].content == "reply 1"
+    assert responses.stats()["attached"] == 1
+
+
+def test_key_reused_for_a_different_request_is_rejected():
+    async def scenario():
+        responses, runs = IdempotentResponses("test"), Runs()
+        runs.release = asyncio.Event()
+        running = asyncio.ensure_future(responses.run("key-1", chat_request(), runs.reply))
+        await asyncio.sleep(0)
+        with pytest.raises(IdempotencyKeyReusedError):
+            await responses.run("key-1", chat_request("Boshqa savol"), runs.reply)
+        runs.release.set()
+        await running
+        with pytest.raises(IdempotencyKeyReusedError):
+            await responses.run("key-1", chat_request(session_id="s2"), runs.reply)
+        return responses
+
+    assert asyncio.run(scenario()).stats()["conflicts"] == 2
+
+
+def test_failed_and_unrecorded_runs_run_again():
+    async def scenario():
+        responses, runs = IdempotentResponses("test"), Runs()
+        with pytest.raises(RuntimeError):
+            await responses.run("key-1", chat_request(), lambda: runs.reply(RuntimeError("model unavailable")))
+
+        error_reply = ChatResponse(messages=[Message(role="assistant", content="Sorry")], session_id="s1")
+        unrecorded = await responses.run("key-1", chat_request(), lambda: runs.reply(UnrecordedResponse(error_reply)))
+        retry = await responses.run("key-1", chat_request(), runs.reply)
+        return runs, unrecorded, retry
+
+    runs, unrecorded, retry = asyncio.run(scenario())
+    assert unrecorded.messages[0].content == "Sorry"
+    assert retry.messages[0].content == "reply 3"
+    assert runs.count == 3
+
+
+def test_responses_are_shared_by_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_store.settings, "SESSION_STORE", "sqlite")
+    monkeypatch.setattr(session_store.settings, "SESSION_STORE_DB_PATH", str(tmp_path / "sessions.db"))
+
+    async def scenario():
+        worker_1, worker_2, runs = IdempotentResponses("test"), IdempotentResponses("test"), Runs()
+        first = await worker_1.run("key-1", chat_request(), runs.reply)
+        return first, await worker_2.run("key-1", chat_request(), runs.reply)
+
+    first, retry = asyncio.run(scenario())
+    assert first == retry
+
+
+def test_chat_endpoint_replays_responses_by_key(monkeypatch, fake_agent_graph):
+    # A second run would fail: the scripted model has a single answer
+    monkeypatch.setattr(consultation.consultation_engine, "graph", fake_agent_graph([AIMessage(content="Javob")]))
+    monkeypatch.setattr(consultation, "chat_responses", IdempotentResponses("consultation-test"))
+    app = FastAPI()
+    app.include_router(consultation.router, prefix="/api/v1/qna")
+    client = TestClient(app)
+    body = {"messages": [{"role": "user", "content": "Salom"}], "session_id": "idempotent-1"}
+
+    first = client.post("/api/v1/qna/chat", json=body, headers={"Idempotency-Key": "key-1"})
+    retry = client.post("/api/v1/qna/chat", json=body, headers={"Idempotency-Key": "key-1"})
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert first.json()["messages"] == [{"role": "assistant", "content": "Javob"}]
+
+    conflict = client.post(
+        "/api/v1/qna/chat",
+        json={**body, "messages": [{"role": "user", "content": "Boshqa"}]},
+        headers={"Idempotency-Key": "key-1"}
+    )
+    assert conflict.status_code == 422
@@ -0,0 +1,176 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.tools.legal_search_service import BraveRateLimitError, BraveSearchBackend, LegalSearchService
+from app.tools.rate_limiter import PriorityRateLimiter
+from app.tools.search_backend import SearchBackend
+
+BRAVE_RESPONSE = {
+    "web": {
+        "results": [
+            {
+                "title": "Трудовой кодекс",
+                "url": "https://lex.uz/docs/6257288",
+                "description": "Трудовой договор",
+                "extra_snippets": ["Статья 1"]
+            },
+            {"title": "Сравнение", "url": "https://lex.uz/docs/6257288?action=compare", "description": ""}
+        ]
+    }
+}
+
+
+def mock_backend(handler) -> BraveSearchBackend:
+    backend = BraveSearchBackend()
+    backend.rate_limiter = PriorityRateLimiter(rate=1000, burst=10)
+    backend._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return backend
+
+
+def test_client_is_pooled_until_closed():
+    async def scenario():
+        backend = BraveSearchBackend()
+        client = backend._get_client()
+        assert backend._get_client() is client
+        await backend.aclose()
+        assert client.is_closed
+        reopened = backend._get_client()
+        await backend.aclose()
+        return client, reopened
+
+    client, reopened = asyncio.run(scenario())
+    assert reopened is not client
+
+
+def test_request_is_sent_through_the_pooled_client():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json=BRAVE_RESPONSE)
+
+    async def scenario():
+        backend = mock_backend(handler)
+        first = await backend.search("трудовой договор")
+        second = await backend.search("отпуск")
+        await backend.aclose()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert len(requests) == 2
+    assert requests[0].url.params["q"] == "трудовой договор site:lex.uz"
+    assert requests[0].headers["X-Subscription-Token"] == "test"
+    assert first["search_successful"] and second["search_successful"]
+    assert first["total_found"] == 1
+    assert first["documents"][0]["document_id"] == "6257288"
+    assert first["documents"][0]["snippet"] == "Трудовой договор Статья 1"
+
+
+def test_rate_limited_request_raises_with_retry_after():
+    backend = mock_backend(lambda request: httpx.Response(429, headers={"Retry-After": "3"}))
+
+    with pytest.raises(BraveRateLimitError) as error:
+        asyncio.run(backend._brave_search_request("q"))
+    assert error.value.retry_after == 3.0
+
+
+def test_search_pauses_the_limiter_and_retries_after_429():
+    statuses = [429, 200]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = statuses.pop(0)
+        if status == 429:
+            return httpx.Response(429, headers={"Retry-After": "0.05"})
+        return httpx.Response(200, json=BRAVE_RESPONSE)
+
+    backend = mock_backend(handler)
+    response = asyncio.run(backend.search("отпуск"))
+    assert response["search_successful"]
+    assert statuses == []
+    assert backend.rate_limiter.stats()["upstream_rate_limited"] == 1
+
+
+def test_search_gives_up_after_max_retries():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(429, headers={"Retry-After": "0"})
+
+    backend = mock_backend(handler)
+    backend.max_rate_limit_retries = 1
+    response = asyncio.run(backend.search("отпуск"))
+    assert not response["search_successful"]
+    assert "rate limit exceeded after 2 attempts" in response["error"]
+    assert len(calls) == 2
+
+
+def test_timeout_is_reported_as_a_failed_search():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    response = asyncio.run(mock_backend(handler).search("отпуск", timeout=0.5))
+    assert not response["search_successful"]
+    assert response["error"] == "Brave Search timed out after 0.5s"
+
+
+class SlowBackend(SearchBackend):
+    """Answers after a per-query delay and records how many searches overlap"""
+
+    name = "slow"
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.running = 0
+        self.max_running = 0
+
+    async def search(self, query, site_filter=None, timeout=None, priority=0, on_queue_position=None):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delays[query])
+        finally:
+            self.running -= 1
+        if query == "broken":
+            return {"search_successful": False, "error": "boom", "total_found": 0, "documents": []}
+        return {"search_successful": True, "total_found": 0, "documents": [], "query": query}
+
+
+def test_search_many_runs_concurrently_and_keeps_order():
+    backend = SlowBackend({"a": 0.1, "b": 0.05, "c": 0.1, "d": 0.05})
+    service = LegalSearchService(backend=backend)
+    service.reranker = None
+
+    started = time.monotonic()
+    responses = service.search_many(["a", "b", "c", "d"], max_concurrency=2, deadline=5)
+    elapsed = time.monotonic() - started
+    service._loop.stop()
+
+    assert [response["query"] for response in responses] == ["a", "b", "c", "d"]
+    assert backend.max_running == 2
+    assert elapsed < 0.3
+
+
+def test_search_many_isolates_failed_and_late_queries():
+    backend = SlowBackend({"fast": 0.0, "broken": 0.0, "slow": 0.3})
+    service = LegalSearchService(backend=backend)
+    service.reranker = None
+
+    async def scenario():
+        return await service.asearch_many(["slow", "fast", "broken"], max_concurrency=3, deadline=0.1)
+
+    slow, fast, broken = asyncio.run(scenario())
+    # The late search is not cancelled: it finishes in the background and is cached
+    while backend.running:
+        time.sleep(0.01)
+    assert service.search_legal_documents("slow")["query"] == "slow"
+    assert service._in_flight.stats()["calls"] == 3
+    service._loop.stop()
+
+    assert not slow["search_successful"]
+    assert slow["error"] == "Search deadline of 0.1s exceeded"
+    assert fast["search_successful"]
+    assert broken["error"] == "boom"
@@ -0,0 +1,30 @@
+import os
+
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+
+from app.tools.parse_executor import ParseExecutor
+
+PAGE = "<html><head><title>Act</title></head><body><div id='content'><p>Статья 1. Article text of the act</p></div></body></html>"
+
+
+@pytest.fixture
+def executor():
+    executor = ParseExecutor("html.parser", max_workers=1, max_queue=2)
+    yield executor
+    executor.shutdown()
+
+
+def test_parse_on_pool(executor):
+    assert executor.parse(PAGE)["title"] == "Act"
+
+
+def test_pool_restarts_after_worker_crash(executor):
+    executor.start()
+    # Kill the worker the way a segfault or the OOM killer would
+    with pytest.raises(BrokenProcessPool):
+        executor._get_pool().submit(os._exit, 1).result()
+
+    assert executor.parse(PAGE)["title"] == "Act"
+    assert executor.stats()["pool_restarts"] == 1
+    assert executor.parse(PAGE)["title"] == "Act"
@@ -0,0 +1,103 @@
+import json
+
+from app.tools import parsed_document_store
+from app.tools.document_parser import legal_parser_instance
+from app.tools.parsed_document_store import ParsedDocumentStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+def result(text: str) -> dict:
+    return {"success": True, "markdown": text, "structure": [], "metadata": {"title": "Mehnat kodeksi"}}
+
+
+def size_of(value: dict) -> int:
+    return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def test_keys_separate_editions():
+    assert ParsedDocumentStore.make_key("1") == "1@current"
+    assert ParsedDocumentStore.make_key("1", "01.01.2020") == "1@01.01.2020"
+
+
+def test_memory_tier_is_bounded_by_size():
+    entry = result("x" * 100)
+    store = ParsedDocumentStore(max_bytes=size_of(entry) * 2)
+    store.set("a@current", entry)
+    store.set("b@current", entry)
+    store.get("a@current")
+    store.set("c@current", entry)
+
+    assert store.get("b@current") is None
+    assert store.get("a@current") is entry
+    stats = store.stats()
+    assert stats["entries"] == 2
+    assert stats["size_bytes"] == size_of(entry) * 2
+    assert stats["evictions"] == 1
+
+
+def test_only_the_current_edition_expires(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(parsed_document_store, "time", clock)
+    store = ParsedDocumentStore(current_ttl=60)
+    store.set("1@current", result("current"))
+    store.set("1@01.01.2020", result("dated"))
+
+    clock.now += 61
+    assert not store.contains("1@current")
+    assert store.get("1@current") is None
+    assert store.get("1@01.01.2020")["markdown"] == "dated"
+    assert store.stats()["expirations"] == 1
+
+
+def test_disk_tier_survives_restart_and_evicts_least_recently_read(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(parsed_document_store, "time", clock)
+    db_path = str(tmp_path / "parsed.db")
+    entry = result("y" * 100)
+    store = ParsedDocumentStore(db_path=db_path, disk_max_bytes=size_of(entry) * 2)
+    store.set("a@01.01.2020", entry)
+    clock.now += 1
+    store.set("b@01.01.2020", entry)
+
+    restarted = ParsedDocumentStore(db_path=db_path, disk_max_bytes=size_of(entry) * 2)
+    clock.now += 1
+    assert restarted.get("a@01.01.2020") == entry
+    assert restarted.stats()["disk_hits"] == 1
+    clock.now += 1
+    restarted.set("c@01.01.2020", entry)
+
+    reopened = ParsedDocumentStore(db_path=db_path)
+    assert reopened.contains("a@01.01.2020")
+    assert not reopened.contains("b@01.01.2020")
+    assert reopened.contains("c@01.01.2020")
+
+
+def test_sessions_share_one_parse(monkeypatch):
+    urls = []
+
+    async def fetch(url):
+        urls.append(url)
+        return (
+            "<html><head><title>Mehnat kodeksi</title></head><body><div id='content'>"
+            "<h2>1-modda. Ushbu Kodeksning maqsadi</h2>"
+            "<p>Ushbu Kodeksning maqsadi mehnat munosabatlarini tartibga solishdan iborat.</p>"
+            "</div></body></html>"
+        )
+
+    monkeypatch.setattr(legal_parser_instance.fetcher, "fetch", fetch)
+    monkeypatch.setattr(legal_parser_instance, "corpus", None)
+
+    # Two sessions cite the same edition through different URL forms
+    first = legal_parser_instance.parse_legal_document("https://lex.uz/docs/9900301?ONDATE=01.02.2023")
+    second = legal_parser_instance.parse_legal_document("https://lex.uz/acts/9900301?ONDATE=01.02.2023")
+    assert first["success"]
+    assert first is second
+    assert len(urls) == 1
+    assert legal_parser_instance.store.contains("9900301@01.02.2023")
@@ -0,0 +1,71 @@
+from app.tools.document_structure import build_structure_index
+from app.tools.passage_retriever import PassageRetriever, estimate_tokens, format_passages
+
+CONTENT = """Трудовой кодекс
+
+Статья 1. Задачи трудового законодательства
+
+Трудовое законодательство регулирует трудовые отношения.
+
+Статья 2. Отпуск
+
+Работнику предоставляется ежегодный оплачиваемый отпуск продолжительностью не менее пятнадцати рабочих дней.
+
+Статья 3. Расторжение трудового договора
+
+Трудовой договор может быть расторгнут по соглашению сторон.
+
+Отпуск без сохранения заработной платы предоставляется по заявлению работника.
+"""
+
+
+def test_returns_matching_passages_in_document_order_with_headings():
+    retriever = PassageRetriever()
+    passages = retriever.retrieve("1", CONTENT, "ежегодный оплачиваемый, без заработной платы", build_structure_index(CONTENT), k=2, token_budget=1000)
+
+    assert [passage["text"][:20] for passage in passages] == [
+        "Работнику предоставл",
+        "Отпуск без сохранени",
+    ]
+    assert passages[0]["heading"] == "Статья 2. Отпуск"
+    assert passages[1]["heading"] == "Статья 3. Расторжение трудового договора"
+    assert all(CONTENT[passage["start"]:passage["end"]] == passage["text"] for passage in passages)
+
+    assert format_passages(passages) == (
+        "[Статья 2. Отпуск]\n\n" + passages[0]["text"] + "\n\n"
+        "[Статья 3. Расторжение трудового договора]\n\n" + passages[1]["text"]
+    )
+
+
+def test_unrelated_question_returns_nothing():
+    assert PassageRetriever().retrieve("1", CONTENT, "налог на имущество", k=3, token_budget=1000) == []
+
+
+def test_token_budget_drops_passages_that_do_not_fit():
+    passages = PassageRetriever().retrieve("1", CONTENT, "ежегодный оплачиваемый, без заработной платы", k=5, token_budget=40)
+    assert len(passages) == 1
+    assert sum(estimate_tokens(passage["text"]) for passage in passages) <= 40
+
+
+def test_single_oversized_passage_is_trimmed():
+    passages = PassageRetriever().retrieve("1", CONTENT, "ежегодный оплачиваемый отпуск", k=1, token_budget=5)
+    assert passages[0]["text"].endswith("...")
+    assert len(passages[0]["text"]) <= 5 * 3.5 + 3
+
+
+def test_indexes_are_cached_per_document_content():
+    retriever = PassageRetriever(max_documents=2)
+    first = retriever.get_index("1", CONTENT)
+    assert retriever.get_index("1", CONTENT) is first
+    # A re-parsed document with different text gets a fresh index
+    assert retriever.get_index("1", CONTENT + "\nСтатья 4.") is not first
+    retriever.get_index("2", CONTENT)
+
+    assert retriever.stats() == {
+        "index_hits": 1,
+        "index_builds": 3,
+        "evictions": 1,
+        "cached_documents": 2,
+        "max_documents": 2
+    }
+    assert retriever.get_index("1", CONTENT) is not first
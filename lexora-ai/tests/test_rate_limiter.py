@@ -0,0 +1,171 @@
+import asyncio
+import time
+
+from app.tools.legal_search_service import BraveSearchBackend, LegalSearchService
+from app.tools.rate_limiter import PriorityRateLimiter, SearchPriority
+
+
+async def queue_up(limiter: PriorityRateLimiter, granted: list, name: str, priority: int, **kwargs) -> asyncio.Task:
+    async def acquire():
+        await limiter.acquire(priority, **kwargs)
+        granted.append(name)
+
+    task = asyncio.ensure_future(acquire())
+    await asyncio.sleep(0)
+    return task
+
+
+def test_burst_then_priority_order():
+    async def scenario():
+        limiter = PriorityRateLimiter(rate=50, burst=2)
+        assert await limiter.acquire() == 0.0
+        assert await limiter.acquire() == 0.0
+
+        granted = []
+        tasks = [
+            await queue_up(limiter, granted, "research 1", SearchPriority.RESEARCH),
+            await queue_up(limiter, granted, "research 2", SearchPriority.RESEARCH),
+            await queue_up(limiter, granted, "interactive", SearchPriority.INTERACTIVE),
+        ]
+        await asyncio.gather(*tasks)
+        return granted, limiter.stats()
+
+    granted, stats = asyncio.run(scenario())
+    assert granted == ["interactive", "research 1", "research 2"]
+    assert stats["granted"] == 5
+    assert stats["throttled"] == 3
+    assert stats["max_queue_depth"] == 3
+
+
+def test_queue_positions():
+    async def scenario():
+        limiter = PriorityRateLimiter(rate=50, burst=1)
+        await limiter.acquire()
+        positions = {"research": [], "interactive": []}
+        granted = []
+        tasks = [
+            await queue_up(limiter, granted, "research", SearchPriority.RESEARCH, on_queue_position=positions["research"].append),
+            await queue_up(limiter, granted, "interactive", SearchPriority.INTERACTIVE, on_queue_position=positions["interactive"].append),
+        ]
+        await asyncio.gather(*tasks)
+        return positions
+
+    positions = asyncio.run(scenario())
+    # The research caller is pushed back when the interactive one arrives
+    assert positions["research"] == [1, 2, 1]
+    assert positions["interactive"] == [1]
+
+
+def test_pause_holds_back_tokens():
+    async def scenario():
+        limiter = PriorityRateLimiter(rate=1000, burst=5)
+        limiter.pause(0.2)
+        started = time.monotonic()
+        await limiter.acquire()
+        return time.monotonic() - started, limiter.stats()
+
+    waited, stats = asyncio.run(scenario())
+    assert waited >= 0.15
+    assert stats["upstream_rate_limited"] == 1
+
+
+def test_stats_does_not_change_the_bucket():
+    limiter = PriorityRateLimiter(rate=10, burst=5)
+    limiter._tokens, limiter._updated = 0.0, time.monotonic() - 0.2
+    state = (limiter._tokens, limiter._updated)
+
+    stats = limiter.stats()
+    assert (limiter._tokens, limiter._updated) == state
+    assert 1.5 <= stats["tokens_available"] <= 5
+
+
+def test_promote_moves_a_queued_caller_up():
+    async def scenario():
+        limiter = PriorityRateLimiter(rate=50, burst=1)
+        await limiter.acquire()
+        granted = []
+        tasks = [
+            await queue_up(limiter, granted, "research", SearchPriority.RESEARCH, key="q"),
+            await queue_up(limiter, granted, "interactive", SearchPriority.INTERACTIVE),
+        ]
+        assert limiter.promote("q", SearchPriority.INTERACTIVE)
+        assert not limiter.promote("q", SearchPriority.INTERACTIVE)
+        await asyncio.gather(*tasks)
+        return granted
+
+    assert asyncio.run(scenario()) == ["research", "interactive"]
+
+
+def test_cancel_after_promote():
+    async def scenario():
+        limiter = PriorityRateLimiter(rate=50, burst=1)
+        await limiter.acquire()
+        granted = []
+        task = await queue_up(limiter, granted, "research", SearchPriority.RESEARCH, key="q")
+        limiter.promote("q", SearchPriority.INTERACTIVE)
+        task.cancel()
+        await asyncio.sleep(0)
+        return limiter.queue_depth()
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_joining_interactive_caller_promotes_a_research_search(monkeypatch):
+    backend = BraveSearchBackend()
+    backend.rate_limiter = PriorityRateLimiter(rate=20, burst=1)
+    requested = []
+
+    async def brave_search_request(search_query, timeout=None):
+        requested.append(search_query)
+        return []
+
+    monkeypatch.setattr(backend, "_brave_search_request", brave_search_request)
+    service = LegalSearchService(backend=backend)
+
+    async def scenario():
+        await backend.rate_limiter.acquire()
+        research = asyncio.ensure_future(service._asearch("mehnat", None, None, SearchPriority.RESEARCH))
+        await asyncio.sleep(0)
+        other = asyncio.ensure_future(service._asearch("soliq", None, None, SearchPriority.INTERACTIVE))
+        await asyncio.sleep(0)
+        # A user now asks for the same search the research fan-out is waiting on
+        joined = asyncio.ensure_future(service._asearch("mehnat", None, None, SearchPriority.INTERACTIVE))
+        await asyncio.gather(research, other, joined)
+
+    service._loop.run_sync(scenario())
+    assert requested == ["mehnat site:lex.uz", "soliq site:lex.uz"]
+    assert service._in_flight.stats()["coalesced"] == 1
+    service._loop.stop()
+
+
+def test_sustained_rate_is_enforced():
+    async def scenario():
+        limiter = PriorityRateLimiter(rate=20, burst=1)
+        started = time.monotonic()
+        await asyncio.gather(*[limiter.acquire() for _ in range(5)])
+        return time.monotonic() - started
+
+    # One token from the burst, then four more at 20 per second
+    assert asyncio.run(scenario()) >= 0.18
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = PriorityRateLimiter(rate=50, burst=1)
+        await limiter.acquire()
+        granted = []
+        cancelled = await queue_up(limiter, granted, "cancelled", SearchPriority.INTERACTIVE)
+        waiting = await queue_up(limiter, granted, "research", SearchPriority.RESEARCH)
+        cancelled.cancel()
+        await waiting
+        return granted, limiter.queue_depth()
+
+    assert asyncio.run(scenario()) == (["research"], 0)
+
+
+def test_disabled_limiter_never_waits():
+    async def scenario():
+        limiter = PriorityRateLimiter(rate=0, burst=1)
+        return [await limiter.acquire() for _ in range(10)]
+
+    assert asyncio.run(scenario()) == [0.0] * 10
@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1 import research
+from app.core.research_jobs import JobQueueFullError, ResearchJobQueue
+from app.schemas.chat import ChatResponse, Message, StreamResponse
+
+QUESTION = [Message(role="user", content="Mehnat shartnomasini bekor qilish")]
+
+
+class FakeAgent:
+    """Research runs that wait until their session is released; "fail" sessions raise"""
+
+    def __init__(self, released=()):
+        self.released = set(released)
+        self.started = []
+
+    async def stream_response(self, messages, session_id):
+        self.started.append(session_id)
+        yield StreamResponse(event="start")
+        if session_id.startswith("fail"):
+            raise RuntimeError("search backend unavailable")
+        while session_id not in self.released:
+            await asyncio.sleep(0.01)
+        yield StreamResponse(event="message", content=f"answer {session_id}")
+        yield StreamResponse(event="done", done=True, response=ChatResponse(
+            messages=[Message(role="assistant", content=f"answer {session_id}")], session_id=session_id
+        ))
+
+
+async def settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0.02)
+
+
+def test_workers_bound_concurrent_runs():
+    async def scenario():
+        agent = FakeAgent()
+        jobs = ResearchJobQueue(agent, workers=1)
+        first, second = jobs.submit(QUESTION, "s1"), jobs.submit(QUESTION, "s2")
+        await settle()
+        assert agent.started == ["s1"]
+        assert jobs.status(second).queue_position == 0
+        assert jobs.stats()["running"] == 1 and jobs.stats()["queued"] == 1
+
+        agent.released.update({"s1", "s2"})
+        await settle()
+        await jobs.aclose()
+        return jobs, first, second
+
+    jobs, first, second = asyncio.run(scenario())
+    for job in (first, second):
+        status = jobs.status(job)
+        assert status.status == "succeeded"
+        assert status.result.messages[0].content == f"answer {job.session_id}"
+        assert status.queue_seconds is not None and status.run_seconds is not None
+    assert jobs.status(second).queue_seconds >= jobs.status(first).run_seconds - 0.01
+    assert jobs.stats()["succeeded"] == 2
+
+
+def test_full_queue_rejects_new_jobs():
+    async def scenario():
+        jobs = ResearchJobQueue(FakeAgent(), workers=1, max_queue=1)
+        jobs.submit(QUESTION, "s1")
+        await settle()
+        jobs.submit(QUESTION, "s2")
+        with pytest.raises(JobQueueFullError):
+            jobs.submit(QUESTION, "s3")
+        stats = jobs.stats()
+        await jobs.aclose()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["submitted"] == 2 and stats["rejected"] == 1
+
+
+def test_cancel_queued_and_running_jobs():
+    async def scenario():
+        agent = FakeAgent(released={"s3"})
+        jobs = ResearchJobQueue(agent, workers=1)
+        running, queued, last = (jobs.submit(QUESTION, session) for session in ("s1", "s2", "s3"))
+        await settle()
+
+        assert jobs.cancel(queued.job_id)
+        assert jobs.cancel(running.job_id)
+        await settle()
+        assert not jobs.cancel(running.job_id)
+        assert not jobs.cancel("unknown")
+        await jobs.aclose()
+        return agent, jobs, running, queued, last
+
+    agent, jobs, running, queued, last = asyncio.run(scenario())
+    assert (running.status, queued.status, last.status) == ("cancelled", "cancelled", "succeeded")
+    # The cancelled queued job never ran and the worker went on to the next one
+    assert agent.started == ["s1", "s3"]
+    assert jobs.stats()["cancelled"] == 2
+
+
+def test_subscribers_get_every_event_then_the_failure():
+    async def scenario():
+        jobs = ResearchJobQueue(FakeAgent(), workers=1)
+        job = jobs.submit(QUESTION, "fail-1")
+        live = [event async for event in jobs.subscribe(job)]
+        late = [event async for event in jobs.subscribe(job)]
+        await jobs.aclose()
+        return jobs, job, live, late
+
+    jobs, job, live, late = asyncio.run(scenario())
+    assert jobs.status(job).status == "failed"
+    assert job.error == "search backend unavailable"
+    assert [event.event for event in live] == ["start", "error"]
+    assert live[-1].content == "search backend unavailable" and live[-1].done
+    assert late == live
+
+
+def test_finished_jobs_expire_after_ttl():
+    async def scenario():
+        jobs = ResearchJobQueue(FakeAgent(released={"s1", "s2"}), workers=1, ttl=0)
+        first = jobs.submit(QUESTION, "s1")
+        await settle()
+        jobs.submit(QUESTION, "s2")
+        await jobs.aclose()
+        return jobs, first
+
+    jobs, first = asyncio.run(scenario())
+    assert jobs.get(first.job_id) is None
+
+
+def test_job_endpoints(monkeypatch):
+    jobs = ResearchJobQueue(FakeAgent(released={"http-1"}), workers=1)
+    monkeypatch.setattr(research, "research_jobs", jobs)
+    app = FastAPI()
+    app.include_router(research.router, prefix="/api/v1/research")
+
+    with TestClient(app) as client:
+        response = client.post("/api/v1/research/jobs", json={
+            "messages": [message.model_dump() for message in QUESTION],
+            "session_id": "http-1"
+        })
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        events = client.get(f"/api/v1/research/jobs/{job_id}/events").text
+        assert events.startswith("event: start\n") and "event: done\n" in events
+
+        status = client.get(f"/api/v1/research/jobs/{job_id}").json()
+        assert status["status"] == "succeeded"
+        assert status["result"]["messages"] == [{"role": "assistant", "content": "answer http-1"}]
+
+        assert client.delete(f"/api/v1/research/jobs/{job_id}").json() == {"message": f"Research job {job_id} already finished"}
+        assert client.get("/api/v1/research/jobs/unknown").status_code == 404
+        assert client.delete("/api/v1/research/jobs/unknown").status_code == 404
+        # Stop the workers on the app's loop, as the app lifespan does
+        client.portal.call(jobs.aclose)
@@ -0,0 +1,91 @@
+import pytest
+
+from app.schemas.research_state import MultiSearchQuery, SearchResult
+from app.tools import research_tools
+from app.tools.research_tools import execute_multi_search, validate_and_rank_sources
+from app.tools.vector_index import hybrid_scorer
+
+QUESTION = "mehnat shartnomasini bekor qilish tartibi 2023"
+
+
+def search_result(document_id: str, title: str, snippet: str, relevance_score: float) -> SearchResult:
+    return SearchResult(
+        document_id=document_id,
+        title=title,
+        snippet=snippet,
+        url=f"https://lex.uz/docs/{document_id}",
+        document_date="",
+        relevance_score=relevance_score
+    )
+
+
+def validate(results):
+    command = validate_and_rank_sources.func(
+        raw_search_results=results,
+        current_user_question=QUESTION,
+        validation_results=[],
+        tool_call_id="validate"
+    )
+    return {result.document_id: result for result in command.update["validation_results"]}
+
+
+def test_search_score_is_not_counted_again():
+    title, snippet = "Mehnat kodeksi", "Mehnat shartnomasini bekor qilish asoslari"
+    validated = validate([search_result("1", title, snippet, 0.1), search_result("2", title, snippet, 0.9)])
+
+    # Same text, different search scores: validation scores the question on its own
+    assert validated["1"].relevance_score == validated["2"].relevance_score
+
+    documents = [{"title": title, "snippet": snippet}]
+    expected = hybrid_scorer.fuse(
+        hybrid_scorer.lexical_scores(QUESTION, documents),
+        hybrid_scorer.dense_scores(QUESTION, [f"{title} {snippet}"], ["1"])
+    )[0]
+    assert validated["1"].relevance_score == pytest.approx(float(expected), abs=1e-6)
+
+
+def test_ranks_matching_sources_first():
+    validated = validate([
+        search_result("1", "Davlat boji to'g'risida", "Davlat boji stavkalari", 0.9),
+        search_result("2", "Mehnat kodeksi", "Mehnat shartnomasini bekor qilish tartibi 2023 yil", 0.1),
+    ])
+    assert validated["2"].relevance_score > validated["1"].relevance_score
+
+
+def test_multi_search_runs_pending_queries_in_one_fan_out(monkeypatch):
+    fan_outs = []
+
+    def search_many(queries, **kwargs):
+        fan_outs.append(list(queries))
+        responses = {
+            "mehnat kodeksi": {"search_successful": True, "total_found": 2, "documents": [
+                search_result("1", "Mehnat kodeksi", "", 0.9).model_dump(),
+                search_result("2", "Mehnat shartnomasi", "", 0.8).model_dump(),
+            ]},
+            "ishdan bo'shatish": {"search_successful": True, "total_found": 1, "documents": [
+                search_result("2", "Mehnat shartnomasi", "", 0.8).model_dump(),
+            ]},
+            "kompensatsiya": {"search_successful": False, "error": "deadline", "total_found": 0, "documents": []},
+        }
+        return [responses[query] for query in queries]
+
+    monkeypatch.setattr(research_tools.legal_search_service, "search_many", search_many)
+    monkeypatch.setattr(research_tools.settings, "PREFETCH_ENABLED", False)
+
+    planned = [
+        MultiSearchQuery(query=query, query_type="general", legal_concepts=[], rationale="")
+        for query in ["mehnat", "mehnat kodeksi", "ishdan bo'shatish", "kompensatsiya"]
+    ]
+    command = execute_multi_search.func(
+        search_queries_planned=planned,
+        search_queries_executed=["mehnat"],
+        raw_search_results=[search_result("1", "Mehnat kodeksi", "", 0.9)],
+        tool_call_id="search",
+        config={}
+    )
+
+    assert fan_outs == [["mehnat kodeksi", "ishdan bo'shatish", "kompensatsiya"]]
+    update = command.update
+    assert [result.document_id for result in update["raw_search_results"]] == ["1", "2"]
+    assert update["search_queries_executed"] == ["mehnat", "mehnat kodeksi", "ishdan bo'shatish"]
+    assert "1 searches failed or timed out: kompensatsiya" in update["messages"][0].content
@@ -0,0 +1,111 @@
+from typing import Annotated
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.tools import tool, InjectedToolCallId
+from langgraph.types import Command
+
+from app.api.v1 import research
+from app.schemas.research_state import LegalResearchState, ValidationResult
+
+DOCUMENT_ID = "6257288"
+
+
+@tool
+def request_source_approval(tool_call_id: Annotated[str, InjectedToolCallId]) -> Command:
+    """Ask the user to approve sources"""
+    return Command(update={
+        "pending_approval": True,
+        "workflow_stage": "approval",
+        "validation_results": [ValidationResult(
+            document_id=DOCUMENT_ID,
+            title="Mehnat kodeksi",
+            snippet="",
+            url=f"https://lex.uz/docs/{DOCUMENT_ID}",
+            document_date="",
+            is_relevant=True,
+            relevance_score=0.8,
+            reasoning="Mehnat shartnomasi"
+        )],
+        "messages": [ToolMessage("Source approval requested", tool_call_id=tool_call_id)]
+    })
+
+
+@pytest.fixture
+def graph(monkeypatch, fake_agent_graph):
+    graph = fake_agent_graph(
+        [
+            AIMessage(content="", tool_calls=[{"name": "request_source_approval", "args": {}, "id": "call-1"}]),
+            AIMessage(content="Manbalarni tasdiqlang"),
+            AIMessage(content="Tahlil tayyor"),
+        ],
+        tools=[request_source_approval],
+        state_schema=LegalResearchState
+    )
+    monkeypatch.setattr(research.research_agent, "graph", graph)
+    return graph
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(research.router, prefix="/api/v1/research")
+    return TestClient(app)
+
+
+def receive_run(websocket) -> list:
+    """Frames of one run, up to and including its done frame"""
+    frames = []
+    while not frames or not frames[-1].get("done"):
+        frames.append(websocket.receive_json())
+    return frames
+
+
+def test_source_approval_round_trip(client, graph):
+    with client.websocket_connect("/api/v1/research/ws/ws-approval") as websocket:
+        websocket.send_json({"type": "message", "content": "Mehnat shartnomasini bekor qilish"})
+        frames = receive_run(websocket)
+        assert frames[0]["event"] == "start"
+        assert "tool_start" in [frame["event"] for frame in frames]
+
+        interrupt = next(frame for frame in frames if frame["event"] == "interrupt")["data"]
+        assert interrupt["interrupt_type"] == "source_approval"
+        assert [source["document_id"] for source in interrupt["interrupt_data"]["sources"]] == [DOCUMENT_ID]
+        assert frames[-1]["response"]["interrupt_id"] == interrupt["interrupt_id"]
+        assert frames[-1]["response"]["messages"] == [{"role": "assistant", "content": "Manbalarni tasdiqlang"}]
+
+        websocket.send_json({"type": "approval", "interrupt_id": interrupt["interrupt_id"], "document_ids": [DOCUMENT_ID]})
+        frames = receive_run(websocket)
+        assert "interrupt" not in [frame["event"] for frame in frames]
+        assert frames[-1]["response"]["messages"] == [{"role": "assistant", "content": "Tahlil tayyor"}]
+
+    state = graph.get_state({"configurable": {"thread_id": "ws-approval"}}).values
+    assert state["approved_document_ids"] == [DOCUMENT_ID]
+    assert not state["pending_approval"]
+    assert [message.content for message in research.research_agent.get_session_history("ws-approval")] == [
+        "Mehnat shartnomasini bekor qilish", "Manbalarni tasdiqlang", f"approved: {DOCUMENT_ID}", "Tahlil tayyor"
+    ]
+
+
+def test_invalid_frames_keep_the_connection_open(client, graph):
+    with client.websocket_connect("/api/v1/research/ws/ws-errors") as websocket:
+        websocket.send_text("not json")
+        assert websocket.receive_json()["event"] == "error"
+
+        websocket.send_json({"type": "approval", "document_ids": [DOCUMENT_ID]})
+        error = websocket.receive_json()
+        assert error == {"event": "error", "content": "No source approval is pending for this session", "done": False}
+
+        websocket.send_json({"type": "message", "content": "Mehnat shartnomasini bekor qilish"})
+        interrupt = next(frame for frame in receive_run(websocket) if frame["event"] == "interrupt")["data"]
+
+        websocket.send_json({"type": "approval", "interrupt_id": "older", "document_ids": [DOCUMENT_ID]})
+        assert websocket.receive_json()["content"] == "Interrupt older is no longer pending"
+
+        # The pending approval is still answerable after the stale reply
+        websocket.send_json({"type": "approval", "interrupt_id": interrupt["interrupt_id"], "action": "all"})
+        assert receive_run(websocket)[-1]["response"]["messages"] == [{"role": "assistant", "content": "Tahlil tayyor"}]
+
+    assert graph.get_state({"configurable": {"thread_id": "ws-errors"}}).values["approved_document_ids"] == ["all"]
@@ -0,0 +1,106 @@
+from app.tools import search_cache
+from app.tools.legal_search_service import LegalSearchService
+from app.tools.search_backend import SearchBackend
+from app.tools.search_cache import SearchResultCache
+
+
+def response(document_id: str) -> dict:
+    return {"search_successful": True, "total_found": 1, "documents": [{"document_id": document_id}]}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+def test_key_normalizes_query_and_site_filter():
+    assert SearchResultCache.make_key("  Трудовой   ДОГОВОР ") == SearchResultCache.make_key("трудовой договор", "lex.uz")
+    assert SearchResultCache.make_key("q", "norma.uz") != SearchResultCache.make_key("q")
+
+
+def test_entries_are_copied_in_and_out():
+    cache = SearchResultCache()
+    value = response("1")
+    cache.set("k", value)
+    value["documents"].append({"document_id": "2"})
+
+    cached = cache.get("k")
+    cached["documents"][0]["relevance_score"] = 1.0
+    assert cache.get("k") == response("1")
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(search_cache, "time", clock)
+    cache = SearchResultCache(ttl=60)
+    cache.set("k", response("1"))
+    cache.set("short", response("2"), ttl=5)
+
+    clock.now += 10
+    assert cache.get("k") == response("1")
+    assert cache.get("short") is None
+
+    clock.now += 60
+    assert cache.get("k") is None
+    stats = cache.stats()
+    assert stats["expirations"] == 2
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SearchResultCache(max_entries=2)
+    cache.set("a", response("a"))
+    cache.set("b", response("b"))
+    cache.get("a")
+    cache.set("c", response("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") == response("a")
+    assert cache.get("c") == response("c")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(search_cache, "time", clock)
+    db_path = str(tmp_path / "search_cache.db")
+    SearchResultCache(ttl=60, db_path=db_path).set("k", response("1"))
+
+    restarted = SearchResultCache(ttl=60, db_path=db_path)
+    assert restarted.get("k") == response("1")
+    assert restarted.get("k") == response("1")
+    stats = restarted.stats()
+    assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1
+
+    clock.now += 61
+    assert SearchResultCache(ttl=60, db_path=db_path).get("k") is None
+
+
+class CountingBackend(SearchBackend):
+    name = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def search(self, query, site_filter=None, timeout=None, priority=0, on_queue_position=None):
+        self.calls += 1
+        return {"search_successful": self.calls > 1, "total_found": 1, "documents": [
+            {"document_id": "1", "title": "Mehnat kodeksi", "snippet": "", "url": "", "document_date": "", "relevance_score": 0.5}
+        ]}
+
+
+def test_service_caches_successful_responses_only():
+    backend = CountingBackend()
+    service = LegalSearchService(backend=backend)
+
+    assert not service.search_legal_documents("mehnat")["search_successful"]
+    first = service.search_legal_documents("mehnat")
+    first["documents"].clear()
+    second = service.search_legal_documents("  MEHNAT ")
+    service._loop.stop()
+
+    assert backend.calls == 2
+    assert second["search_successful"] and len(second["documents"]) == 1
@@ -0,0 +1,117 @@
+import pytest
+
+from app.core import session_store
+from app.core.session_store import MemorySessionStore, SqliteSessionStore, create_session_store
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path, clock):
+    if request.param == "memory":
+        store = MemorySessionStore("consultation", ttl=60)
+    else:
+        store = SqliteSessionStore("consultation", db_path=str(tmp_path / "sessions.db"), ttl=60)
+    yield store
+    store.close()
+
+
+def test_sessions_are_private_copies(store):
+    session = {"messages": ["salom"]}
+    store.set("s1", session)
+    session["messages"].append("not saved")
+
+    loaded = store.get("s1")
+    loaded["messages"].append("not saved either")
+    assert store.get("s1") == {"messages": ["salom"]}
+    assert store.get("missing") is None
+
+
+def test_sessions_expire_unless_written_again(store, clock):
+    store.set("s1", {"turn": 1})
+    store.set("s2", {"turn": 1})
+    clock.now += 50
+    store.set("s2", {"turn": 2})
+    clock.now += 20
+
+    assert store.get("s1") is None
+    assert store.get("s2") == {"turn": 2}
+    assert store.stats()["expirations"] == 1
+
+
+def test_delete(store):
+    store.set("s1", {})
+    assert store.delete("s1")
+    assert not store.delete("s1")
+    assert store.get("s1") is None
+
+
+def test_memory_store_evicts_least_recently_used_sessions(clock):
+    store = MemorySessionStore("research", ttl=60, max_bytes=200)
+    store.set("a", "x" * 80)
+    store.set("b", "x" * 80)
+    store.get("a")
+    store.set("c", "x" * 80)
+
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+    assert store.stats()["evictions"] == 1
+
+
+def test_sqlite_sessions_are_shared_by_workers_and_kept_per_namespace(tmp_path, clock):
+    db_path = str(tmp_path / "sessions.db")
+    worker_1 = SqliteSessionStore("consultation", db_path=db_path, ttl=60)
+    worker_2 = SqliteSessionStore("consultation", db_path=db_path, ttl=60)
+    research = SqliteSessionStore("research", db_path=db_path, ttl=60)
+
+    worker_1.set("s1", {"turn": 1})
+    assert worker_2.get("s1") == {"turn": 1}
+    assert research.get("s1") is None
+    assert research.stats()["sessions"] == 0
+
+    for store in (worker_1, worker_2, research):
+        store.close()
+    assert SqliteSessionStore("consultation", db_path=db_path).get("s1") == {"turn": 1}
+
+
+def test_sqlite_purge_drops_expired_then_oldest_sessions(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(SqliteSessionStore, "PURGE_EVERY", 4)
+    store = SqliteSessionStore("consultation", db_path=str(tmp_path / "sessions.db"), ttl=60, max_bytes=250)
+    store.set("expired", "x" * 80)
+    clock.now += 61
+    store.set("old", "x" * 80)
+    clock.now += 1
+    store.set("newer", "x" * 80)
+    clock.now += 1
+    store.set("newest", "x" * 80)
+
+    stats = store.stats()
+    assert stats["sessions"] == 2
+    assert stats["expirations"] == 1 and stats["evictions"] == 1
+    assert store.get("old") is None
+    store.close()
+
+
+def test_create_session_store_follows_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_store.settings, "SESSION_STORE", "sqlite")
+    monkeypatch.setattr(session_store.settings, "SESSION_STORE_DB_PATH", str(tmp_path / "db" / "sessions.db"))
+    store = create_session_store("research", ttl=5)
+    assert isinstance(store, SqliteSessionStore) and store.ttl == 5
+    store.close()
+
+    monkeypatch.setattr(session_store.settings, "SESSION_STORE", "redis")
+    with pytest.raises(ValueError):
+        create_session_store("research")
@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from app.core.consultation_engine import ConsultationEngine
+from app.core.session_turns import SessionBusyError, SessionTurnQueue, turn_key
+from app.schemas.chat import Message
+
+
+class Turns:
+    """Turn functions that record when they run and finish when released"""
+
+    def __init__(self):
+        self.log = []
+        self.release = asyncio.Event()
+
+    def turn(self, name):
+        async def run():
+            self.log.append(f"start {name}")
+            await self.release.wait()
+            self.log.append(f"end {name}")
+            return name
+        return run
+
+
+async def settle() -> None:
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_turns_of_a_session_run_one_at_a_time():
+    async def scenario():
+        queue, turns = SessionTurnQueue(max_pending=3), Turns()
+        first = asyncio.ensure_future(queue.run("s1", "a", turns.turn("s1 a")))
+        second = asyncio.ensure_future(queue.run("s1", "b", turns.turn("s1 b")))
+        other = asyncio.ensure_future(queue.run("s2", "a", turns.turn("s2 a")))
+        await settle()
+        assert turns.log == ["start s1 a", "start s2 a"]
+        assert queue.stats()["pending_turns"] == 3
+
+        turns.release.set()
+        results = await asyncio.gather(first, second, other)
+        return queue, turns, results
+
+    queue, turns, results = asyncio.run(scenario())
+    assert results == ["s1 a", "s1 b", "s2 a"]
+    assert turns.log.index("end s1 a") < turns.log.index("start s1 b")
+    assert queue.stats() == {"turns": 3, "merged": 0, "rejected": 0, "busy_sessions": 0, "pending_turns": 0, "max_pending": 3}
+
+
+def test_identical_turn_joins_the_one_in_flight():
+    async def scenario():
+        queue, turns = SessionTurnQueue(), Turns()
+        first = asyncio.ensure_future(queue.run("s1", "a", turns.turn("first")))
+        await settle()
+        retry = asyncio.ensure_future(queue.run("s1", "a", turns.turn("retry")))
+        await settle()
+        turns.release.set()
+        return queue, turns, await asyncio.gather(first, retry)
+
+    queue, turns, results = asyncio.run(scenario())
+    assert results == ["first", "first"]
+    assert turns.log == ["start first", "end first"]
+    assert queue.stats()["merged"] == 1
+
+
+def test_turns_beyond_max_pending_are_rejected():
+    async def scenario():
+        queue, turns = SessionTurnQueue(max_pending=2), Turns()
+        running = [asyncio.ensure_future(queue.run("s1", key, turns.turn(key))) for key in ("a", "b")]
+        await settle()
+        with pytest.raises(SessionBusyError):
+            await queue.run("s1", "c", turns.turn("c"))
+        # Other sessions are not affected
+        other = asyncio.ensure_future(queue.run("s2", "c", turns.turn("c")))
+        turns.release.set()
+        await asyncio.gather(*running, other)
+        return queue
+
+    assert asyncio.run(scenario()).stats()["rejected"] == 1
+
+
+def test_turn_outlives_its_caller_so_a_retry_can_attach():
+    async def scenario():
+        queue, turns = SessionTurnQueue(), Turns()
+        caller = asyncio.ensure_future(queue.run("s1", "a", turns.turn("a")))
+        await settle()
+        caller.cancel()
+        await settle()
+        assert turns.log == ["start a"]
+
+        retry = asyncio.ensure_future(queue.run("s1", "a", turns.turn("a")))
+        await settle()
+        turns.release.set()
+        return turns, await retry
+
+    turns, result = asyncio.run(scenario())
+    assert result == "a"
+    assert turns.log == ["start a", "end a"]
+
+
+def test_streamed_turn_holds_the_session():
+    async def scenario():
+        queue, turns = SessionTurnQueue(), Turns()
+        log = []
+
+        async def stream():
+            async with queue.hold("s1", "a"):
+                log.append("stream start")
+                await turns.release.wait()
+                log.append("stream end")
+
+        streaming = asyncio.ensure_future(stream())
+        await settle()
+        with pytest.raises(SessionBusyError):
+            await queue.run("s1", "a", turns.turn("duplicate"))
+        with pytest.raises(SessionBusyError):
+            async with queue.hold("s1", "a"):
+                pass
+
+        later = asyncio.ensure_future(queue.run("s1", "b", turns.turn("b")))
+        await settle()
+        assert turns.log == []
+        turns.release.set()
+        await asyncio.gather(streaming, later)
+        return log, turns.log
+
+    log, turn_log = asyncio.run(scenario())
+    assert log == ["stream start", "stream end"]
+    assert turn_log == ["start b", "end b"]
+
+
+def test_double_submit_runs_the_graph_once(fake_agent_graph):
+    engine = ConsultationEngine()
+    # A second run would fail: the scripted model has a single answer
+    engine.graph = fake_agent_graph([AIMessage(content="Javob")])
+    messages = [Message(role="user", content="Salom")]
+    assert turn_key(messages) == turn_key([Message(role="user", content="Salom")])
+
+    async def scenario():
+        return await asyncio.gather(
+            engine.get_response(messages, "double-submit"),
+            engine.get_response(list(messages), "double-submit")
+        )
+
+    first, second = asyncio.run(scenario())
+    assert first == second == [Message(role="assistant", content="Javob")]
+    assert engine.turns.stats()["merged"] == 1
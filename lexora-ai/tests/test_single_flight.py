@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from app.tools.single_flight import AsyncSingleFlight
+
+
+class Upstream:
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_identical_calls_share_one_upstream_call():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        upstream = Upstream(result={"documents": []})
+        waiters = [asyncio.ensure_future(flight.do("key", upstream)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert flight.in_flight("key")
+        upstream.release.set()
+        results = await asyncio.gather(*waiters)
+        return flight, upstream, results
+
+    flight, upstream, results = asyncio.run(scenario())
+    assert upstream.calls == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"calls": 1, "coalesced": 2, "in_flight": 0}
+
+
+def test_error_reaches_every_waiter_and_is_not_kept():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        upstream = Upstream(error=ValueError("upstream failed"))
+        waiters = [asyncio.ensure_future(flight.do("key", upstream)) for _ in range(2)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+
+        retry = Upstream(result="ok")
+        retry.release.set()
+        return results, await flight.do("key", retry)
+
+    results, retried = asyncio.run(scenario())
+    assert [str(error) for error in results] == ["upstream failed", "upstream failed"]
+    assert retried == "ok"
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        upstream = Upstream(result="ok")
+        cancelled = asyncio.ensure_future(flight.do("key", upstream))
+        remaining = asyncio.ensure_future(flight.do("key", upstream))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        upstream.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return await remaining
+
+    assert asyncio.run(scenario()) == "ok"
+
+
+def test_cancel_unclaimed_only_cancels_calls_nobody_waits_on():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        claimed, unclaimed = Upstream(result="claimed"), Upstream(result="unclaimed")
+        waiter = asyncio.ensure_future(flight.do("claimed", claimed))
+        speculative = flight.start("unclaimed", unclaimed)
+        await asyncio.sleep(0)
+
+        assert not flight.cancel_unclaimed("claimed")
+        assert flight.cancel_unclaimed("unclaimed")
+        assert not flight.cancel_unclaimed("missing")
+        claimed.release.set()
+        await asyncio.sleep(0)
+        return await waiter, speculative
+
+    result, speculative = asyncio.run(scenario())
+    assert result == "claimed"
+    assert speculative.cancelled()
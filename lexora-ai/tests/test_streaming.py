@@ -0,0 +1,84 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import tool
+
+from app.api.v1 import consultation
+from app.core.streaming import search_queue_reporter
+
+
+@tool
+def consultation_search(query: str, config: RunnableConfig) -> str:
+    """Search lex.uz"""
+    search_queue_reporter(config)(query, 2)
+    return f"Found 1 document for {query}"
+
+
+SEARCH_CALL = AIMessage(content="", tool_calls=[{"name": "consultation_search", "args": {"query": "mehnat"}, "id": "call-1"}])
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(consultation.router, prefix="/api/v1/qna")
+    return TestClient(app)
+
+
+def read_events(response) -> list:
+    """Parse server-sent event frames into (event, data) pairs"""
+    events = []
+    for frame in response.text.strip().split("\n\n"):
+        name, data = frame.split("\n")
+        assert name.startswith("event: ") and data.startswith("data: ")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_sends_tokens_tool_events_and_the_final_response(client, monkeypatch, fake_agent_graph):
+    graph = fake_agent_graph([SEARCH_CALL, AIMessage(content="Mehnat kodeksi 1-modda")], tools=[consultation_search])
+    monkeypatch.setattr(consultation.consultation_engine, "graph", graph)
+
+    response = client.post("/api/v1/qna/chat/stream", json={
+        "messages": [{"role": "user", "content": "Mehnat kodeksi nima?"}],
+        "session_id": "stream-1"
+    })
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = read_events(response)
+
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == "start" and kinds[-1] == "done"
+    assert kinds.index("tool_start") < kinds.index("queue") < kinds.index("tool_end") < kinds.index("token")
+
+    by_kind = {kind: data for kind, data in events if kind != "token"}
+    assert by_kind["tool_start"] == {"event": "tool_start", "tool": "consultation_search", "data": {"query": "mehnat"}, "content": "", "done": False}
+    assert by_kind["queue"]["data"] == {"query": "mehnat", "position": 2}
+    assert by_kind["tool_end"]["content"] == "Found 1 document for mehnat"
+    assert "".join(data["content"] for kind, data in events if kind == "token") == "Mehnat kodeksi 1-modda"
+    assert by_kind["message"]["content"] == "Mehnat kodeksi 1-modda"
+    assert by_kind["done"]["done"]
+    assert by_kind["done"]["response"]["messages"] == [{"role": "assistant", "content": "Mehnat kodeksi 1-modda"}]
+
+    history = consultation.consultation_engine.get_session_history("stream-1")
+    assert [message.content for message in history] == ["Mehnat kodeksi nima?", "Mehnat kodeksi 1-modda"]
+
+
+def test_stream_error_is_sent_as_a_final_event(client, monkeypatch, fake_agent_graph):
+    # The scripted model has no answer left after the tool call and fails
+    graph = fake_agent_graph([SEARCH_CALL], tools=[consultation_search])
+    monkeypatch.setattr(consultation.consultation_engine, "graph", graph)
+
+    response = client.post("/api/v1/qna/chat/stream", json={
+        "messages": [{"role": "user", "content": "Savol"}],
+        "session_id": "stream-2"
+    })
+    events = read_events(response)
+
+    kind, data = events[-1]
+    assert kind == "error" and data["done"]
+    assert data["content"].startswith("Error processing chat:")
+    # The thread already holds the question, so the session keeps it too
+    assert [message.content for message in consultation.consultation_engine.get_session_history("stream-2")] == ["Savol"]
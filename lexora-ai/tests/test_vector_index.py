@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from app.tools.vector_index import HashingEmbedder, HybridScorer, VectorIndex, split_paragraphs
+
+RECORDS = [
+    {
+        "success": True,
+        "markdown": (
+            "# Трудовой кодекс\n\n"
+            "Трудовой договор заключается в письменной форме между работником и работодателем.\n\n"
+            "Расторжение трудового договора по инициативе работодателя допускается по основаниям кодекса."
+        ),
+        "metadata": {"document_id": "1", "title": "Трудовой кодекс"}
+    },
+    {
+        "document_id": "2",
+        "title": "Налоговый кодекс",
+        "content": "Налог на доходы физических лиц уплачивается ежемесячно налоговыми агентами по месту работы."
+    },
+    {"success": False, "error": "Failed to fetch document"},
+]
+
+
+def document(document_id, title, snippet, relevance_score=0.5):
+    return {"document_id": document_id, "title": title, "snippet": snippet, "url": "", "document_date": "", "relevance_score": relevance_score}
+
+
+def test_embeddings_are_normalized_and_close_for_inflected_forms():
+    embedder = HashingEmbedder()
+    pension, pensions, tax, empty = embedder.embed(["пенсия по возрасту", "пенсии по возрасту", "налоговый кодекс", ""])
+
+    assert np.linalg.norm(pension) == pytest.approx(1.0, abs=1e-5)
+    assert not empty.any()
+    assert pension @ pensions > pension @ tax
+
+
+def test_split_paragraphs_skips_short_blocks():
+    assert split_paragraphs(RECORDS[0]["markdown"]) == RECORDS[0]["markdown"].split("\n\n")[1:]
+
+
+def test_index_search_returns_one_hit_per_document():
+    index = VectorIndex()
+    assert index.add_records(RECORDS) == 2
+    assert len(index) == 5
+
+    query_vector = index.embedder.embed(["расторжение трудового договора"])[0]
+    hits = index.search(query_vector, k=5)
+    assert [document_id for document_id, _ in hits] == ["1", "2"]
+    assert hits[0][1] > hits[1][1]
+
+
+def test_saved_index_loads_memory_mapped_with_the_same_scores(tmp_path):
+    index = VectorIndex(HashingEmbedder(dim=256, ngram_sizes=(3, 4)))
+    index.add_records(RECORDS)
+    index.save(str(tmp_path))
+
+    loaded = VectorIndex.load(str(tmp_path))
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.embedder.config() == index.embedder.config()
+    assert loaded.rows == index.rows
+
+    query_vector = loaded.embedder.embed(["налог на доходы"])[0]
+    np.testing.assert_allclose(
+        loaded.document_scores(query_vector, ["1", "2", "missing"])[:2],
+        index.document_scores(query_vector, ["1", "2"])
+    )
+    assert np.isnan(loaded.document_scores(query_vector, ["missing"])[0])
+
+
+def test_indexed_paragraphs_raise_the_dense_score():
+    index = VectorIndex()
+    index.add_records(RECORDS)
+    query = "расторжение трудового договора по инициативе работодателя"
+
+    plain = HybridScorer().dense_scores(query, ["Трудовой кодекс"], ["1"])
+    indexed = HybridScorer(vector_index=index).dense_scores(query, ["Трудовой кодекс"], ["1"])
+    assert indexed[0] > plain[0]
+
+
+def test_rerank_sorts_by_fused_score():
+    scorer = HybridScorer(dense_weight=0.5)
+    documents = [
+        document("1", "Налоговый кодекс", "Налог на доходы", relevance_score=0.9),
+        document("2", "Трудовой кодекс", "Трудовой договор и его расторжение", relevance_score=0.1),
+    ]
+    reranked = scorer.rerank("расторжение трудового договора", documents)
+
+    assert [doc["document_id"] for doc in reranked] == ["2", "1"]
+    assert documents[0]["relevance_score"] == 0.9
+    expected = scorer.fuse(
+        scorer.lexical_scores("расторжение трудового договора", documents[1:]),
+        scorer.dense_scores("расторжение трудового договора", ["Трудовой кодекс Трудовой договор и его расторжение"])
+    )[0]
+    assert reranked[0]["relevance_score"] == pytest.approx(float(expected), abs=1e-3)
+
+
+def test_rerank_fuses_backend_scores_as_the_lexical_half():
+    scorer = HybridScorer(dense_weight=0.0)
+    documents = [document("1", "a", "b", relevance_score=0.2), document("2", "c", "d", relevance_score=0.7)]
+
+    reranked = scorer.rerank("трудовой договор", documents, use_document_scores=True)
+    assert [(doc["document_id"], doc["relevance_score"]) for doc in reranked] == [("2", 0.7), ("1", 0.2)]